@@ -0,0 +1,240 @@
+#Runs the engine's benchmark scenarios several times and compares their medians with benchmarks/baseline.json
+#Everything but replays runs headless, replays need a window and are only run when given
+#The baseline's milliseconds are from the machine it was written on, they are scaled by a calibration run timed on both machines before comparing
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from block import registry, loadBlockInfo
+from chunk import ChunkGenerator, getPaletteBlocks, generationPalette, decodeChunkDict, encodeChunkDict
+from mesher import cullSection, buildSectionMesh
+from section import sectionHeight, computeConnectivity
+from light import computeChunkLight
+from worldGen import WorldGen
+
+baselineFile = os.path.join("benchmarks", "baseline.json")
+baselineVersion = 2 #Version 1 had no calibration, its milliseconds are compared as they are
+defaultTolerance = 0.25 #Slowdown allowed before a metric counts as a regression, 0.25 is 25% slower
+
+benchmarkSeed = "benchmark"
+benchmarkHeight = 64
+benchmarkChunks = [(x, z) for x in range(4) for z in range(4)]
+editsPerChunk = 200 #Random blocks changed in every chunk before serializing it
+
+def getNeighborhood(blocks) : #Section ids with the one block border the mesher reads, nothing loaded around it
+    return np.pad(blocks.astype(np.int32), 1, constant_values=-1)
+
+def getSections(chunks) :
+    return [(index, getNeighborhood(blocks[:, index*sectionHeight:(index + 1)*sectionHeight, :])) for blocks in chunks for index in range(blocks.shape[1] // sectionHeight)]
+
+#Scenarios, each returns milliseconds per operation by metric name
+
+def benchmarkGeneration(state) :
+    worldGen = WorldGen(benchmarkSeed) #Cold height cache every run
+
+    startTime = time.perf_counter()
+    generated = [ChunkGenerator(worldGen, chunkX, chunkZ, benchmarkHeight).generate() for chunkX, chunkZ in benchmarkChunks]
+    duration = time.perf_counter() - startTime
+
+    state["generated"] = generated
+    state["chunks"] = [getPaletteBlocks(ids) for ids in generated]
+
+    return {"generation.chunk": duration * 1000 / len(benchmarkChunks)}
+
+def benchmarkCulling(state) :
+    sections = getSections(state["chunks"])
+
+    startTime = time.perf_counter()
+    for index, ids in sections :
+        cullSection(ids, index)
+    cullingDuration = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for index, ids in sections :
+        computeConnectivity(registry.open[ids[1:-1, 1:-1, 1:-1]])
+    visibilityDuration = time.perf_counter() - startTime
+
+    return {"culling.section": cullingDuration * 1000 / len(sections), "visibility.section": visibilityDuration * 1000 / len(sections)}
+
+def benchmarkMeshing(state) :
+    sections = getSections(state["chunks"])
+    faceAttributes = np.arange(len(registry.names) + 1, dtype=np.uint32)[:, None].repeat(6, axis=1) #Stand-in for the texture layers
+
+    startTime = time.perf_counter()
+    for index, ids in sections :
+        buildSectionMesh(ids, index, faceAttributes, greedy=True)
+    duration = time.perf_counter() - startTime
+
+    return {"meshing.section": duration * 1000 / len(sections)}
+
+def benchmarkLighting(state) :
+    startTime = time.perf_counter()
+    for blocks in state["chunks"] :
+        computeChunkLight(blocks)
+    duration = time.perf_counter() - startTime
+
+    return {"lighting.chunk": duration * 1000 / len(state["chunks"])}
+
+def benchmarkSerialization(state) :
+    rng = np.random.default_rng(0)
+    names = np.array(generationPalette + ["glass", "planks"], dtype=object)
+
+    edited = []
+    for baseline in state["generated"] :
+        blocks = np.array(generationPalette, dtype=object)[baseline]
+        x, y, z = (rng.integers(0, size, editsPerChunk) for size in blocks.shape)
+        blocks[x, y, z] = names[rng.integers(0, len(names), editsPerChunk)]
+        edited.append(blocks)
+
+    startTime = time.perf_counter()
+    saves = [json.dumps(encodeChunkDict(blocks, baseline, 2)) for blocks, baseline in zip(edited, state["generated"])]
+    encodeDuration = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for save, baseline in zip(saves, state["generated"]) :
+        decodeChunkDict(json.loads(save), baseline)
+    decodeDuration = time.perf_counter() - startTime
+
+    return {"serialization.encode": encodeDuration * 1000 / len(saves), "serialization.decode": decodeDuration * 1000 / len(saves)}
+
+def benchmarkCalibration() :
+    #A fixed mix of numpy and pure Python work like the scenarios do, how long it takes tells machines apart
+    ids = np.random.default_rng(0).integers(0, 8, (16, 256, 16)).astype(np.uint8)
+
+    startTime = time.perf_counter()
+    for i in range(20) :
+        np.maximum.reduce([ids[2:], ids[:-2], ids[1:-1]])
+        np.nonzero(ids == i % 8)
+        np.sort(ids, axis=1)
+
+    total = 0
+    for i in range(200000) :
+        total += i % 7
+    duration = time.perf_counter() - startTime
+
+    return {"calibration": duration * 1000}
+
+def benchmarkReplay(path) : #Runs the game on a recording, frame times come from its replay report
+    with tempfile.TemporaryDirectory() as directory :
+        reportPath = os.path.join(directory, "report.json")
+        subprocess.run([sys.executable, "main.py", "--replay", path, "--replay-report", reportPath], check=True, stdout=subprocess.DEVNULL)
+
+        with open(reportPath, "r") as f :
+            metrics = json.loads(f.read())["metrics"]
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    return {f"replay.{name}.frameP50": metrics["frame"]["p50"], f"replay.{name}.frameP95": metrics["frame"]["p95"]}
+
+scenarios = {"generation": benchmarkGeneration, "culling": benchmarkCulling, "meshing": benchmarkMeshing, "lighting": benchmarkLighting,
+             "serialization": benchmarkSerialization}
+
+def runBenchmarks(names, replays, runs) : #Median of every metric over the runs
+    results = {}
+
+    for run in range(runs) :
+        print(f"BENCHMARK: Run {run + 1}/{runs}")
+        state = {}
+
+        for metric, value in benchmarkCalibration().items() :
+            results.setdefault(metric, []).append(value)
+
+        for name in names :
+            for metric, value in scenarios[name](state).items() :
+                results.setdefault(metric, []).append(value)
+
+        for path in replays :
+            for metric, value in benchmarkReplay(path).items() :
+                results.setdefault(metric, []).append(value)
+
+    return {metric: float(np.median(values)) for metric, values in results.items()}
+
+def loadBaseline() :
+    if not os.path.isfile(baselineFile) :
+        return {"version": baselineVersion, "tolerance": defaultTolerance, "metrics": {}}
+
+    with open(baselineFile, "r") as f :
+        return json.loads(f.read())
+
+def writeBaseline(baseline, medians) : #Keeps the tolerances set for existing metrics
+    medians = dict(medians)
+    baseline["version"] = baselineVersion
+    baseline["calibration"] = round(medians.pop("calibration"), 4)
+
+    for metric, value in medians.items() :
+        baseline["metrics"].setdefault(metric, {})["value"] = round(value, 4)
+
+    os.makedirs(os.path.dirname(baselineFile), exist_ok=True)
+    with open(baselineFile, "w") as f :
+        f.write(json.dumps(baseline, indent=4) + "\n")
+
+def compare(baseline, medians, tolerance=None) : #Prints a diff table, returns the regressed metrics
+    regressions = []
+    medians = dict(medians)
+    calibration = medians.pop("calibration")
+
+    #Current times as they would be on the baseline's machine
+    scale = 1
+    if baseline.get("calibration") :
+        scale = baseline["calibration"] / calibration
+        print(f"BENCHMARK: Calibration took {calibration:.2f}ms against the baseline's {baseline['calibration']:.2f}ms, current times are scaled by {scale:.2f}")
+    else :
+        print(f"BENCHMARK: The baseline has no calibration, its times are only meaningful on the machine that wrote it, rewrite it with --update-baseline")
+
+    print(f"  {'metric':<32} {'baseline':>10} {'current':>10} {'diff':>8}  status")
+
+    for metric, value in medians.items() :
+        value *= scale
+        entry = baseline["metrics"].get(metric)
+
+        if not entry :
+            print(f"  {metric:<32} {'':>10} {value:>8.3f}ms {'':>8}  new")
+            continue
+
+        allowed = tolerance if tolerance != None else entry.get("tolerance", baseline.get("tolerance", defaultTolerance))
+        diff = value / entry["value"] - 1 if entry["value"] else 0
+
+        status = "ok"
+        if diff > allowed :
+            status = "REGRESSION"
+            regressions.append(metric)
+        elif diff < -allowed :
+            status = "faster"
+
+        print(f"  {metric:<32} {entry['value']:>8.3f}ms {value:>8.3f}ms {diff * 100:>+7.1f}%  {status}")
+
+    return regressions
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description="Run the benchmark scenarios and compare them with the stored baseline, scaled to this machine's speed")
+    parser.add_argument("--runs", type=int, default=5, help="times every scenario is run, their median is compared")
+    parser.add_argument("--only", nargs="+", choices=list(scenarios), help="run only these scenarios")
+    parser.add_argument("--replay", nargs="+", default=[], metavar="FILE", help="also replay these recordings, needs a window")
+    parser.add_argument("--tolerance", type=float, help="allowed slowdown for every metric, overrides the baseline's, 0.25 is 25%%")
+    parser.add_argument("--update-baseline", action="store_true", help="store the medians and this machine's calibration as the new baseline instead of comparing")
+    args = parser.parse_args()
+
+    loadBlockInfo()
+
+    names = args.only or list(scenarios)
+    if set(names) & {"culling", "meshing", "lighting", "serialization"} : #Work on the generated chunks
+        names = ["generation"] + [name for name in names if name != "generation"]
+
+    medians = runBenchmarks(names, args.replay, args.runs)
+    baseline = loadBaseline()
+
+    if args.update_baseline :
+        writeBaseline(baseline, medians)
+        print(f"BENCHMARK: Wrote {len(medians) - 1} metrics and the calibration to {baselineFile}")
+        sys.exit(0)
+
+    print(f"BENCHMARK: Medians of {args.runs} runs against {baselineFile}")
+    regressions = compare(baseline, medians, args.tolerance)
+
+    if regressions :
+        print(f"BENCHMARK: {len(regressions)} metrics regressed: {', '.join(regressions)}")
+        sys.exit(1)
@@ -1,104 +1,168 @@
-from model import *
 import json
 import os
+import numpy as np
 
-with open("blocks.json", "r") as f :
-    blockInfo = json.loads(f.read()) 
+from model import packVertex, cubeFaceTemplates, billboardFaceTemplates
 
-class Block :
-    def __init__(self, app, chunk, id, pos) -> None:
+blockInfoFile = "blocks.json"
+blockInfo = {}
+
+allCubeFaces = 0b111111
+allBillboardFaces = 0b1111
+
+#Models by their id in BlockRegistry.models
+noModel, cubeModel, billboardModel = 0, 1, 2
+modelIds = {None: noModel, "cube": cubeModel, "billboard": billboardModel}
+modelNames = {modelId: name for name, modelId in modelIds.items()}
+
+def loadBlockInfo() : #Parsed on startup instead of on import, so importing is free
+    if not blockInfo :
+        with open(blockInfoFile, "r") as f :
+            blockInfo.update(json.loads(f.read()))
+
+        registry.compile(blockInfo)
+
+    return blockInfo
+
+class BlockRegistry : #blocks.json compiled into small integer ids and per id lookup tables
+    def __init__(self) -> None :
+        self.names = [] #Block id string of every integer id
+        self.ids = {}
+
+        #Tables are indexed by integer id, their last entry describes blocks outside the loaded world so -1 can index it
+        self.transparent = None
+        self.fluid = None
+        self.nonPhysical = None
+        self.nonObject = None
+        self.brokenByFluids = None
+
+        self.models = None
+        self.allFaces = None #Face mask of a block with nothing around it
+        self.open = None #Can be seen through, for section visibility
+        self.lightOpaque = None #Stops light, the opposite of open
+        self.lightEmission = None #Light level given off, from "light" in blocks.json
+
+        self.soundNames = [None]
+        self.destroySounds = None #Indexes into soundNames, 0 is no sound
+        self.placeSounds = None
+
+        self.faceAttributes = None #Packed vertex attributes of every face, compiled once textures are needed
+
+    def compile(self, info) :
+        #Air is always 0, so zeroed arrays are empty
+        self.names = ["air"] + [name for name in info if name != "air"]
+        self.ids = {name: blockId for blockId, name in enumerate(self.names)}
+
+        count = len(self.names) + 1
+
+        def flagTable(flag, outside) :
+            return np.array([flag in info[name]["flags"] for name in self.names] + [outside], dtype=bool)
+
+        self.transparent = flagTable("transparent", True)
+        self.fluid = flagTable("fluid", False)
+        self.nonPhysical = flagTable("nonPhysical", True)
+        self.nonObject = flagTable("nonObject", True)
+        self.brokenByFluids = flagTable("brokenByFluids", False)
+
+        self.models = np.zeros(count, dtype=np.uint8)
+        for blockId, name in enumerate(self.names) :
+            if not self.nonObject[blockId] :
+                self.models[blockId] = modelIds[info[name]["model"]]
+
+        self.allFaces = np.zeros(count, dtype=np.uint8)
+        self.allFaces[self.models == cubeModel] = allCubeFaces
+        self.allFaces[self.models == billboardModel] = allBillboardFaces
+
+        self.open = (self.models != cubeModel) | self.fluid | self.transparent
+        self.lightOpaque = ~self.open
+
+        self.lightEmission = np.zeros(count, dtype=np.uint8)
+        for blockId, name in enumerate(self.names) :
+            self.lightEmission[blockId] = info[name].get("light", 0)
+
+        self.destroySounds = np.zeros(count, dtype=np.uint16)
+        self.placeSounds = np.zeros(count, dtype=np.uint16)
+
+        for blockId, name in enumerate(self.names) :
+            sounds = info[name]["sounds"]
+            self.destroySounds[blockId] = self.getSoundId(sounds["destroy"])
+            self.placeSounds[blockId] = self.getSoundId(sounds["place"])
+
+        self.faceAttributes = None
+
+    def getSoundId(self, name) :
+        if not name in self.soundNames :
+            self.soundNames.append(name)
+
+        return self.soundNames.index(name)
+
+    def getIds(self, names) :
+        return np.array([self.ids[name] for name in names], dtype=np.uint16)
+
+    def getFaceAttributes(self, textureMan) : #(ids, 6) table of packed vertex attributes, cube faces or billboard planes
+        if self.faceAttributes is None :
+            self.faceAttributes = np.zeros((len(self.names) + 1, 6), dtype=np.uint32)
+
+            for blockId, name in enumerate(self.names) :
+                model = self.models[blockId]
+
+                if model == noModel :
+                    continue
+
+                templates = cubeFaceTemplates if model == cubeModel else billboardFaceTemplates
+                textures = blockInfo[name]["faceTextures"]
+
+                for face, template in enumerate(templates) :
+                    layer = textureMan.getTextureLayer(textures[template["texture"]])
+                    self.faceAttributes[blockId, face] = packVertex(0, 0, 0, 0, 0, 0, layer, template["brightness"], lowered=self.fluid[blockId])[1]
+
+        return self.faceAttributes
+
+registry = BlockRegistry()
+
+class Block : #A view of one block of a chunk, created on demand, the chunk's sections store the actual ids
+    def __init__(self, app, chunk, pos) -> None:
         self.app = app
         self.chunk = chunk
 
-        self.id = None
-        self.changeId(id)
         self.pos = pos
 
         x, y, z = pos
         self.chunkRelativePos = (x - (chunk.chunkX*16), y, z - (chunk.chunkZ*16))
 
-        self.object = None
+    @property
+    def numericId(self) :
+        return self.chunk.getNumericId(*self.chunkRelativePos)
 
-        self.model = None
+    @property
+    def id(self) :
+        return registry.names[self.numericId]
 
-        self.physicalBlock = False
-        self.isFluid = False
-        self.flags = []
-        self.sounds = {}
-        
-    
-    def changeId(self, newId) :
-        if self.id == newId :
-            return
-
-        self.id = newId
+    @property
+    def flags(self) :
+        return blockInfo[self.id]["flags"]
 
-        self.flags = blockInfo[self.id]["flags"]
-        self.physicalBlock = not "nonPhysical" in self.flags
-        self.isFluid = "fluid" in self.flags
+    @property
+    def physicalBlock(self) :
+        return not registry.nonPhysical[self.numericId]
 
-        self.sounds = blockInfo[self.id]["sounds"]
+    @property
+    def isFluid(self) :
+        return bool(registry.fluid[self.numericId])
 
-        self.updateObject()
+    @property
+    def sounds(self) :
+        numericId = self.numericId
+        return {"destroy": registry.soundNames[registry.destroySounds[numericId]], "place": registry.soundNames[registry.placeSounds[numericId]]}
 
-    def updateObject(self) :
-        self.object = None
-        
-        if not "nonObject" in self.flags :
-            self.model = blockInfo[self.id]["model"]
+    @property
+    def model(self) :
+        return modelNames[registry.models[self.numericId]]
 
-            if self.model == "cube" :
-                x, y, z = self.pos
-
-                if self.isFluid :
-                    y -= 0.25
+    def changeId(self, newId) :
+        self.chunk.setBlockId(self.chunkRelativePos, newId)
 
-                self.object = Cube(self.app, pos=(x, y, z), textures=self.getTextures())
-            elif self.model == "billboard" :
-                self.object = Billboard(self.app, pos=self.pos, textures=self.getTextures())
-    
     def getTextures(self) :
         if self.id in blockInfo :
             return blockInfo[self.id]["faceTextures"]
         return blockInfo["FALLBACK"]["faceTextures"]
-    
-    def cull(self, surroundingBlocks=["air", "air", "air", "air", "air", "air"]) :
-        if not self.object :
-            return
-        
-        if self.model == "cube" :
-            for i in range(6) :
-                surroundingBlock = surroundingBlocks[i]
-
-                if surroundingBlock :
-                    flags = blockInfo[surroundingBlock]["flags"]
-                    faceVisible = ("transparent" in flags) or (not self.isFluid and "fluid" in flags)
-                else :
-                    faceVisible = True
-                self.object.faces[i]["visible"] = faceVisible
-            
-            if self.pos[1] <= 0 : #Hide faces in void
-                self.object.faces[3]["visible"] = False
-                
-        elif self.model == "billboard" :
-            visible = False
-
-            for i in range(6) :
-                surroundingBlock = surroundingBlocks[i]
-
-                if (not surroundingBlock) or ("transparent" in blockInfo[surroundingBlock]["flags"]) :
-                    visible = True
-                    break
-            
-            self.object.faces[0]["visible"] = visible
-            self.object.faces[1]["visible"] = visible
-            self.object.faces[2]["visible"] = visible
-            self.object.faces[3]["visible"] = visible
-
-    def destroy(self) :
-        if self.object :
-            self.object.destroy()
-
-    def render(self) :
-        if self.object :
-            self.object.render()
\ No newline at end of file
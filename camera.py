@@ -44,8 +44,7 @@ class Camera :
             self.app.sound.stop("ambient", "underwater", fadeout=500)
 
     def update(self) :
-        if self.app.gamePaused :
-            pg.mouse.get_rel() #Prevent camera from turning a lot after unpause
+        if self.app.gamePaused : #Mouse movement is read every tick, so it doesn't pile up while paused
             return
         
         if self.freeCam :
@@ -55,6 +54,7 @@ class Camera :
         self.inFluidCheck()
         self.updateCameraVectors()
         self.viewM = self.get_view_matrix()
+        self.app.shaderMan.writeCamera()
 
     def updateCameraVectors(self) :
         yaw, pitch = glm.radians(self.yaw), glm.radians(self.pitch)
@@ -72,7 +72,7 @@ class Camera :
         self.backwards = self.forward * -1
     
     def rotate(self) :
-        relX, relY = pg.mouse.get_rel()
+        relX, relY = self.app.input.mouseRel
 
         mouseSensitivity = self.config.mouseSensitivity / 100
 
@@ -85,18 +85,18 @@ class Camera :
     def move(self) :
         velocity = movementSpeed * self.app.deltaTime
 
-        keys = pg.key.get_pressed()
-        if keys[pg.K_w] :
+        inputSource = self.app.input
+        if inputSource.isKeyPressed(pg.K_w) :
             self.position += self.forward * velocity
-        if keys[pg.K_a] :
+        if inputSource.isKeyPressed(pg.K_a) :
             self.position += self.left * velocity
-        if keys[pg.K_s] :
+        if inputSource.isKeyPressed(pg.K_s) :
             self.position += self.backwards * velocity
-        if keys[pg.K_d] :
+        if inputSource.isKeyPressed(pg.K_d) :
             self.position += self.right * velocity
-        if keys[pg.K_SPACE] :
+        if inputSource.isKeyPressed(pg.K_SPACE) :
             self.position += glm.vec3(0, 1, 0) * velocity
-        if keys[pg.K_LSHIFT] :
+        if inputSource.isKeyPressed(pg.K_LSHIFT) :
             self.position += glm.vec3(0, -1, 0) * velocity
         
     def getChunk(self) :
@@ -107,8 +107,16 @@ class Camera :
     def get_view_matrix(self) :
         return glm.lookAt(self.position, self.position + self.forward, self.up)
 
+    def getFarPlane(self) : #Far enough to see the distant terrain, as far as the governor currently draws it
+        lodDistances = self.app.governor.getLodDistances()
+        lodDistance = 0
+        if lodDistances :
+            lodDistance = max(maxDistance for maxDistance, step in lodDistances)
+
+        return max(far, (lodDistance + 1) * 16 * 1.5)
+
     def get_projection_matrix(self) :
-        projectionMatrix = glm.perspective(glm.radians(self.config.fov), self.aspectRatio, near, far)
+        projectionMatrix = glm.perspective(glm.radians(self.config.fov), self.aspectRatio, near, self.getFarPlane())
 
         return projectionMatrix
     
@@ -1,84 +1,286 @@
 import os
 import time
 import json
+import zipfile
+import numpy as np
 
-from block import Block
+from block import Block, registry
+from section import Section, sectionHeight, faceDirections
 
-heightLimit = 32
+defaultHeight = 32 #Height of worlds that don't store one in their info.json, a multiple of sectionHeight
+maxHeight = 512
 chunkSize = 16
 
 waterLevel = 4
 
 noSave = False
+chunkFormat = 2 #Version of the on-disk chunk format
 
-class Chunk :
-    def __init__(self, app, chunkCoords=(0,0)) -> None:
-        self.app = app
-        self.worldGen = app.scene.worldGen
-        self.blocks = []
-        self.totalBlockCount = chunkSize*chunkSize*heightLimit
+#Blocks used by world generation, generated chunks are arrays of indexes into this list
+generationPalette = ["air", "stone", "dirt", "grass", "gravel", "log", "leaves", "water"]
+generationIds = {blockId: index for index, blockId in enumerate(generationPalette)}
 
-        self.chunkX = chunkCoords[0]
-        self.chunkZ = chunkCoords[1]
+def compactIds(ids) : #A single palette index when every block is the same, otherwise a copy of the array
+    if (ids == ids.flat[0]).all() :
+        return int(ids.flat[0])
 
-        self.heightMap = {}
+    return ids.copy()
 
-        startTime = time.time()
+def getPaletteBlocks(ids) : #Integer block ids of a compacted array of generationPalette indexes
+    blockIds = registry.getIds(generationPalette)
 
-        self.clear()
-        
-        #self.linesTest()
-        #self.generatePlatform()
-        if noSave or (not self.loadChunk()) :
-            self.generate()
+    if isinstance(ids, int) :
+        return int(blockIds[ids])
 
-        self.cullAllBlocks()
+    return blockIds[ids]
 
-        #print(f"Chunk generation took {round(time.time() - startTime, 2)} seconds. {self.totalBlockCount} blocks generated ({round((time.time() - startTime) / (self.totalBlockCount), 3)}s per block).")
+def getGeneratedPath(worldId, chunkX, chunkZ) : #Where pregenerate.py stores a generated chunk, read instead of generating it again
+    return os.path.join("saves", worldId, "generated", f"{chunkX}_{chunkZ}.npz")
 
-    def clear(self) :
-        self.blocks = []
+def makeChunkDict(generator, height, pallete, changes) : #A chunk save in the current format
+    return {
+        "format": chunkFormat,
+        "generator": generator,
+        "dimensions": (chunkSize, height),
+        "pallete": pallete,
+        "changes": changes, #Flat list of (block index, pallete index) pairs
+        "timestamp": round(time.time())
+    }
 
-        blocksGenerated = 0
+def decodeChunkDict(j, baseline) :
+    #Block id names of a saved chunk as an [x, y, z] array, baseline is its generated array of generationPalette indexes
+    blocks = np.array(generationPalette, dtype=object)[baseline]
+    height = blocks.shape[1]
+    blocksPallete = np.array(j["pallete"], dtype=object)
 
-        for x in range(chunkSize) :
-            self.blocks.append([])
-            for y in range(heightLimit) :
-                self.blocks[x].append([])
-                for z in range(chunkSize) :
-                    #print(f"{(blocksGenerated/(self.totalBlockCount/100))}%")
-                    self.blocks[x][y].append(Block(self.app, self, "air", (x+(self.chunkX*chunkSize), y, z+(self.chunkZ*chunkSize))))
-                    blocksGenerated += 1
+    if j.get("format", 1) < 2 : #Every block stored
+        saved = blocksPallete[np.array(j["blocks"], dtype=np.int64)]
+        blocks[:, :min(height, saved.shape[1]), :] = saved[:, :height, :]
+        return blocks
 
-    def linesTest(self) :
-        for a in range(chunkSize) :
-            self.blocks[a][a][a].changeId("debugBlock")
-            self.blocks[a*-1][a][a*-1].changeId("debugBlock")
+    _, heightLimit = j["dimensions"]
+    changes = np.array(j["changes"], dtype=np.int64).reshape(-1, 2)
 
-    def generatePlatform(self) :
-        for x in range(chunkSize) :
-            for z in range(chunkSize) :
-                self.blocks[x][0][z].changeId("grass")
+    x, rest = np.divmod(changes[:, 0], heightLimit * chunkSize)
+    y, z = np.divmod(rest, chunkSize)
+    inside = y < height
+
+    blocks[x[inside], y[inside], z[inside]] = blocksPallete[changes[inside, 1]]
+    return blocks
+
+def countChunkDict(j, baseline) :
+    #Block counts of a saved chunk by id name and how many blocks differ from the generated baseline, without decoding it into names
+    height = baseline.shape[1]
+    blocksPallete = j["pallete"]
+    counts = np.bincount(baseline.ravel(), minlength=len(generationPalette)).astype(np.int64)
+
+    #Generation palette index of every save palette entry, -1 for blocks generation never places
+    generationIndexes = np.array([generationIds.get(blockId, -1) for blockId in blocksPallete], dtype=np.int64)
+
+    if j.get("format", 1) < 2 :
+        saved = np.array(j["blocks"], dtype=np.int64)[:, :height, :]
+        generated = baseline[:, :saved.shape[1], :]
+
+        counts -= np.bincount(generated.ravel(), minlength=len(generationPalette))
+        savedCounts = np.bincount(saved.ravel(), minlength=len(blocksPallete))
+        modified = int(np.count_nonzero(generationIndexes[saved] != generated))
+    else :
+        _, heightLimit = j["dimensions"]
+        changes = np.array(j["changes"], dtype=np.int64).reshape(-1, 2)
+
+        x, rest = np.divmod(changes[:, 0], heightLimit * chunkSize)
+        y, z = np.divmod(rest, chunkSize)
+        inside = y < height
+
+        generated = baseline[x[inside], y[inside], z[inside]]
+        counts -= np.bincount(generated, minlength=len(generationPalette))
+        savedCounts = np.bincount(changes[inside, 1], minlength=len(blocksPallete))
+        modified = int(np.count_nonzero(generationIndexes[changes[inside, 1]] != generated))
+
+    blockCounts = {}
+    for blockId, count in list(zip(generationPalette, counts)) + list(zip(blocksPallete, savedCounts)) :
+        if count :
+            blockCounts[blockId] = blockCounts.get(blockId, 0) + int(count)
+
+    return blockCounts, modified
+
+def encodeChunkDict(blocks, baseline, generator) : #The current format save of an [x, y, z] array of block id names
+    height = blocks.shape[1]
+    generated = np.array(generationPalette, dtype=object)[baseline]
+
+    blocksPallete = {}
+    changes = []
+
+    for x, y, z in zip(*np.nonzero(blocks != generated)) :
+        blockId = blocks[x, y, z]
+
+        if not blockId in blocksPallete :
+            blocksPallete[blockId] = len(blocksPallete)
+
+        changes.append(int((x * height + y) * chunkSize + z))
+        changes.append(blocksPallete[blockId])
+
+    return makeChunkDict(generator, height, list(blocksPallete), changes)
+
+def writeChunkFile(path, j) : #Written next to the old file then swapped in, so a crash never leaves half a chunk
+    temporaryPath = path + ".tmp"
+
+    with open(temporaryPath, "w") as f :
+        f.write(json.dumps(j).replace(' ', ''))
+
+    os.replace(temporaryPath, path)
+
+class ChunkGenerator : #Generates the blocks of a chunk from its coordinates alone, needs no window or loaded world
+    def __init__(self, worldGen, chunkX, chunkZ, height=defaultHeight) -> None :
+        self.worldGen = worldGen
+        self.chunkX = chunkX
+        self.chunkZ = chunkZ
+        self.height = height
+
+        self.heightMap = None
+        self.trees = None
+
+    def prepare(self) : #Column heights and trees, which decide how high the generated blocks go
+        if self.heightMap is not None :
+            return
+
+        self.heightMap = self.worldGen.getHeightMap(self.chunkX*chunkSize, self.chunkZ*chunkSize, chunkSize)
+
+        if self.worldGen.version >= 2 :
+            self.trees = self.worldGen.getTrees(self.chunkX, self.chunkZ, self.heightMap, waterLevel, chunkSize=chunkSize)
+
+    def getFilledHeight(self) : #Height of the sections holding every generated block that isn't air
+        self.prepare()
+
+        if self.worldGen.version < 2 : #Legacy trees are stamped block by block and aren't bounded as easily
+            return self.height
+
+        top = max(int(self.heightMap.max()), waterLevel) + 1
+
+        x, z, heights, leaves = self.trees
+        if len(x) :
+            trunkTop = int((self.heightMap[x, z] + 1 + heights).max())
+            top = max(top, trunkTop, trunkTop - 3 + leaves.shape[1])
+
+        return min(self.height, -(-top // sectionHeight) * sectionHeight)
+
+    def generatePlatform(self, ids) :
+        ids[:, 0, :] = generationIds["grass"]
     
-    def generateHeight(self) :
+    def generateHeight(self, ids) :
+        if self.worldGen.version < 2 :
+            self.generateLegacyHeight(ids)
+            return
+
+        y = np.arange(ids.shape[1])[None, :, None]
+        terrainHeight = self.heightMap[:, None, :]
+
+        ids[y < terrainHeight - 3] = generationIds["stone"]
+        ids[(y >= terrainHeight - 3) & (y < terrainHeight)] = generationIds["dirt"]
+
+        surface = np.where(self.heightMap >= waterLevel, generationIds["grass"], generationIds["gravel"])
+        ids[:, :, :] = np.where(y == terrainHeight, surface[:, None, :], ids)
+
+    def generateTrees(self, ids) :
+        if self.worldGen.version < 2 :
+            return self.generateLegacyTrees(ids)
+
+        x, z, heights, leaves = self.trees
+
+        if len(x) == 0 :
+            return
+
+        trunkBase = self.heightMap[x, z] + 1
+
+        #Leaves, every tree and layer is stamped at once
+        tree, layer, leaveX, leaveZ = np.nonzero(leaves)
+        leavesX = x[tree] + leaveX - 2
+        leavesY = trunkBase[tree] + heights[tree] - 3 + layer
+        leavesZ = z[tree] + leaveZ - 2
+
+        inChunk = leavesY < ids.shape[1]
+        leavesX, leavesY, leavesZ = leavesX[inChunk], leavesY[inChunk], leavesZ[inChunk]
+
+        replaceable = ids[leavesX, leavesY, leavesZ] == generationIds["air"]
+        ids[leavesX[replaceable], leavesY[replaceable], leavesZ[replaceable]] = generationIds["leaves"]
+
+        #Logs
+        trunkOffsets = np.arange(heights.max())
+        trunk = trunkOffsets[None, :] < heights[:, None]
+        tree, offset = np.nonzero(trunk)
+        logsY = trunkBase[tree] + offset
+
+        inChunk = logsY < ids.shape[1]
+        ids[x[tree][inChunk], logsY[inChunk], z[tree][inChunk]] = generationIds["log"]
+
+    def generateWater(self, ids) :
+        water = ids[:, :waterLevel + 1, :]
+        water[water == generationIds["air"]] = generationIds["water"]
+
+    def generate(self, height=None) : #Returns the generated blocks as an [x, y, z] array of generationPalette indexes, up to height or the top of the world
+        ids = np.zeros((chunkSize, height or self.height, chunkSize), dtype=np.uint8)
+
+        self.prepare()
+        self.generateHeight(ids)
+        self.generateTrees(ids)
+        self.generateWater(ids)
+
+        return ids
+
+    def generateSections(self, path=None) :
+        #Generated blocks of every section, compacted like compactIds, sections above getFilledHeight are air and never allocated
+        #Read from path instead when pregenerate.py stored the chunk there
+        ids = self.readGenerated(path) if path and os.path.isfile(path) else None
+
+        if ids is None :
+            ids = self.generate(self.getFilledHeight())
+
+        return [compactIds(ids[:, i*sectionHeight:(i+1)*sectionHeight, :]) if i*sectionHeight < ids.shape[1] else generationIds["air"]
+                for i in range(self.height // sectionHeight)]
+
+    def writeGenerated(self, path) : #Generates the chunk and stores it with its column heights, for generateSections to read
+        ids = self.generate(self.getFilledHeight())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path + ".tmp", "wb") as f :
+            np.savez_compressed(f, ids=ids, heightMap=self.heightMap.astype(np.int16), generator=self.worldGen.version, height=self.height)
+
+        os.replace(path + ".tmp", path)
+
+    def readGenerated(self, path) : #None when the file can't be read or was generated for another generator or world height
+        try :
+            with np.load(path) as f :
+                if int(f["generator"]) != self.worldGen.version or int(f["height"]) != self.height :
+                    return None
+
+                self.heightMap = f["heightMap"].astype(np.int64)
+                return f["ids"]
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e :
+            print(f"WARNING: could not read generated chunk {self.chunkX}_{self.chunkZ} ({e}), generating it again")
+            return None
+
+    #Generator version 1, block by block with the same quirks, so older worlds still match their saved chunks
+
+    def generateLegacyHeight(self, ids) :
         for x in range(chunkSize) :
             for z in range(chunkSize) :
-                terrainHeight = self.worldGen.getTerrainY(x+(self.chunkX*16), z+(self.chunkZ*16), 5, 14)
-                self.heightMap[(x, z)] = terrainHeight
+                terrainHeight = int(self.heightMap[x, z])
                 for y in range(terrainHeight-3) :
-                    self.blocks[x][y][z].changeId("stone")
+                    ids[x][y][z] = generationIds["stone"]
                 for y in range(terrainHeight-3, terrainHeight) :
-                    self.blocks[x][y][z].changeId("dirt")
+                    ids[x][y][z] = generationIds["dirt"]
                 
                 if y >= waterLevel-1 :
-                    self.blocks[x][terrainHeight][z].changeId("grass")
+                    ids[x][terrainHeight][z] = generationIds["grass"]
                 else :
-                    self.blocks[x][terrainHeight][z].changeId("gravel")
+                    ids[x][terrainHeight][z] = generationIds["gravel"]
+
+    def generateLegacyTrees(self, ids) :
+        log, leaves = generationIds["log"], generationIds["leaves"]
 
-    def generateTrees(self) :
         for x in range(chunkSize) :
             for z in range(chunkSize) :
-                terrainHeight = self.heightMap[x, z] + 1
+                terrainHeight = int(self.heightMap[x, z]) + 1
 
                 if terrainHeight <= waterLevel :
                     return False
@@ -91,128 +293,191 @@ class Chunk :
 
                     #Logs
                     for y in range(terrainHeight, terrainHeight + tree["height"]) :
-                        self.blocks[x][y][z].changeId("log")
+                        ids[x][y][z] = log
                     
                     #Leaves base
                     for leaveX in range(5) :
                         for leaveZ in range(5) :
                             try :
                                 if not tree["leavesToRemove"][leaveX*leaveZ] :
-                                    self.blocks[x + leaveX - 2][terrainHeight + tree["height"] - 3][z + leaveZ - 2].changeId("leaves")
+                                    ids[x + leaveX - 2][terrainHeight + tree["height"] - 3][z + leaveZ - 2] = leaves
 
                                 if (leaveX in range(1,4)) and (leaveZ in range(1,4)) :
-                                    self.blocks[x + leaveX - 2][terrainHeight + tree["height"] - 2][z + leaveZ - 2].changeId("leaves")
+                                    ids[x + leaveX - 2][terrainHeight + tree["height"] - 2][z + leaveZ - 2] = leaves
                                     if not tree["leavesToRemove"][leaveX+leaveZ] :
-                                        self.blocks[x + leaveX - 2][terrainHeight + tree["height"] - 1][z + leaveZ - 2].changeId("leaves")
-                                        self.blocks[x + leaveX - 2][terrainHeight + tree["height"] - 3][z + leaveZ - 0].changeId("leaves")
+                                        ids[x + leaveX - 2][terrainHeight + tree["height"] - 1][z + leaveZ - 2] = leaves
+                                        ids[x + leaveX - 2][terrainHeight + tree["height"] - 3][z + leaveZ - 0] = leaves
                             except IndexError : #Leaves out of chunk
                                 pass
 
-    def generateWater(self) :
-        for y in range(waterLevel + 1) :
-            for x in range(chunkSize) :
-                for z in range(chunkSize) :
-                    if self.blocks[x][y][z].id == "air" :
-                        self.blocks[x][y][z].changeId("water")
+class Chunk :
+    def __init__(self, app, chunkCoords=(0,0)) -> None:
+        self.app = app
+        self.worldGen = app.scene.worldGen
+
+        self.size = chunkSize
+        self.height = app.scene.worldHeight
+        self.totalBlockCount = chunkSize*chunkSize*self.height
+
+        self.chunkX = chunkCoords[0]
+        self.chunkZ = chunkCoords[1]
+
+        self.heightMap = None #Surface height of every column
+        self.skyHeights = None #Height above the highest light blocking block of every column, set once the chunk is lit
 
-    def generate(self) :
-        self.generateHeight()
-        self.generateTrees()
-        self.generateWater()
+        startTime = time.time()
+
+        generator = ChunkGenerator(self.worldGen, self.chunkX, self.chunkZ, self.height)
+        self.sections = [Section(app, self, i, getPaletteBlocks(blocks)) for i, blocks in enumerate(generator.generateSections(self.getGeneratedPath()))]
+        self.heightMap = generator.heightMap
+
+        self.modified = False #Changed since it was generated, loaded or saved
+        self.meshed = False #Every section got its first mesh
+        
+        if not noSave :
+            self.loadChunk()
+
+        #print(f"Chunk generation took {round(time.time() - startTime, 2)} seconds. {self.totalBlockCount} blocks generated ({round((time.time() - startTime) / (self.totalBlockCount), 3)}s per block).")
 
     def unload(self) :
-        if self.app.inGame :
+        if self.app.inGame and self.modified :
             self.saveChunk()
         
-        for x in range(chunkSize) :
-            for y in range(heightLimit) :
-                for z in range(chunkSize) :
-                    self.blocks[x][y][z].destroy()
+        for section in self.sections :
+            section.destroy()
     
+    def getNumericId(self, x, y, z) : #Chunk relative coordinates, may point into a loaded neighbor chunk, -1 where nothing is loaded
+        if not 0 <= y < self.height :
+            return -1
+
+        if 0 <= x < chunkSize and 0 <= z < chunkSize :
+            return self.sections[y // sectionHeight].getBlockId(x, y % sectionHeight, z)
+
+        x, z = x + (self.chunkX * chunkSize), z + (self.chunkZ * chunkSize)
+        chunk = self.app.scene.chunkObjectFromBlockCoords(x, z)
+
+        if chunk :
+            return chunk.getNumericId(x - (chunk.chunkX * chunkSize), y, z - (chunk.chunkZ * chunkSize))
+
+        return -1
+
     def getBlockID(self, x, y, z) :
-        try :
-            return self.blocks[x][y][z].id
-        except IndexError :
-            x, y, z = x + (self.chunkX * chunkSize), y, z + (self.chunkZ * chunkSize)
-            chunk = self.app.scene.chunkObjectFromBlockCoords(x, z)
+        numericId = self.getNumericId(x, y, z)
 
-            if chunk :
-                block = chunk.getBlockFromAbsoulteCoords((x, y, z))
-                if block :
-                    return block.id
+        return registry.names[numericId] if numericId != -1 else None
 
-            return None
-    
-    def cullBlock(self, pos) :
+    def getBlock(self, x, y, z) : #Chunk relative coordinates, None outside of this chunk
+        if 0 <= x < chunkSize and 0 <= y < self.height and 0 <= z < chunkSize :
+            return Block(self.app, self, (x+(self.chunkX*chunkSize), y, z+(self.chunkZ*chunkSize)))
+
+        return None
+
+    def getBlockFromAbsoulteCoords(self, pos) :
         x, y, z = pos
+        x, y, z = round(x), round(y), round(z)
+        
+        return self.getBlock(x - (self.chunkX*chunkSize), y, z - (self.chunkZ*chunkSize))
 
-        try :
-            self.blocks[x][y][z].cull(surroundingBlocks=[self.getBlockID(x+1,y,z), self.getBlockID(x-1,y,z), self.getBlockID(x,y+1,z), self.getBlockID(x,y-1,z), self.getBlockID(x,y,z+1), self.getBlockID(x,y,z-1)])
-        except IndexError :
-            pass
+    def setBlockId(self, pos, newId) :
+        x, y, z = pos
+        newId = registry.ids[newId]
+        section = self.sections[y // sectionHeight]
+        oldId = section.getBlockId(x, y % sectionHeight, z)
 
-    def cullAllBlocks(self) :
-        for x in range(chunkSize) :
-            for y in range(heightLimit) :
-                for z in range(chunkSize) :
-                    self.cullBlock( (x, y, z) )
+        if oldId == newId :
+            return
 
-    def cullBorders(self) :
-        for x in range(chunkSize) :
-            for y in range(heightLimit) :
-                self.cullBlock((x, y, 0))
-                self.cullBlock((0, y, x))
-                self.cullBlock((x*-1, y, chunkSize-1))
-                self.cullBlock((chunkSize-1, y, x*-1))
+        section.setBlockId(x, y % sectionHeight, z, newId)
+        self.app.scene.lightEngine.updateBlock(self, pos, oldId, newId)
+
+        #The chunk now differs from what was generated or loaded
+        self.modified = True
+        self.markDirty(y, visibility=True)
+
+        #Faces of the neighbors may have been hidden or uncovered, they can be in other sections or chunks
+        for dx, dy, dz in faceDirections :
+            self.markBlockDirty((x + dx, y + dy, z + dz))
 
-    def cullNeighbors(self, pos) :
+    def markBlockDirty(self, pos) : #Chunk relative coordinates, may point into a loaded neighbor chunk
         x, y, z = pos
 
-        self.cullBlock( (x+1, y+0, z+0) )
-        self.cullBlock( (x-1, y+0, z+0) )
-        self.cullBlock( (x+0, y+1, z+0) )
-        self.cullBlock( (x+0, y-1, z+0) )
-        self.cullBlock( (x+0, y+0, z+1) )
-        self.cullBlock( (x+0, y+0, z-1) )
+        if not 0 <= y < self.height :
+            return
+
+        if 0 <= x < chunkSize and 0 <= z < chunkSize :
+            self.markDirty(y)
+            return
+
+        absoluteX, absoluteZ = x + (self.chunkX * chunkSize), z + (self.chunkZ * chunkSize)
+        chunk = self.app.scene.chunkObjectFromBlockCoords(absoluteX, absoluteZ)
+
+        if chunk :
+            chunk.markDirty(y)
+
+    def markDirty(self, y, visibility=False) : #The faces of a block at height y may have changed, or its id when visibility is set
+        section = self.sections[y // sectionHeight]
+        section.meshDirty = True
+
+        if visibility :
+            section.visibilityDirty = True
+
+    def getFaceCount(self) :
+        return sum(section.faceCount for section in self.sections)
+
+    def getQuadCount(self) :
+        return sum(section.mesh.quadCount for section in self.sections)
+    
+    def getNeighborSection(self, section, face) : #Section touching a face of a section, None when not loaded or outside the world
+        dx, dy, dz = faceDirections[face]
+
+        if dy :
+            index = section.index + dy
+            return self.sections[index] if 0 <= index < len(self.sections) else None
+
+        chunk = self.app.scene.loadedChunks.get((self.chunkX + dx, self.chunkZ + dz))
+        return chunk.sections[section.index] if chunk else None
+
+    def cullBorders(self) : #A neighbor chunk was loaded, faces towards it may now be hidden
+        for section in self.sections :
+            if not section.isEmpty() :
+                section.meshDirty = True
     
     def attemptToSpreadFluid(self, pos, fluidBlockId, depth=9999) :
         x, y, z = pos
 
-        try :
-            block = self.blocks[x][y][z]
-            
-            if "brokenByFluids" in block.flags :
-                block.changeId(fluidBlockId)
+        if not (0 <= x < chunkSize and 0 <= z < chunkSize) : #Attempt to spread fluid to neighbor chunk, if loaded
+            absoluteX, absoluteZ = x + (self.chunkX * chunkSize), z + (self.chunkZ * chunkSize)
+            chunk = self.app.scene.chunkObjectFromBlockCoords(absoluteX, absoluteZ)
 
-                self.updateNeighborFluids(pos, depth=depth - 1)
-                self.cullNeighbors(pos)
-        except IndexError :
-            if (abs(x) >= chunkSize) or (abs(z) >= chunkSize) : #Attempt to spread fluid to neighbor chunk, if loaded
-                absoluteX, absoluteZ = x + (self.chunkX * chunkSize), z + (self.chunkZ * chunkSize)
-                chunk = self.app.scene.chunkObjectFromBlockCoords(absoluteX, absoluteZ)
+            if chunk :
+                chunk.attemptToSpreadFluid((absoluteX - (chunk.chunkX * chunkSize), y, absoluteZ - (chunk.chunkZ * chunkSize)), fluidBlockId, depth=depth - 1)
+            return
 
-                if chunk :
-                    block = chunk.getBlockFromAbsoulteCoords( (absoluteX, y, absoluteZ) )
-                    if block :
-                        chunk.attemptToSpreadFluid(block.chunkRelativePos, fluidBlockId, depth=depth - 1)
+        numericId = self.getNumericId(x, y, z)
+            
+        if numericId != -1 and registry.brokenByFluids[numericId] :
+            self.setBlockId(pos, fluidBlockId)
 
+            self.updateNeighborFluids(pos, depth=depth - 1)
 
     def updateFluid(self, pos, depth=9999) :
         x, y, z = pos
 
-        try :
-            block = self.blocks[x][y][z]
+        if not (0 <= x < chunkSize and 0 <= z < chunkSize) :
+            return
+
+        numericId = self.getNumericId(x, y, z)
 
-            if not block.isFluid :
-                return
+        if not registry.fluid[numericId] :
+            return
+
+        blockId = registry.names[numericId]
 
-            self.attemptToSpreadFluid( (x+1, y+0, z+0), block.id, depth=depth )
-            self.attemptToSpreadFluid( (x-1, y+0, z+0), block.id, depth=depth )
-            self.attemptToSpreadFluid( (x+0, y-1, z+0), block.id, depth=depth )
-            self.attemptToSpreadFluid( (x+0, y+0, z+1), block.id, depth=depth )
-            self.attemptToSpreadFluid( (x+0, y+0, z-1), block.id, depth=depth )
-        except IndexError :
-            pass
+        self.attemptToSpreadFluid( (x+1, y+0, z+0), blockId, depth=depth )
+        self.attemptToSpreadFluid( (x-1, y+0, z+0), blockId, depth=depth )
+        self.attemptToSpreadFluid( (x+0, y-1, z+0), blockId, depth=depth )
+        self.attemptToSpreadFluid( (x+0, y+0, z+1), blockId, depth=depth )
+        self.attemptToSpreadFluid( (x+0, y+0, z-1), blockId, depth=depth )
 
     def updateNeighborFluids(self, pos, depth=50) :
         x, y, z = pos
@@ -229,49 +494,102 @@ class Chunk :
         self.updateFluid( (x+0, y+0, z+1), depth=depth )
         self.updateFluid( (x+0, y+0, z-1), depth=depth )
 
-    def chunkToDict(self) :
-        j = {}
-
+    def chunkToDict(self) : #Only stores the blocks that differ from the generated baseline
         blocksPallete = {}
         blocksPalleteIndex = 0
 
-        blocks = []
+        changes = []
 
-        for x in range(chunkSize) :
-            blocks.append([])
-            for y in range(heightLimit) :
-                blocks[x].append([])
-                for z in range(chunkSize) :
-                    block = self.blocks[x][y][z]
+        #Generation is deterministic, so the baseline is generated again here instead of being kept by every loaded chunk
+        generated = ChunkGenerator(self.worldGen, self.chunkX, self.chunkZ, self.height).generateSections(self.getGeneratedPath())
 
-                    if not block.id in blocksPallete :
-                        blocksPallete[block.id] = blocksPalleteIndex
-                        blocksPalleteIndex += 1
+        for section in self.sections :
+            baseline = getPaletteBlocks(generated[section.index])
 
-                    blocks[x][y].append(blocksPallete[block.id])
+            if section.isUniform() and isinstance(baseline, int) and section.blocks == baseline : #Untouched uniform section
+                continue
+
+            for x, y, z in zip(*np.nonzero(section.getArray() != baseline)) :
+                blockId = registry.names[section.getBlockId(x, y, z)]
+
+                if not blockId in blocksPallete :
+                    blocksPallete[blockId] = blocksPalleteIndex
+                    blocksPalleteIndex += 1
+
+                changes.append(int((x * self.height + section.index * sectionHeight + y) * chunkSize + z))
+                changes.append(blocksPallete[blockId])
         
-        j["dimensions"] = (chunkSize, heightLimit)
-        j["pallete"] = list(blocksPallete)
-        j["blocks"] = blocks
-        j["timestamp"] = round(time.time())
+        return makeChunkDict(self.worldGen.version, self.height, list(blocksPallete), changes)
+
+    def getSavePath(self) :
+        directory = os.path.join("saves", self.app.scene.worldId, "chunks")
+        path = os.path.join(directory, f"{self.chunkX}_{self.chunkZ}.json")
 
-        return j
+        return directory, path
+
+    def getGeneratedPath(self) : #None when nothing is read from or written to the save
+        return None if noSave else getGeneratedPath(self.app.scene.worldId, self.chunkX, self.chunkZ)
     
     def saveChunk(self) :
         if noSave :
             return
 
         j = self.chunkToDict()
+        snapshot = self.app.scene.chunkSnapshot
 
-        directory = os.path.join("saves", self.app.scene.worldId, "chunks")
-        path = os.path.join(directory, f"{self.chunkX}_{self.chunkZ}.json")
+        if snapshot != None : #Replaying, kept in memory like the chunk file would have been
+            snapshot.pop(f"{self.chunkX}_{self.chunkZ}", None)
+            if len(j["changes"]) :
+                snapshot[f"{self.chunkX}_{self.chunkZ}"] = j
+
+            self.modified = False
+            return
+
+        directory, path = self.getSavePath()
+
+        if len(j["changes"]) == 0 : #Identical to the generated chunk, nothing to store
+            if os.path.isfile(path) :
+                os.remove(path)
+            
+            self.modified = False
+            return
 
         os.makedirs(directory, exist_ok=True)
+        writeChunkFile(path, j)
+        
+        self.modified = False
 
-        with open(path, "w") as f :
-            f.write(json.dumps(j).replace(' ', ''))
+    def loadBlockId(self, x, y, z, blockId) : #Sets a block while loading, before the chunk is culled and meshed
+        if 0 <= y < self.height :
+            self.sections[y // sectionHeight].setBlockId(x, y % sectionHeight, z, registry.ids[blockId], compact=False)
         
     def dictToChunk(self, j) :
+        if j.get("format", 1) < 2 : #Older saves store every block
+            self.legacyDictToChunk(j)
+            self.modified = True #Rewritten as a delta on the next save
+            return
+
+        if j["generator"] != self.worldGen.version :
+            print(f"WARNING: chunk {self.chunkX}_{self.chunkZ} was saved with world generator {j['generator']}, but the world uses {self.worldGen.version}")
+
+        blocksPallete = j["pallete"]
+        changes = j["changes"]
+        _, heightLimit = j["dimensions"]
+
+        for i in range(0, len(changes), 2) :
+            index, blockPalleteIndex = changes[i], changes[i+1]
+
+            x, rest = divmod(index, heightLimit * chunkSize)
+            y, z = divmod(rest, chunkSize)
+
+            self.loadBlockId(x, y, z, blocksPallete[blockPalleteIndex])
+
+        for section in self.sections :
+            section.compact()
+        
+        self.modified = False
+
+    def legacyDictToChunk(self, j) :
         blocksPallete = j["pallete"]
         blocks = j["blocks"]
         chunkSize, heightLimit = j["dimensions"]
@@ -282,11 +600,22 @@ class Chunk :
                     blockPalleteIndex = blocks[x][y][z]
                     blockId = blocksPallete[blockPalleteIndex]
 
-                    self.blocks[x][y][z].changeId(blockId)
+                    self.loadBlockId(x, y, z, blockId)
+
+        for section in self.sections :
+            section.compact()
 
     def loadChunk(self) :
-        directory = os.path.join("saves", self.app.scene.worldId, "chunks")
-        path = os.path.join(directory, f"{self.chunkX}_{self.chunkZ}.json")
+        snapshot = self.app.scene.chunkSnapshot
+
+        if snapshot != None :
+            if not f"{self.chunkX}_{self.chunkZ}" in snapshot :
+                return False
+
+            self.dictToChunk(snapshot[f"{self.chunkX}_{self.chunkZ}"])
+            return True
+
+        directory, path = self.getSavePath()
 
         if not os.path.isfile(path) :
             return False
@@ -298,21 +627,28 @@ class Chunk :
         
         return True
 
-    def getBlockFromAbsoulteCoords(self, pos) :
-        x, y, z = pos
-        x, y, z = round(x), round(y), round(z)
-        
-        try :
-            return self.blocks[x - (self.chunkX*chunkSize)][y][z - (self.chunkZ*chunkSize)]
-        except IndexError :
-            return None
+    def getOpenBlocks(self, section) : #Whether the blocks of a section can be seen through, for the whole section when it is uniform
+        return registry.open[section.blocks]
 
-    def render(self) :
-        startTime = time.time()
+    def updateVisibility(self) : #Recomputes the visibility graph of sections whose blocks changed
+        for section in self.sections :
+            if section.visibilityDirty :
+                section.updateVisibility(self.getOpenBlocks(section))
 
-        for x in range(chunkSize) :
-            for y in range(heightLimit) :
-                for z in range(chunkSize) :
-                    self.blocks[x][y][z].render()
-    
-        #print(f"Chunk rendering took {round(time.time() - startTime, 3)} seconds. ({round((time.time() - startTime) / (self.totalBlockCount), 3)}s per block)")
\ No newline at end of file
+    def isMeshed(self) : #Far terrain is drawn in place of the chunk until it is
+        if not self.meshed :
+            self.meshed = not any(section.meshDirty or section.meshPending for section in self.sections)
+
+        return self.meshed
+
+    def render(self, visibleSections=None) : #Draws every section, or only the ones in visibleSections
+        drawn = 0
+
+        for section in self.sections :
+            if visibleSections != None and not (self.chunkX, section.index, self.chunkZ) in visibleSections :
+                continue
+
+            section.render()
+            drawn += 1
+
+        return drawn
\ No newline at end of file
@@ -4,7 +4,11 @@ import os
 
 defaultConfig = {"renderDistance": 1, "fpsLimit": 60, "keybinds": {"forward": pg.K_w + 5, "backwards": pg.K_s + 5, "left": pg.K_a + 5, "right": pg.K_d + 5,
                 "jump": pg.K_SPACE + 5, "blockPlace": 2, "blockPick": 1, "blockBreak": 0, "wireframe": pg.K_g + 5, "debugInfo": pg.K_h + 5},
-                "mouseSensitivity": 10, "fov": 70, "volume": 1.0, "fullscreen": False}
+                "mouseSensitivity": 10, "fov": 70, "volume": 1.0, "fullscreen": False, "greedyMeshing": True, "sectionCulling": True, "diskHeightCache": True,
+                "lodDistances": [[6, 2], [10, 4], [16, 8]], #Far terrain resolution schedule, [up to distance in chunks, cell size in blocks]
+                "renderGovernor": False, "renderDistanceBounds": [1, 8], "lodScaleBounds": [0.5, 1.0], "chunkLoadBounds": [1, 8], #Ranges the governor adjusts within
+                "dynamicResolution": False, "resolutionScaleBounds": [0.5, 1.0], #Scene resolution as a fraction of the window
+                "voxelLighting": True}
 
 class Config :
     def __init__(self, app) -> None :
@@ -27,6 +31,17 @@ class Config :
         self.volume = self.config["volume"]
         self.fov = self.config["fov"]
         self.fullscreen = self.config["fullscreen"]
+        self.greedyMeshing = self.config.get("greedyMeshing", defaultConfig["greedyMeshing"]) #Missing from older settings files
+        self.lodDistances = self.config.get("lodDistances", defaultConfig["lodDistances"])
+        self.sectionCulling = self.config.get("sectionCulling", defaultConfig["sectionCulling"])
+        self.diskHeightCache = self.config.get("diskHeightCache", defaultConfig["diskHeightCache"])
+        self.renderGovernor = self.config.get("renderGovernor", defaultConfig["renderGovernor"])
+        self.renderDistanceBounds = self.config.get("renderDistanceBounds", defaultConfig["renderDistanceBounds"])
+        self.lodScaleBounds = self.config.get("lodScaleBounds", defaultConfig["lodScaleBounds"])
+        self.chunkLoadBounds = self.config.get("chunkLoadBounds", defaultConfig["chunkLoadBounds"])
+        self.dynamicResolution = self.config.get("dynamicResolution", defaultConfig["dynamicResolution"])
+        self.resolutionScaleBounds = self.config.get("resolutionScaleBounds", defaultConfig["resolutionScaleBounds"])
+        self.voxelLighting = self.config.get("voxelLighting", defaultConfig["voxelLighting"])
 
     def updateDict(self) :
         self.config["renderDistance"] = self.renderDistance
@@ -36,6 +51,17 @@ class Config :
         self.config["volume"] = self.volume
         self.config["fov"] = self.fov
         self.config["fullscreen"] = self.fullscreen
+        self.config["greedyMeshing"] = self.greedyMeshing
+        self.config["lodDistances"] = self.lodDistances
+        self.config["sectionCulling"] = self.sectionCulling
+        self.config["diskHeightCache"] = self.diskHeightCache
+        self.config["renderGovernor"] = self.renderGovernor
+        self.config["renderDistanceBounds"] = self.renderDistanceBounds
+        self.config["lodScaleBounds"] = self.lodScaleBounds
+        self.config["chunkLoadBounds"] = self.chunkLoadBounds
+        self.config["dynamicResolution"] = self.dynamicResolution
+        self.config["resolutionScaleBounds"] = self.resolutionScaleBounds
+        self.config["voxelLighting"] = self.voxelLighting
 
     def writeToFile(self) :
         self.updateDict()
@@ -0,0 +1,116 @@
+#Rewrites every chunk of a world in the current chunk format, spread over worker processes
+#Chunks already in the current format are skipped, so an interrupted run continues where it stopped
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from chunk import ChunkGenerator, chunkFormat, defaultHeight, decodeChunkDict, encodeChunkDict, writeChunkFile
+from saveManager import savesDirectory
+from worldGen import WorldGen
+
+progressInterval = 1 #Seconds between progress lines
+
+#Worker process side
+
+worldGen = None
+
+def initWorker(seed, generator) :
+    global worldGen
+    worldGen = WorldGen(seed, version=generator)
+
+def convertChunk(path, height, dryRun) : #Returns the path and what happened to it
+    with open(path, "r") as f :
+        j = json.loads(f.read())
+
+    if j.get("format", 1) >= chunkFormat :
+        return path, "current"
+
+    chunkX, chunkZ = (int(coord) for coord in os.path.splitext(os.path.basename(path))[0].split("_"))
+    baseline = ChunkGenerator(worldGen, chunkX, chunkZ, height).generate()
+
+    blocks = decodeChunkDict(j, baseline)
+    converted = encodeChunkDict(blocks, baseline, worldGen.version)
+
+    #Read back exactly as the game will, through JSON, before anything is replaced
+    if not (decodeChunkDict(json.loads(json.dumps(converted)), baseline) == blocks).all() :
+        return path, "failed"
+
+    if dryRun :
+        return path, "converted"
+
+    if len(converted["changes"]) == 0 : #Identical to the generated chunk, the game doesn't store those
+        os.remove(path)
+        return path, "removed"
+
+    writeChunkFile(path, converted)
+    return path, "converted"
+
+#Main process side
+
+def readWorldInfo(worldId) :
+    with open(os.path.join(savesDirectory, worldId, "info.json"), "r") as f :
+        j = json.loads(f.read())
+
+    return j["seed"], j.get("generator", 1), j.get("height", defaultHeight)
+
+def getChunkFiles(worldId) :
+    directory = os.path.join(savesDirectory, worldId, "chunks")
+
+    if not os.path.isdir(directory) :
+        return []
+
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".json")]
+
+def convertWorld(worldId, processes, dryRun) :
+    seed, generator, height = readWorldInfo(worldId)
+    paths = getChunkFiles(worldId)
+
+    print(f"CONVERT: {worldId}, {len(paths)} chunk files, generator {generator}, height {height}")
+
+    results = {"converted": 0, "removed": 0, "current": 0, "failed": 0}
+    startTime = lastProgress = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=initWorker, initargs=(seed, generator)) as executor :
+        futures = {executor.submit(convertChunk, path, height, dryRun): path for path in paths}
+
+        for done, future in enumerate(as_completed(futures), start=1) :
+            try :
+                _, result = future.result()
+                if result == "failed" :
+                    print(f"CONVERT: {futures[future]} did not survive the round trip, left as it was")
+            except Exception as e :
+                print(f"CONVERT: Failed to convert {futures[future]}: {e}")
+                result = "failed"
+
+            results[result] += 1
+
+            now = time.perf_counter()
+            if now - lastProgress >= progressInterval or done == len(paths) :
+                lastProgress = now
+                print(f"CONVERT: {done}/{len(paths)} chunks, {done / max(now - startTime, 1e-9):.1f} chunks/sec")
+
+    print(f"CONVERT: {worldId} done, " + ", ".join(f"{count} {result}" for result, count in results.items()))
+
+    return results["failed"] == 0
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description="Convert saved chunks to the current chunk format")
+    parser.add_argument("worlds", nargs="*", help="ids of the worlds to convert, their directory names in saves")
+    parser.add_argument("--all", action="store_true", help="convert every world in saves")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes, defaults to one per CPU")
+    parser.add_argument("--dry-run", action="store_true", help="convert and verify every chunk without writing anything")
+    args = parser.parse_args()
+
+    worldIds = args.worlds
+    if args.all :
+        worldIds = sorted(dir for dir in os.listdir(savesDirectory) if os.path.isfile(os.path.join(savesDirectory, dir, "info.json")))
+
+    if not worldIds :
+        parser.error("no worlds given, pass world ids or --all")
+
+    success = all([convertWorld(worldId, args.processes, args.dry_run) for worldId in worldIds])
+
+    if not success :
+        raise SystemExit(1)
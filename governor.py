@@ -0,0 +1,117 @@
+from collections import deque
+
+frameWindow = 60 #Frames in the rolling frame time average
+slowThreshold = 1.1 #Quality drops when frames take this much longer than the FPS limit allows
+fastThreshold = 0.7 #and rises when they take less than this much of it
+slowFrames = 30 #Frames the average has to stay past a threshold before anything changes
+fastFrames = 180 #Rising waits longer than dropping, so a level that was just too slow isn't retried right away
+qualityStep = 0.125
+
+def lerp(bounds, t) :
+    low, high = bounds
+    return low + (high - low) * t
+
+class RenderGovernor : #Trades load radius, far terrain distance and chunk loads per frame for frame time, when enabled in the settings, stepped by FrameTimeMonitor
+    def __init__(self, app) -> None :
+        self.app = app
+        self.config = app.config
+
+        self.quality = None #0 to 1 between the lower and upper bounds, starts at the configured render distance
+
+    def isEnabled(self) : #Off while replaying, replays must not depend on how fast the machine runs them
+        return self.config.renderGovernor and not self.app.input.replaying
+
+    def getQuality(self) :
+        if self.quality == None :
+            low, high = self.config.renderDistanceBounds
+            self.quality = min(max((self.config.renderDistance - low) / max(high - low, 1), 0), 1)
+
+        return self.quality
+
+    def getRenderDistance(self) :
+        if not self.isEnabled() :
+            return self.config.renderDistance
+
+        return round(lerp(self.config.renderDistanceBounds, self.getQuality()))
+
+    def getLodScale(self) :
+        if not self.isEnabled() :
+            return 1
+
+        return lerp(self.config.lodScaleBounds, self.getQuality())
+
+    def getLodDistances(self) : #[up to distance in chunks, cell size in blocks], scaled down with the quality
+        scale = self.getLodScale()
+        return [[max(1, round(maxDistance * scale)), step] for maxDistance, step in self.config.lodDistances]
+
+    def getChunkLoadBudget(self) : #Chunks loaded per frame, None for no limit
+        if not self.isEnabled() :
+            return None
+
+        return round(lerp(self.config.chunkLoadBounds, self.getQuality()))
+
+    def step(self, direction) : #One quality step down (-1) or up (1), returns whether anything changed
+        quality = min(max(self.getQuality() + direction * qualityStep, 0), 1)
+
+        if quality == self.getQuality() :
+            return False
+
+        self.quality = quality
+        self.app.camera.updateProjM() #Far plane follows the terrain distance
+        return True
+
+    def reset(self) : #Starts over from the configured render distance
+        self.quality = None
+        self.app.frameMonitor.reset()
+        self.app.camera.updateProjM()
+
+class FrameTimeMonitor : #Averages frame times for the controllers trading quality for them, and lets one of them step at a time
+    def __init__(self, app, controllers) -> None :
+        self.app = app
+        self.config = app.config
+
+        #Dropping asks them in this order, rising in the reverse one, so the last to drop is the first to rise again
+        self.controllers = controllers
+
+        self.frameTimes = deque(maxlen=frameWindow) #Milliseconds of work per frame, without the time waited for the FPS limit
+        self.slowCount = 0
+        self.fastCount = 0
+
+    def getAverageFrameTime(self) :
+        if not self.frameTimes :
+            return 0
+
+        return sum(self.frameTimes) / len(self.frameTimes)
+
+    def tick(self, frameTime) :
+        controllers = [controller for controller in self.controllers if controller.isEnabled()]
+
+        if not controllers or not self.app.inGame or self.app.gamePaused :
+            return
+
+        self.frameTimes.append(frameTime)
+        if len(self.frameTimes) < frameWindow :
+            return
+
+        target = 1000 / self.config.fpsLimit
+        average = self.getAverageFrameTime()
+
+        self.slowCount = self.slowCount + 1 if average > target * slowThreshold else 0
+        self.fastCount = self.fastCount + 1 if average < target * fastThreshold else 0
+
+        if self.slowCount >= slowFrames :
+            self.step(controllers, -1)
+        elif self.fastCount >= fastFrames :
+            self.step(list(reversed(controllers)), 1)
+
+    def step(self, controllers, direction) : #Only the first controller that can still change steps, then the new level is measured from scratch
+        for controller in controllers :
+            if controller.step(direction) :
+                break
+
+        self.reset()
+
+    def reset(self) :
+        self.frameTimes.clear()
+        self.slowCount = 0
+        self.fastCount = 0
@@ -0,0 +1,371 @@
+from collections import deque
+import numpy as np
+
+from block import registry
+from chunk import chunkSize
+from section import sectionHeight, sectionShape, faceDirections, getFaceSlice
+
+#Light levels are packed into one byte per block, sky light in the high nibble and block light in the low one
+maxLight = 15
+skyShift = 4
+blockShift = 0
+outsideLight = maxLight << skyShift #Blocks outside the loaded world, faces towards them are lit like open sky
+
+brightnessShift = 12 #Brightness bits of the second packed vertex word, see packVertex
+ambientBrightness = 0.05 #Brightness of faces no light reaches
+lightSpillsPerFrame = 2 #Chunk faces whose light is spread into a neighbor chunk per frame
+
+def getLightCurve() : #Brightness of every light level, each level is a bit dimmer than the one above it, more so the darker it gets
+    ratios = np.arange(maxLight + 1) / maxLight
+    return ambientBrightness + (1 - ambientBrightness) * ratios / (4 - 3 * ratios)
+
+lightCurve = getLightCurve()
+
+def getLightLevels(light) : #The brighter of the sky and block light of packed levels
+    return np.maximum(light >> skyShift, light & maxLight)
+
+def applyLight(attributes, light) :
+    #Packed vertex attributes with their brightness scaled by the packed light levels their faces are seen from
+    shade = (attributes >> brightnessShift) & 255
+    brightness = np.rint(shade * lightCurve[getLightLevels(light)]).astype(np.uint32)
+
+    return (attributes & ~np.uint32(255 << brightnessShift)) | (brightness << brightnessShift)
+
+def compactLight(light) : #A single value when every block of a section has the same light, otherwise a copy of the array
+    if (light == light.flat[0]).all() :
+        return int(light.flat[0])
+
+    return light.copy()
+
+def getPaddedFaceSlice(face) : #Index of the padding layer on a face of an array padded by one block on every side
+    axis = face // 2
+    index = [slice(1, -1)] * 3
+    index[axis] = -1 if face % 2 == 0 else 0
+    return tuple(index)
+
+def propagateLight(levels, opaque, sources) :
+    #Spreads padded levels through non-opaque blocks until nothing changes, losing one level per block, the padding stays fixed
+    inner = levels[1:-1, 1:-1, 1:-1]
+    inner[:] = sources
+
+    for i in range(maxLight) :
+        spread = np.maximum.reduce([levels[2:, 1:-1, 1:-1], levels[:-2, 1:-1, 1:-1], levels[1:-1, 2:, 1:-1],
+                                    levels[1:-1, :-2, 1:-1], levels[1:-1, 1:-1, 2:], levels[1:-1, 1:-1, :-2]])
+        spread = np.maximum(spread, 1) - 1
+        spread[opaque] = 0
+        spread = np.maximum(spread, sources)
+
+        if (spread == inner).all() :
+            break
+
+        inner[:] = spread
+
+def getSkyHeights(opaque) : #Height above the highest light blocking block of every column of an [x, y, z] array
+    height = opaque.shape[1]
+    return np.where(opaque.any(axis=1), height - np.argmax(opaque[:, ::-1, :], axis=1), 0).astype(np.int32)
+
+def computeChunkLight(ids, borders=(None, None, None, None)) :
+    #Packed sky and block light of an [x, y, z] array of block ids, with the sky height of every column
+    #borders are the packed light layers of the chunks touching its +x, -x, +z and -z faces, None where nothing is loaded
+    opaque = registry.lightOpaque[ids]
+    skyHeights = getSkyHeights(opaque)
+
+    skySources = np.where(np.arange(ids.shape[1])[None, :, None] >= skyHeights[:, None, :], maxLight, 0).astype(np.uint8)
+    blockSources = registry.lightEmission[ids]
+
+    light = np.zeros(ids.shape, dtype=np.uint8)
+
+    for shift, sources, above in ((skyShift, skySources, maxLight), (blockShift, blockSources, 0)) :
+        levels = np.zeros((ids.shape[0] + 2, ids.shape[1] + 2, ids.shape[2] + 2), dtype=np.uint8)
+        levels[:, -1, :] = above
+
+        for face, border in zip((0, 1, 4, 5), borders) :
+            if border is not None :
+                levels[getPaddedFaceSlice(face)] = (border >> shift) & maxLight
+
+        propagateLight(levels, opaque, sources)
+        light |= levels[1:-1, 1:-1, 1:-1] << shift
+
+    return light, skyHeights
+
+class LightEngine : #Sky light from column heights and block light from emissive blocks, baked into the section meshes
+    def __init__(self, app) -> None :
+        self.app = app
+        self.config = app.config
+
+        self.dirtySections = set() #(chunk coordinates, section index) of sections whose faces were relit by the running update
+        self.pendingSpills = deque() #(chunk, face) of lit chunks whose light still has to spread into the neighbor on that face
+
+    def isEnabled(self) :
+        return self.config.voxelLighting
+
+    def clear(self) :
+        self.pendingSpills.clear()
+        self.dirtySections = set()
+
+    def isLoaded(self, chunk) : #Still the lit chunk at its coordinates, not unloaded or replaced by a reload
+        return self.app.scene.loadedChunks.get((chunk.chunkX, chunk.chunkZ)) is chunk and chunk.skyHeights is not None
+
+    def tick(self) : #Spreads the light of a few newly lit chunks into their neighbors, the breadth first fill is too slow to do all of them in one frame
+        if not self.isEnabled() :
+            self.pendingSpills.clear()
+            return
+
+        for i in range(min(lightSpillsPerFrame, len(self.pendingSpills))) :
+            chunk, face = self.pendingSpills.popleft()
+            neighbor = self.getNeighborChunk(chunk, face)
+
+            if not self.isLoaded(chunk) or not neighbor : #Either side was unloaded while waiting, a reload queues its own spills
+                continue
+
+            #The border is read now, so block updates since the chunk was lit are included
+            self.spillIntoChunk(neighbor, face ^ 1, self.getFaceLight(chunk, face))
+
+        self.markDirtySections()
+
+    #Whole chunks, when they are loaded
+
+    def getChunkIds(self, chunk, height=None) : #Up to height or the top of the chunk
+        return np.concatenate([section.getArray() for section in chunk.sections[:(height or chunk.height) // sectionHeight]], axis=1)
+
+    def getChunkLight(self, chunk, height=None) :
+        return np.concatenate([np.full(sectionShape, section.light, dtype=np.uint8) if isinstance(section.light, int)
+                               else section.light for section in chunk.sections[:(height or chunk.height) // sectionHeight]], axis=1)
+
+    def getFaceLight(self, chunk, face) : #Packed light of the layer of a chunk touching one of its side faces, without building the whole chunk's
+        layer = getFaceSlice(face)
+        return np.concatenate([np.full(sectionShape, section.light, dtype=np.uint8)[layer] if isinstance(section.light, int)
+                               else section.light[layer] for section in chunk.sections], axis=0 if face < 2 else 1)
+
+    def getLitHeight(self, chunk, neighbors) :
+        #Height light has to be computed up to, above it the chunk is open to the sky with no block light reaching in from below or from its neighbors
+        top = 0
+
+        for section in chunk.sections :
+            if not section.isUniform() or registry.lightOpaque[section.blocks] or registry.lightEmission[section.blocks] :
+                top = (section.index + 1) * sectionHeight
+
+        for neighbor in neighbors :
+            for section in neighbor.sections :
+                if not isinstance(section.light, int) or section.light & maxLight :
+                    top = max(top, (section.index + 1) * sectionHeight)
+
+        return min(chunk.height, top + sectionHeight) #Block light spreads less than a section above its source
+
+    def getNeighborChunk(self, chunk, face) :
+        dx, dy, dz = faceDirections[face]
+        neighbor = self.app.scene.loadedChunks.get((chunk.chunkX + dx, chunk.chunkZ + dz))
+
+        return neighbor if neighbor and neighbor.skyHeights is not None else None
+
+    def lightChunk(self, chunk) : #Lights a chunk that was just loaded, its light is let into the chunks around it over the next frames
+        if not self.isEnabled() :
+            return
+
+        neighbors = [self.getNeighborChunk(chunk, face) for face in (0, 1, 4, 5)]
+        height = self.getLitHeight(chunk, [neighbor for neighbor in neighbors if neighbor])
+
+        borders = [self.getChunkLight(neighbor, height)[getFaceSlice(face ^ 1)] if neighbor else None for face, neighbor in zip((0, 1, 4, 5), neighbors)]
+        light, chunk.skyHeights = computeChunkLight(self.getChunkIds(chunk, height), borders)
+
+        for section in chunk.sections :
+            if section.index * sectionHeight < height :
+                section.light = compactLight(light[:, section.index*sectionHeight:(section.index + 1)*sectionHeight, :])
+            else :
+                section.light = outsideLight
+
+        for face, neighbor in zip((0, 1, 4, 5), neighbors) :
+            if neighbor :
+                self.pendingSpills.append((chunk, face))
+
+    def spillIntoChunk(self, chunk, face, border) : #Spreads the packed light of the layer touching a face of a chunk into it
+        layer = getFaceSlice(face)
+        light = self.getFaceLight(chunk, face)
+        opaque = registry.lightOpaque[np.concatenate([section.getArray()[layer] for section in chunk.sections], axis=0 if face < 2 else 1)]
+
+        #World coordinates of the chunk's blocks on that face, the layer is indexed (y, z) or (x, y)
+        x, y, z = np.meshgrid(np.arange(chunkSize), np.arange(chunk.height), np.arange(chunkSize), indexing="ij", sparse=True)
+        x, y, z = (np.broadcast_to(axis, (chunkSize, chunk.height, chunkSize))[layer] for axis in (x + chunk.chunkX * chunkSize, y, z + chunk.chunkZ * chunkSize))
+
+        for shift in (skyShift, blockShift) :
+            levels = (border >> shift) & maxLight
+            seeds = (levels > ((light >> shift) & maxLight) + 1) & ~opaque
+
+            addQueue = deque()
+            for position, level in zip(zip(x[seeds], y[seeds], z[seeds]), levels[seeds]) :
+                position = tuple(int(value) for value in position)
+                self.setLevel(position, shift, int(level) - 1)
+                addQueue.append(position)
+
+            self.propagate(shift, deque(), addQueue)
+
+    #Single blocks, for incremental updates
+
+    def getSection(self, pos) : #The section holding a block and the block's position in it, None when not loaded
+        x, y, z = pos
+        chunk = self.app.scene.loadedChunks.get((x // chunkSize, z // chunkSize))
+
+        if not chunk or chunk.skyHeights is None or not 0 <= y < chunk.height :
+            return None
+
+        return chunk.sections[y // sectionHeight], (x % chunkSize, y % sectionHeight, z % chunkSize)
+
+    def getLevel(self, pos, shift) : #None when not loaded
+        found = self.getSection(pos)
+
+        if not found :
+            return None
+
+        section, position = found
+        return (section.getLight(*position) >> shift) & maxLight
+
+    def setLevel(self, pos, shift, level) :
+        section, position = self.getSection(pos)
+        light = section.getLight(*position)
+        section.setLight(*position, (light & ~(maxLight << shift)) | (level << shift))
+
+        #Faces of the block and of the blocks around it, which may be in other sections
+        x, y, z = pos
+        for dx, dy, dz in [(0, 0, 0)] + faceDirections :
+            self.dirtySections.add((((x + dx) // chunkSize, (z + dz) // chunkSize), (y + dy) // sectionHeight))
+
+    def isOpaque(self, pos) :
+        section, position = self.getSection(pos)
+        return registry.lightOpaque[section.getBlockId(*position)]
+
+    def getEmission(self, pos) :
+        section, position = self.getSection(pos)
+        return int(registry.lightEmission[section.getBlockId(*position)])
+
+    @staticmethod
+    def getNeighbors(pos) :
+        x, y, z = pos
+        return [(x + dx, y + dy, z + dz) for dx, dy, dz in faceDirections]
+
+    def propagate(self, shift, removeQueue, addQueue) :
+        #Clears the light that came from removed blocks first, then spreads light again from everything that bordered it
+        while removeQueue :
+            pos, level = removeQueue.popleft()
+
+            for neighbor in self.getNeighbors(pos) :
+                neighborLevel = self.getLevel(neighbor, shift)
+
+                if neighborLevel == None :
+                    continue
+
+                if neighborLevel and neighborLevel < level : #Was lit through the removed light
+                    self.setLevel(neighbor, shift, 0)
+                    removeQueue.append((neighbor, neighborLevel))
+
+                    if shift == blockShift and self.getEmission(neighbor) : #Emissive blocks light themselves again
+                        self.setLevel(neighbor, shift, self.getEmission(neighbor))
+                        addQueue.append(neighbor)
+                elif neighborLevel >= level : #Lit from somewhere else, spreads back in
+                    addQueue.append(neighbor)
+
+        while addQueue :
+            pos = addQueue.popleft()
+            level = self.getLevel(pos, shift)
+
+            if level == None or level <= 1 :
+                continue
+
+            for neighbor in self.getNeighbors(pos) :
+                neighborLevel = self.getLevel(neighbor, shift)
+
+                if neighborLevel == None or neighborLevel >= level - 1 or self.isOpaque(neighbor) :
+                    continue
+
+                self.setLevel(neighbor, shift, level - 1)
+                addQueue.append(neighbor)
+
+    def updateBlock(self, chunk, pos, oldId, newId) : #A block of a lit chunk changed, chunk relative coordinates
+        if not self.isEnabled() or chunk.skyHeights is None :
+            return
+
+        isOpaque = registry.lightOpaque[newId]
+        if isOpaque == registry.lightOpaque[oldId] and registry.lightEmission[newId] == registry.lightEmission[oldId] : #Like water flowing into air
+            return
+
+        x, y, z = pos
+        pos = (x + chunk.chunkX * chunkSize, y, z + chunk.chunkZ * chunkSize)
+
+        #Block light
+        removeQueue, addQueue = deque(), deque()
+
+        level = self.getLevel(pos, blockShift)
+        if level :
+            self.setLevel(pos, blockShift, 0)
+            removeQueue.append((pos, level))
+
+        if registry.lightEmission[newId] :
+            self.setLevel(pos, blockShift, int(registry.lightEmission[newId]))
+            addQueue.append(pos)
+
+        if not isOpaque :
+            addQueue.extend(self.getNeighbors(pos))
+
+        self.propagate(blockShift, removeQueue, addQueue)
+
+        #Sky light, blocks at or above the sky height of their column are lit directly
+        removeQueue, addQueue = deque(), deque()
+        skyHeight = int(chunk.skyHeights[x, z])
+
+        if isOpaque and y >= skyHeight : #The column below is covered
+            chunk.skyHeights[x, z] = y + 1
+
+            for columnY in range(skyHeight, y + 1) :
+                columnPos = (pos[0], columnY, pos[2])
+                removeQueue.append((columnPos, self.getLevel(columnPos, skyShift)))
+                self.setLevel(columnPos, skyShift, 0)
+        elif isOpaque :
+            level = self.getLevel(pos, skyShift)
+            if level :
+                self.setLevel(pos, skyShift, 0)
+                removeQueue.append((pos, level))
+        elif y == skyHeight - 1 : #The top of the column was removed, everything down to the next blocking block is uncovered
+            newHeight = y
+            while newHeight > 0 and not registry.lightOpaque[chunk.getNumericId(x, newHeight - 1, z)] :
+                newHeight -= 1
+
+            chunk.skyHeights[x, z] = newHeight
+
+            for columnY in range(newHeight, y + 1) :
+                columnPos = (pos[0], columnY, pos[2])
+                self.setLevel(columnPos, skyShift, maxLight)
+                addQueue.append(columnPos)
+        else :
+            addQueue.extend(self.getNeighbors(pos))
+
+        self.propagate(skyShift, removeQueue, addQueue)
+
+        self.markDirtySections()
+
+    def markDirtySections(self) :
+        for chunkCoords, index in self.dirtySections :
+            chunk = self.app.scene.loadedChunks.get(chunkCoords)
+
+            if chunk and 0 <= index < len(chunk.sections) :
+                chunk.sections[index].meshDirty = True
+
+        self.dirtySections = set()
+
+    def getNeighborhood(self, chunk, section) : #Packed light of a section with a one block border from the sections around it, for the mesher
+        if not self.isEnabled() :
+            return None
+
+        light = np.full((chunkSize + 2, sectionHeight + 2, chunkSize + 2), outsideLight, dtype=np.uint8)
+        light[1:-1, 1:-1, 1:-1] = section.light
+
+        for face in range(6) :
+            neighbor = chunk.getNeighborSection(section, face)
+            if neighbor == None :
+                continue
+
+            axis = face // 2
+            source, target = [slice(None)] * 3, [slice(1, -1)] * 3
+            source[axis], target[axis] = (0, -1) if face % 2 == 0 else (-1, 0)
+
+            light[tuple(target)] = neighbor.light if isinstance(neighbor.light, int) else neighbor.light[tuple(source)]
+
+        return light
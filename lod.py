@@ -0,0 +1,125 @@
+import numpy as np
+
+from block import registry
+from model import ChunkMesh, getBoxFaces
+from chunk import chunkSize, waterLevel
+
+lodTilesPerFrame = 2 #Far terrain tiles (re)built per frame
+
+class LodTerrain : #Cheap distant terrain built from WorldGen heights only, drawn where no full chunk is loaded
+    def __init__(self, app) -> None :
+        self.app = app
+        self.config = app.config
+
+        self.tiles = {}
+
+    def getStep(self, distance) : #Block resolution of a tile at a distance in chunks, None when out of range
+        for maxDistance, step in self.app.governor.getLodDistances() :
+            if distance <= maxDistance :
+                return step
+
+        return None
+
+    def getMaxDistance(self) :
+        lodDistances = self.app.governor.getLodDistances()
+
+        if not lodDistances :
+            return 0
+
+        return max(maxDistance for maxDistance, step in lodDistances)
+
+    def tick(self) :
+        centerX, centerZ = self.app.camera.getChunk()
+        maxDistance = self.getMaxDistance()
+
+        self.app.scene.worldGen.heightCache.fitDistance(max(maxDistance, self.app.governor.getRenderDistance()))
+
+        #Drop tiles that left the range
+        for coords in list(self.tiles) :
+            if max(abs(coords[0] - centerX), abs(coords[1] - centerZ)) > maxDistance :
+                self.tiles.pop(coords).destroy()
+
+        #Build missing tiles and tiles whose resolution changed, nearest first
+        toBuild = []
+
+        for x in range(centerX - maxDistance, centerX + maxDistance + 1) :
+            for z in range(centerZ - maxDistance, centerZ + maxDistance + 1) :
+                if (x, z) in self.app.scene.loadedChunks :
+                    continue
+
+                distance = max(abs(x - centerX), abs(z - centerZ))
+                step = self.getStep(distance)
+
+                tile = self.tiles.get((x, z))
+                if step and not (tile and tile.step == step) :
+                    toBuild.append((distance, (x, z), step))
+
+        toBuild.sort()
+
+        for distance, coords, step in toBuild[:lodTilesPerFrame] :
+            if not coords in self.tiles :
+                self.tiles[coords] = LodTile(self.app, coords)
+
+            self.tiles[coords].build(self.app.scene.worldGen, step) #The old mesh stays visible until this replaces it
+
+    def render(self) :
+        loadedChunks = self.app.scene.loadedChunks
+
+        for coords, tile in self.tiles.items() :
+            chunk = loadedChunks.get(coords)
+
+            if not chunk or not chunk.isMeshed() :
+                tile.mesh.render()
+
+    def clear(self) :
+        for tile in self.tiles.values() :
+            tile.destroy()
+
+        self.tiles = {}
+
+class LodTile :
+    def __init__(self, app, coords) -> None :
+        self.app = app
+        self.chunkX, self.chunkZ = coords
+
+        self.step = None
+        self.mesh = ChunkMesh(app, (self.chunkX*chunkSize, 0, self.chunkZ*chunkSize))
+
+    def getHeights(self, worldGen, step) : #Column heights sampled at the center of every cell, a tile never crosses a height cache region
+        offset = step // 2
+        return worldGen.getHeightMap(self.chunkX*chunkSize + offset, self.chunkZ*chunkSize + offset, chunkSize - offset, step)
+
+    def build(self, worldGen, step) :
+        heights = self.getHeights(worldGen, step).astype(np.int64)
+        cells = len(heights)
+        faceAttributes = registry.getFaceAttributes(self.app.textureMan)
+
+        #Flooded cells only show the water surface
+        flooded = heights < waterLevel
+        top = np.where(flooded, waterLevel, heights).ravel()
+        blockIds = np.where(flooded, registry.ids["water"], registry.ids["grass"]).ravel()
+
+        i, j = np.meshgrid(np.arange(cells), np.arange(cells), indexing="ij")
+        x, z = i.ravel() * step, j.ravel() * step
+        ones = np.ones_like(top)
+
+        parts = [getBoxFaces(2, np.stack([x, top, z], axis=1), np.stack([ones * step, ones, ones * step], axis=1), faceAttributes[blockIds, 2])]
+
+        #Sides down to the lower neighbor, tile borders get a skirt hanging down to hide cracks
+        neighborBottoms = np.pad(np.maximum(heights, waterLevel) + 1, 1, constant_values=-1) #-1 outside the tile
+
+        for face, di, dj in ((0, 1, 0), (1, -1, 0), (4, 0, 1), (5, 0, -1)) :
+            bottom = neighborBottoms[1+di:cells+1+di, 1+dj:cells+1+dj].ravel()
+            bottom = np.where(bottom < 0, np.maximum(0, top - 15), bottom) #Quads are at most 16 blocks tall
+
+            sides = bottom <= top
+            boxMin = np.stack([x, bottom, z], axis=1)[sides]
+            boxSize = np.stack([ones * step, top - bottom + 1, ones * step], axis=1)[sides]
+
+            parts.append(getBoxFaces(face, boxMin, boxSize, faceAttributes[blockIds[sides], face]))
+
+        self.mesh.upload(np.concatenate(parts))
+        self.step = step
+
+    def destroy(self) :
+        self.mesh.destroy()
@@ -1,11 +1,13 @@
+import time
+startupTime = time.perf_counter() #Measured before the heavy imports for the startup report
+
 import pygame as pg
-from PIL import Image
-import moderngl as mgl
-from datetime import datetime
-import git
+import argparse
+import json
 import sys
 
-from model import *
+from block import loadBlockInfo
+from startup import StartupReport, AssetPreloader, readCommitHash
 from player import Player
 from saveManager import SaveManager
 from scene import Scene
@@ -15,63 +17,93 @@ from sounds import SoundEngine
 from camera import Camera
 from textures import TextureManager
 from shaderProgram import ShaderProgramManager
+from screenshot import ScreenshotManager
+from replay import InputSource, FrameMetrics, tickLength
+from governor import RenderGovernor, FrameTimeMonitor
+from resolution import SceneFramebuffer
 
 class GraphicsEngine :
-    def __init__(self, windowSize=(1600, 900)) :
-        pg.init()
-        self.windowSize = windowSize
+    def __init__(self, windowSize=(1600, 900), startupReport=None, recordPath=None, replayPath=None, replayOverrides=None, replayReportPath=None) :
+        self.startupReport = startupReport or StartupReport()
+        report = self.startupReport
+
+        with report.phase("window and context") :
+            pg.init()
+            self.windowSize = windowSize
 
-        pg.display.gl_set_attribute(pg.GL_CONTEXT_MAJOR_VERSION, 3)
-        pg.display.gl_set_attribute(pg.GL_CONTEXT_MINOR_VERSION, 3)
-        pg.display.gl_set_attribute(pg.GL_CONTEXT_PROFILE_MASK, pg.GL_CONTEXT_PROFILE_CORE)
+            pg.display.gl_set_attribute(pg.GL_CONTEXT_MAJOR_VERSION, 3)
+            pg.display.gl_set_attribute(pg.GL_CONTEXT_MINOR_VERSION, 3)
+            pg.display.gl_set_attribute(pg.GL_CONTEXT_PROFILE_MASK, pg.GL_CONTEXT_PROFILE_CORE)
 
-        pg.display.set_mode(self.windowSize, flags=pg.OPENGL | pg.DOUBLEBUF | pg.RESIZABLE)
+            pg.display.set_mode(self.windowSize, flags=pg.OPENGL | pg.DOUBLEBUF | pg.RESIZABLE)
 
-        #Mouse lock
-        pg.event.set_grab(True)
-        pg.mouse.set_visible(False)
+            #Mouse lock
+            pg.event.set_grab(True)
+            pg.mouse.set_visible(False)
 
-        #Detect and use existing OpenGL context
-        self.ctx = mgl.create_context()
-        self.ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
+            #Detect and use existing OpenGL context, imported here so it is timed with the window
+            import moderngl as mgl
+            self.ctx = mgl.create_context()
+            self.ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
 
         #Clock and time
         self.clock = pg.time.Clock()
-        self.time = 0
-        self.deltaTime = 0
+        self.time = 0 #Simulated seconds, advanced by every tick
+        self.deltaTime = tickLength #Milliseconds per tick, the same while playing, recording and replaying
+        self.frameTime = 0 #Real milliseconds the last frame took
+
+        #Input, live or from a recording, and the frame metrics collected while replaying
+        self.input = InputSource(self, recordPath=recordPath, replayPath=replayPath)
+        self.metrics = FrameMetrics(enabled=self.input.replaying)
+        self.replayOverrides = replayOverrides
+        self.replayReportPath = replayReportPath
 
         #Application
         self.name = "VoxelEngine"
         self.sourceCodeLink = "https://github.com/TriLinder/VoxelEngine"
         self.commitHash = "UNKNOWN"
-        self.getCommitHash()
+        with report.phase("commit hash") :
+            self.getCommitHash()
 
         #Game info
         self.gamePaused = True
         self.inGame = False
 
-        #Config
-        self.config = Config(self)
+        #Config and block info
+        with report.phase("config and blocks.json") :
+            self.config = Config(self)
+            loadBlockInfo()
+
+        self.governor = RenderGovernor(self)
 
         #Camera
         self.camera = Camera(self)
 
         #Sound engine
-        self.sound = SoundEngine(self)
+        with report.phase("sound engine") :
+            self.sound = SoundEngine(self)
 
         #Texture and shader managers
-        self.textureMan = TextureManager(self)
-        self.shaderMan = ShaderProgramManager(self)
+        with report.phase("texture and shader managers") :
+            self.textureMan = TextureManager(self)
+            self.shaderMan = ShaderProgramManager(self)
+            self.sceneFramebuffer = SceneFramebuffer(self)
+
+        #Resolution drops first, it is cheaper to change than the render distance
+        self.frameMonitor = FrameTimeMonitor(self, [self.sceneFramebuffer, self.governor])
 
-        #Save manager
+        #Save and screenshot managers
         self.saveMan = SaveManager(self)
+        self.screenshots = ScreenshotManager(self)
 
         #Scene
-        self.scene = Scene(self)
+        with report.phase("scene") :
+            self.scene = Scene(self)
 
         #User interface
-        self.ui = UserInterface(self)
-        self.pgEvents = []
+        with report.phase("user interface") :
+            self.ui = UserInterface(self)
+            self.pgEvents = []
 
         #Player
         self.player = Player(self)
@@ -82,65 +114,53 @@ class GraphicsEngine :
         if self.config.fullscreen :
             pg.display.toggle_fullscreen()
 
+        #Textures and sounds are decoded in the background while the main menu is showing
+        self.preloader = AssetPreloader(self)
+        self.preloader.start()
+
     def getCommitHash(self) :
-        try :
-            repo = git.Repo()
-        except :
+        commitHash = readCommitHash()
+
+        if not commitHash :
             print('WARNING: git repository not found, please make sure you used the "git clone" command to clone the repository')
             return
 
-        self.commitHash = repo.head.object.hexsha
+        self.commitHash = commitHash
 
-    def takeScreenshot(self, save=True, drawUi=True, playSound=True) :
+    def takeScreenshot(self, save=True, drawUi=True, playSound=True, onImage=None) : #Reading back and encoding happens in the background, onImage is called from a worker thread
         #Play sound
         if playSound :
             self.sound.play("ui", "screenshot", force=True)
         
-        #Take screenshot
+        if drawUi : #Captured at the end of the next frame, no extra rendering needed
+            self.screenshots.request(save=save, onImage=onImage)
+            return
+
+        #Render a frame without the UI and capture it right away
         self.ui.surface.fill((0, 0, 0, 0))
-        self.ui.redrawNextFrame = drawUi
+        self.ui.redrawNextFrame = False
         self.ui.redrawInTicks = 2
         self.ui.writeToTexture()
         self.render(flip=False)
-        
-        data = self.ctx.fbo.read(viewport=self.windowSize, alignment=1)
-        image = Image.frombytes("RGB", self.windowSize, data)
-        image = image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-
-        #Save the image
-        if save :
-            if not os.path.isdir("screenshots") :
-                os.mkdir("screenshots")
-
-            date = datetime.now().strftime("%Y-%m-%d %H_%M_%S")
-            
-            foundFilename = False
-            index = 0
-
-            while not foundFilename :
-                if index == 0 :
-                    filename = f"{date}.png"
-                else :
-                    filename = f"{date}_{index}.png"
-                path = os.path.join("screenshots", filename)
-
-                if not os.path.isfile(path) :
-                    foundFilename = True
-                else :
-                    index += 1
-
-            image.save(path)
-        
-        return image
+
+        self.screenshots.capture(save=save, onImage=onImage)
 
     def quit(self) :
         print("Quiting!")
+        self.input.stopRecording()
+        self.preloader.shutdown()
+        self.sound.shutdown()
+        self.screenshots.captureRequested() #While the world is still loaded
         self.scene.destroy()
+        self.scene.meshBuilder.shutdown()
+        self.scene.worldStore.close()
+        self.screenshots.flush()
         pg.quit()
         sys.exit(0)
 
     def checkEvents(self) :
-        self.pgEvents = pg.event.get()
+        self.input.poll()
+        self.pgEvents = self.input.events
 
         for e in self.pgEvents :
             if e.type == pg.QUIT or (e.type == pg.KEYDOWN and e.key == pg.K_DELETE) : #Quit the application
@@ -163,6 +183,8 @@ class GraphicsEngine :
                 self.windowSize = (e.x, e.y)
 
                 self.camera.aspectRatio = e.x / e.y
+                self.camera.updateProjM()
+                self.shaderMan.writeCamera()
                 self.ui.resize()
     
     def updateWindowCaption(self) :
@@ -171,35 +193,106 @@ class GraphicsEngine :
 
     def render(self, flip=True) :
         #Clear framebuffer
-        self.ctx.clear(color=((42/255, 42/255, 42/255)))
+        clearColor = (42/255, 42/255, 42/255)
+        self.ctx.clear(color=clearColor)
+
+        #Render the scene, at a lower resolution when scaled, then the UI at the window's
+        if self.sceneFramebuffer.begin(clearColor) :
+            self.scene.render()
+            self.sceneFramebuffer.end()
+        else :
+            self.scene.render()
 
-        #Render the UI and the scene
-        self.scene.render()
         self.ui.render()
 
         if flip :
+            self.screenshots.capturePending()
+
             #Swap buffers
             pg.display.flip()
     
-    def getTime(self) :
-        self.time = pg.time.get_ticks() / 1000
-    
+    def tick(self) : #One fixed step of the simulation
+        self.input.beginTick()
+        self.time += self.deltaTime / 1000
+
+        self.player.tick()
+        self.camera.update()
+
     def run(self) :
-        self.render()
+        with self.startupReport.phase("first frame") :
+            self.render()
+        self.startupReport.print()
+
+        if self.input.replaying :
+            self.input.startReplay(self.replayOverrides)
         
         while True :
-            self.getTime()
+            self.metrics.startFrame()
             self.checkEvents()
-            self.player.tick()
-            self.camera.update()
+            self.metrics.mark("input")
+            self.preloader.tick()
+            self.sound.tick()
+            self.screenshots.tick()
+
+            for i in range(self.input.getTicks(self.frameTime)) :
+                self.tick()
+            self.metrics.mark("player")
             self.scene.tick()
+            self.metrics.mark("scene")
             self.ui.tick()
+            self.metrics.mark("ui")
             self.render()
-            self.deltaTime = self.clock.tick(self.config.fpsLimit)
+            self.metrics.mark("render")
+            self.metrics.endFrame()
+
+            if self.input.replaying :
+                self.frameTime = self.clock.tick() #As fast as possible, one recorded tick per frame
+
+                if self.input.isReplayDone() :
+                    self.finishReplay()
+            else :
+                self.frameTime = self.clock.tick(self.config.fpsLimit)
+
+            self.frameMonitor.tick(self.clock.get_rawtime())
+
             self.updateWindowCaption()
 
+    def finishReplay(self) :
+        self.metrics.print()
+
+        if self.replayReportPath :
+            world = self.input.replay["world"]
+            self.metrics.writeToFile(self.replayReportPath, info={"worldId": world["worldId"], "seed": world["seed"], "commit": self.commitHash,
+                                                                 "renderDistance": self.config.renderDistance})
+
+        self.quit()
+
 if __name__ == "__main__" :
-    app = GraphicsEngine()
+    parser = argparse.ArgumentParser(description="A simple 3D voxel game")
+    parser.add_argument("--startup-report", action="store_true", help="print a per-phase startup timing breakdown")
+    parser.add_argument("--record", metavar="FILE", help="record the input of the first world played to a file")
+    parser.add_argument("--replay", metavar="FILE", help="play a recording back as fast as possible, then print frame time metrics and quit")
+    parser.add_argument("--replay-set", metavar="SETTING=VALUE", action="append", default=[], help="override a recorded setting while replaying, like renderDistance=6")
+    parser.add_argument("--replay-report", metavar="FILE", help="also write the replay metrics to a JSON file")
+    args = parser.parse_args()
+
+    if args.record and args.replay :
+        parser.error("--record and --replay can't be used together")
+
+    replayOverrides = {}
+    for setting in args.replay_set :
+        key, _, value = setting.partition("=")
+
+        try :
+            replayOverrides[key] = json.loads(value)
+        except ValueError : #A plain string
+            replayOverrides[key] = value
+
+    report = StartupReport(enabled=args.startup_report)
+    report.add("imports", time.perf_counter() - startupTime)
+    report.startTime = startupTime
+
+    app = GraphicsEngine(startupReport=report, recordPath=args.record, replayPath=args.replay, replayOverrides=replayOverrides, replayReportPath=args.replay_report)
 
     try :
         app.run()
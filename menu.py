@@ -1,6 +1,9 @@
 import pygame as pg
 import pygame_menu as pgm
 
+from chunk import defaultHeight, maxHeight
+from section import sectionHeight
+
 class Menu :
     def __init__(self, ui) -> None :
         self.ui = ui
@@ -12,12 +15,23 @@ class Menu :
         
         self.pgmTheme = self.ui.pgmTheme
 
-        self.screens = {"pause": PauseMenu(self, ui), "main": MainMenu(self, ui), "worldList": WorldListMenu(self, ui),
-                        "createWorld": CreateWorldMenu(self, ui), "settings": SettingsMenu(self, ui), "keybinds": Keybinds(self, ui)}
+        #Screens are only built the first time they are shown
+        self.screenClasses = {"pause": PauseMenu, "main": MainMenu, "worldList": WorldListMenu,
+                        "createWorld": CreateWorldMenu, "settings": SettingsMenu, "keybinds": Keybinds}
+        self.screens = {}
         self.currentScreen = "main"
 
         self.resize()
 
+    def getScreen(self, name) :
+        if not name in self.screens :
+            screen = self.screenClasses[name](self, self.ui)
+            screen.resize()
+
+            self.screens[name] = screen
+
+        return self.screens[name]
+
     def playClickSound(self) :
         self.ui.app.sound.play("ui", "click", volume=0.25)
 
@@ -27,7 +41,7 @@ class Menu :
         
         if self.visible and self.ui.app.inGame and (not self.ui.app.gamePaused) :
             if self.currentScreen == "settings" :
-                self.screens["settings"].goBackButton()
+                self.getScreen("settings").goBackButton()
             
             self.currentScreen = None
 
@@ -37,7 +51,7 @@ class Menu :
 
             if self.currentScreen :
                 try :
-                    self.screens[self.currentScreen].tick()
+                    self.getScreen(self.currentScreen).tick()
                 except AssertionError : #pygame_menu weirdness while resizing the window
                     pass
     
@@ -54,7 +68,7 @@ class Menu :
         pg.draw.rect(self.ui.surface, overlayColor, [0, 0, self.ui.res[0], self.ui.res[1]]) #Overlay
 
         if self.currentScreen :
-            self.screens[self.currentScreen].draw()
+            self.getScreen(self.currentScreen).draw()
     
 
 # ------------------ #
@@ -121,7 +135,7 @@ class MainMenu :
 
     def playButton(self) :
         self.menu.playClickSound()
-        self.menu.screens["worldList"].reloadList()
+        self.menu.getScreen("worldList").reloadList()
         self.menu.currentScreen = "worldList"
 
     def settingsButton(self) :
@@ -243,16 +257,16 @@ class WorldListMenu :
         for save in self.saves :
             if save.worldId == worldId :
                 break
+        else :
+            return
         
-        img = save.screenshot
+        img = save.getScaledScreenshot(self.ui.res)
 
         if not img :
             return
 
-        img = pg.transform.smoothscale(img, self.ui.res)
-        img.set_alpha(150)
         pg.draw.rect(self.ui.surface, (0,0,0), [0, 0, self.ui.res[0], self.ui.res[1]])
-        self.ui.surface.blit(img, img.get_rect())
+        self.ui.surface.blit(img, img.get_rect(center=(self.ui.res[0] // 2, self.ui.res[1] // 2))) #At its stored size, scaling it up would blur it
 
     def resize(self) :
         width, height = self.ui.surface.get_size()
@@ -295,6 +309,7 @@ class CreateWorldMenu :
         self.nameInput = self.pgm.add.text_input("Name: ", maxchar=20)
         self.seedInputPlaceholderReplaced = False
         self.seedInput = self.pgm.add.text_input("Seed: ", default="RANDOM", onselect=self.seedInputSelect, maxchar=20)
+        self.heightInput = self.pgm.add.text_input("Height: ", default=defaultHeight, input_type=pgm.locals.INPUT_INT, maxchar=3)
         
         self.buttonFrame = self.pgm.add.frame_h(border_color=(255, 255, 255, 0), border_width=0, width=400, height=200)
         goBackButton = self.pgm.add.button("GO BACK", self.goBackButton)
@@ -310,6 +325,7 @@ class CreateWorldMenu :
         self.nameInput.set_value("")
         self.seedInput.set_value("RANDOM")
         self.seedInputPlaceholderReplaced = False
+        self.heightInput.set_value(defaultHeight)
 
         self.resize()
 
@@ -328,8 +344,12 @@ class CreateWorldMenu :
 
         if len(seedString) == 0 or (not self.seedInputPlaceholderReplaced) :
             seedString = None
+
+        #Whole sections, at least as tall as the default
+        height = round((self.heightInput.get_value() or defaultHeight) / sectionHeight) * sectionHeight
+        height = min(max(height, defaultHeight), maxHeight)
         
-        self.saveMan.newWorld(name=worldName, seed=seedString)
+        self.saveMan.newWorld(name=worldName, seed=seedString, height=height)
         self.menu.playClickSound()
         self.menu.currentScreen = None
         self.reset()
@@ -378,6 +398,7 @@ class SettingsMenu :
     def renderDistanceSlider(self, value) :
         value = round(value)
         self.config.renderDistance = value
+        self.ui.app.governor.reset()
     
     def fpsLimitSlider(self, value) :
         value = round(value)
@@ -386,6 +407,7 @@ class SettingsMenu :
     def volumeSlider(self, value) :
         value = round(value) / 100
         self.config.volume = value
+        self.ui.app.sound.updateVolume()
 
     def mouseSensitivitySlider(self, value) :
         value = round(value)
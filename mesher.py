@@ -0,0 +1,254 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import math
+import os
+import numpy as np
+
+from block import registry, loadBlockInfo, cubeModel, billboardModel, allBillboardFaces
+from model import packVertex, addBoxFace, greedyRectangles, cubeFaceAxes, billboardFaceTemplates
+from section import sectionHeight, sectionShape, faceDirections
+from worldStore import WorldStoreReader
+from light import applyLight, maxLight, skyShift
+
+meshProcesses = max(1, min(4, (os.cpu_count() or 1) - 1))
+meshUploadsPerFrame = 4 #Finished section meshes uploaded to the GPU per frame
+maxJobsInFlight = meshProcesses * 4 #Submitted but not yet uploaded, enough to keep every worker busy, nearer sections are picked again every frame
+
+maxQuadSize = 16 #Largest merged quad side, texture coordinates are packed into 5 bits
+visibleFaceFlag = 1 << 31 #Marks visible faces in getVisibleFaces, packed attributes can be 0
+
+#Everything below runs in mesh worker processes, reading sections straight from the scene's WorldStore
+
+reader = None
+
+def initWorker() :
+    global reader
+
+    loadBlockInfo()
+    reader = WorldStoreReader()
+
+def readSection(handle) : #An id array view or a single id
+    kind, value = handle
+    return reader.view(value) if kind == "slot" else value
+
+def readNeighborhood(center, neighbors) :
+    #Ids of a section with a one block border from the sections around it, -1 where nothing is loaded
+    ids = np.full((sectionShape[0] + 2, sectionShape[1] + 2, sectionShape[2] + 2), -1, dtype=np.int32)
+    ids[1:-1, 1:-1, 1:-1] = readSection(center)
+
+    for face, handle in enumerate(neighbors) :
+        if handle == None :
+            continue
+
+        axis = face // 2
+        source, target = [slice(None)] * 3, [slice(1, -1)] * 3
+        source[axis], target[axis] = (0, -1) if face % 2 == 0 else (-1, 0)
+
+        blocks = readSection(handle)
+        ids[tuple(target)] = blocks if handle[0] == "uniform" else blocks[tuple(source)]
+
+    return ids
+
+def buildSectionJob(center, neighbors, sectionIndex, faceAttributes, greedy, light, pageNames) :
+    reader.retain(pageNames)
+
+    try :
+        ids = readNeighborhood(center, neighbors)
+    except FileNotFoundError : #A page retired since the job was submitted, its sections were unloaded
+        return None
+
+    result = buildSectionMesh(ids, sectionIndex, faceAttributes, greedy, light)
+
+    #A slot released or reused while it was read, the section was unloaded or changed and is remeshed anyway
+    for kind, value in [center] + [handle for handle in neighbors if handle] :
+        if kind == "slot" and not reader.isCurrent(value) :
+            return None
+
+    return result
+
+def cullSection(ids, sectionIndex) :
+    #Visible face bitmask of every block of a section, from its ids with a one block border (-1 where nothing is loaded)
+    center = (slice(1, -1),) * 3
+    size, height = ids.shape[0] - 2, ids.shape[1] - 2
+
+    transparent = registry.transparent[ids]
+    fluid = registry.fluid[ids]
+    models = registry.models[ids[center]]
+
+    masks = np.zeros(models.shape, dtype=np.uint8)
+    billboardVisible = np.zeros(masks.shape, dtype=bool)
+
+    for face, (dx, dy, dz) in enumerate(faceDirections) :
+        neighbor = (slice(1+dx, size+1+dx), slice(1+dy, height+1+dy), slice(1+dz, size+1+dz))
+
+        visible = transparent[neighbor] | (~fluid[center] & fluid[neighbor])
+        if face == 3 and sectionIndex == 0 : #Hide faces in void
+            visible[:, 0, :] = False
+
+        masks |= visible.astype(np.uint8) << face
+        billboardVisible |= transparent[neighbor]
+
+    masks[models != cubeModel] = 0
+    masks[(models == billboardModel) & billboardVisible] = allBillboardFaces
+
+    return models, masks
+
+def getVisibleFaces(ids, models, masks, faceAttributes, light=None) :
+    #Returns the packed attributes of every visible cube face as a (6, x, y, z) array, 0 where hidden, and the billboard vertices
+    #light is the packed light of the section with a one block border, baked into the brightness when given
+    faces = np.zeros((6,) + models.shape, dtype=np.uint32)
+    billboardVertices = []
+
+    attributes = faceAttributes[ids]
+    size, height = models.shape[0], models.shape[1]
+
+    if light is not None : #Emissive blocks are at least as bright as the light they give off
+        emission = registry.lightEmission[ids]
+
+    for face, (dx, dy, dz) in enumerate(faceDirections) :
+        visible = (models == cubeModel) & ((masks >> face) & 1 == 1)
+        packed = attributes[..., face]
+
+        if light is not None : #Lit by the block the face is seen from, so faces only merge with equally lit ones
+            faceLight = light[1+dx:size+1+dx, 1+dy:height+1+dy, 1+dz:size+1+dz]
+            packed = applyLight(packed, np.maximum(faceLight & maxLight, emission) | (faceLight & (maxLight << skyShift)))
+
+        faces[face][visible] = packed[visible] | visibleFaceFlag
+
+    for x, y, z in zip(*np.nonzero((models == billboardModel) & (masks != 0))) :
+        position = packVertex(int(x), int(y), int(z), 0, 0, 0, 0, 0)[0]
+        planeAttributes = attributes[x, y, z, :len(billboardFaceTemplates)]
+
+        if light is not None : #Lit by the block it is in
+            planeAttributes = applyLight(planeAttributes, light[x + 1, y + 1, z + 1])
+
+        for face, template in enumerate(billboardFaceTemplates) :
+            for corner in template["corners"] :
+                billboardVertices.append((position + corner, int(planeAttributes[face])))
+
+    return faces, billboardVertices
+
+def buildSectionMesh(ids, sectionIndex, faceAttributes, greedy, light=None) :
+    #Packs every visible face of a section into a vertex array, returns it with the number of faces it was merged from
+    center = (slice(1, -1),) * 3
+    models, masks = cullSection(ids, sectionIndex)
+
+    if not masks.any() : #Fully hidden
+        return np.zeros((0, 2), dtype="u4"), 0
+
+    faces, vertices = getVisibleFaces(ids[center], models, masks, faceAttributes, light)
+    faceCount = int(np.count_nonzero(faces)) + len(vertices) // 4
+
+    for face in range(6) :
+        axes = cubeFaceAxes[face]
+
+        #Slices along the face normal, indexed by the u and v texture axes
+        slices = np.moveaxis(faces[face], [axes["normalAxis"], axes["uAxis"], axes["vAxis"]], [0, 1, 2])
+
+        for i in range(slices.shape[0]) :
+            if greedy :
+                rectangles = greedyRectangles(slices[i], maxSize=maxQuadSize)
+            else :
+                rectangles = [(int(a), int(b), 1, 1, int(slices[i, a, b])) for a, b in zip(*np.nonzero(slices[i]))]
+
+            for a, b, width, height, attributes in rectangles :
+                boxMin, boxSize = [0, 0, 0], [1, 1, 1]
+                boxMin[axes["normalAxis"]], boxMin[axes["uAxis"]], boxMin[axes["vAxis"]] = i, a, b
+                boxSize[axes["uAxis"]], boxSize[axes["vAxis"]] = width, height
+
+                addBoxFace(vertices, face, boxMin, boxSize, attributes & ~visibleFaceFlag)
+
+    return np.array(vertices, dtype="u4").reshape(-1, 2), faceCount
+
+class MeshBuilder : #Builds section meshes in worker processes, the main thread uploads finished ones under a per frame budget
+    def __init__(self, app) -> None :
+        self.app = app
+
+        #Started on first use, spawned so the workers don't inherit the window and GL context
+        self.executor = None
+        self.finished = deque() #(section, vertices, faceCount), appended as jobs complete
+        self.jobsInFlight = 0
+
+    def getExecutor(self) :
+        if not self.executor :
+            self.executor = ProcessPoolExecutor(max_workers=meshProcesses, mp_context=multiprocessing.get_context("spawn"), initializer=initWorker)
+
+        return self.executor
+
+    def submit(self, chunk, section, faceAttributes, greedy) :
+        section.meshDirty = False
+        section.meshPending = True
+        self.jobsInFlight += 1
+
+        #Workers read the section and its neighbors' borders in place, later edits dirty the section again
+        neighbors = [neighbor.getHandle() if neighbor else None for neighbor in (chunk.getNeighborSection(section, face) for face in range(6))]
+        light = self.app.scene.lightEngine.getNeighborhood(chunk, section) #Copied, light changes dirty the section too
+
+        future = self.getExecutor().submit(buildSectionJob, section.getHandle(), neighbors, section.index, faceAttributes, greedy, light, self.app.scene.worldStore.pageNames)
+
+        def onDone(future) :
+            result = None
+
+            if not future.cancelled() :
+                try :
+                    result = future.result()
+                except Exception as e :
+                    print(f"MESHER: Failed to build section {section.index} of chunk {chunk.chunkX}_{chunk.chunkZ}: {e}")
+
+            vertices, faceCount = result if result else (None, 0)
+            self.finished.append((section, vertices, faceCount))
+
+        future.add_done_callback(onDone)
+
+    def tick(self) :
+        scene = self.app.scene
+        cameraX, cameraY, cameraZ = self.app.camera.position
+
+        #Queue dirty sections, nearest first
+        dirty = []
+
+        for chunk in scene.loadedChunks.values() :
+            for section in chunk.sections :
+                if not section.meshDirty or section.meshPending :
+                    continue
+
+                if section.isEmpty() : #Nothing to build, drop the old mesh right away
+                    section.meshDirty = False
+                    section.mesh.release()
+                    section.faceCount = 0
+                    continue
+
+                centerX = (chunk.chunkX + 0.5) * chunk.size
+                centerY = (section.index + 0.5) * sectionHeight
+                centerZ = (chunk.chunkZ + 0.5) * chunk.size
+                dirty.append((math.dist((cameraX, cameraY, cameraZ), (centerX, centerY, centerZ)), id(section), chunk, section))
+
+        dirty.sort(key=lambda item : item[:2])
+
+        if dirty and self.jobsInFlight < maxJobsInFlight :
+            faceAttributes = registry.getFaceAttributes(self.app.textureMan) #Needs the texture array, so it is compiled here
+            greedy = self.app.config.greedyMeshing
+
+            for distance, _, chunk, section in dirty[:maxJobsInFlight - self.jobsInFlight] :
+                self.submit(chunk, section, faceAttributes, greedy)
+
+        #Swap finished meshes in, the old mesh stays visible until then
+        for i in range(min(meshUploadsPerFrame, len(self.finished))) :
+            section, vertices, faceCount = self.finished.popleft()
+            section.meshPending = False
+            self.jobsInFlight -= 1
+
+            if section.destroyed :
+                continue
+
+            if vertices is None : #Failed or read a reused slot
+                section.meshDirty = True
+                continue
+
+            section.mesh.upload(vertices)
+            section.faceCount = faceCount
+
+    def shutdown(self) :
+        if self.executor :
+            self.executor.shutdown(wait=False, cancel_futures=True)
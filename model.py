@@ -1,124 +1,205 @@
-import pygame as pg
 import numpy as np
-import glm
-import random
+import moderngl as mgl
 import os
 
 shadersDirectory = "shaders"
 
-class Cube :
-    def __init__(self, app, pos=(0,0,0), rot=(0,0,0), textures=["test.png","test.png","test.png","test.png","test.png","test.png"]) -> None:
-        self.faces = []
-
-        self.faces.append({"object": Face(app, pos=(pos[0]+0.5, pos[1]+0, pos[2]+0), rot=(0,90,0), brightness=1.0, texture=textures[0]), "visible": True})# +x
-        self.faces.append({"object": Face(app, pos=(pos[0]-0.5, pos[1]+0, pos[2]+0), rot=(0,-90,0), brightness=0.75, texture=textures[1]), "visible": True})# -x
-        self.faces.append({"object": Face(app, pos=(pos[0]+0, pos[1]+0.5, pos[2]+0), rot=(-90,0,0), brightness=1.0, texture=textures[2]), "visible": True})# +y
-        self.faces.append({"object": Face(app, pos=(pos[0]+0, pos[1]-0.5, pos[2]+0), rot=(90,0,0), brightness=0.75, texture=textures[3]), "visible": True})# -y
-        self.faces.append({"object": Face(app, pos=(pos[0]+0, pos[1]+0, pos[2]+0.5), rot=(0,0,0), brightness=0.75, texture=textures[4]), "visible": True})# +z
-        self.faces.append({"object": Face(app, pos=(pos[0]+0, pos[1]+0, pos[2]-0.5), rot=(0,180,0), brightness=1.0, texture=textures[5]), "visible": True})# -z
-    
-    def render(self) :
-        for face in self.faces :
-            if face["visible"] :
-                face["object"].render()
-    
-    def destroy(self) :
-        for face in self.faces :
-            face["object"].destroy()
-
-class Billboard :
-    def __init__(self, app, pos=(0,0,0), rot=(0,0,0), textures=["test.png","test.png"]) -> None:
-        self.faces = []
-
-        self.faces.append({"object": Face(app, pos=(pos[0], pos[1], pos[2]), rot=(0,45,0), texture=textures[0]), "visible": True})
-        self.faces.append({"object": Face(app, pos=(pos[0], pos[1], pos[2]), rot=(0,-45,0), texture=textures[1]), "visible": True})
-        self.faces.append({"object": Face(app, pos=(pos[0], pos[1], pos[2]), rot=(0,225,0), texture=textures[1]), "visible": True})
-        self.faces.append({"object": Face(app, pos=(pos[0], pos[1], pos[2]), rot=(0,-225,0), texture=textures[1]), "visible": True})
-    
-    def render(self) :
-        for face in self.faces :
-            if face["visible"] :
-                face["object"].render()
+#Corners of every face in block corner space (0 or 1 on each axis) with their texture coordinates, counter-clockwise from the outside
+cubeFaces = [
+    [((1, 0, 1), (0, 0)), ((1, 0, 0), (1, 0)), ((1, 1, 0), (1, 1)), ((1, 1, 1), (0, 1))], # +x
+    [((0, 0, 0), (0, 0)), ((0, 0, 1), (1, 0)), ((0, 1, 1), (1, 1)), ((0, 1, 0), (0, 1))], # -x
+    [((0, 1, 1), (0, 0)), ((1, 1, 1), (1, 0)), ((1, 1, 0), (1, 1)), ((0, 1, 0), (0, 1))], # +y
+    [((0, 0, 0), (0, 0)), ((1, 0, 0), (1, 0)), ((1, 0, 1), (1, 1)), ((0, 0, 1), (0, 1))], # -y
+    [((0, 0, 1), (0, 0)), ((1, 0, 1), (1, 0)), ((1, 1, 1), (1, 1)), ((0, 1, 1), (0, 1))], # +z
+    [((1, 0, 0), (0, 0)), ((0, 0, 0), (1, 0)), ((0, 1, 0), (1, 1)), ((1, 1, 0), (0, 1))], # -z
+]
+cubeFaceBrightness = [1.0, 0.75, 1.0, 0.75, 0.75, 1.0]
+
+#Two crossed diagonal planes, drawn from both sides
+billboardFaces = [
+    [((0, 0, 1), (0, 0)), ((1, 0, 0), (1, 0)), ((1, 1, 0), (1, 1)), ((0, 1, 1), (0, 1))],
+    [((0, 0, 0), (0, 0)), ((1, 0, 1), (1, 0)), ((1, 1, 1), (1, 1)), ((0, 1, 0), (0, 1))],
+    [((1, 0, 0), (0, 0)), ((0, 0, 1), (1, 0)), ((0, 1, 1), (1, 1)), ((1, 1, 0), (0, 1))],
+    [((1, 0, 1), (0, 0)), ((0, 0, 0), (1, 0)), ((0, 1, 0), (1, 1)), ((1, 1, 1), (0, 1))],
+]
+billboardFaceId = 6
+
+def packVertex(x, y, z, u, v, face, layer, brightness, lowered=False) :
+    #Packs a vertex into two 32 bit words, decoded in shaders/default.vert
+    # word 0: x (5 bits) | y (9 bits) | z (5 bits) | u (5 bits) | v (5 bits) | face id (3 bits)
+    # word 1: texture layer (12 bits) | brightness (8 bits) | lowered fluid surface (1 bit)
+    word0 = x | (y << 5) | (z << 14) | (u << 19) | (v << 24) | (face << 29)
+    word1 = layer | (round(brightness * 255) << 12) | (int(lowered) << 20)
+
+    return word0, word1
+
+def getFaceTemplates(faces, faceIds, brightness, textureIndices) :
+    #Packed corners of every face, a block's position only has to be added to the first word
+    templates = []
+
+    for i in range(len(faces)) :
+        corners = [packVertex(x, y, z, u, v, faceIds[i], 0, 0)[0] for (x, y, z), (u, v) in faces[i]]
+        templates.append({"corners": corners, "brightness": brightness[i], "texture": textureIndices[i]})
+
+    return templates
+
+def getFaceAxes(face) :
+    #Corner of the face at uv (0, 0) and the block space directions its u and v texture axes point in
+    corners = {uv: corner for corner, uv in cubeFaces[face]}
+    origin = np.array(corners[(0, 0)])
+    uDirection = np.array(corners[(1, 0)]) - origin
+    vDirection = np.array(corners[(0, 1)]) - origin
+
+    uAxis = int(np.nonzero(uDirection)[0][0])
+    vAxis = int(np.nonzero(vDirection)[0][0])
+    normalAxis = 3 - uAxis - vAxis
+
+    return {"origin": origin, "u": uDirection, "v": vDirection, "uAxis": uAxis, "vAxis": vAxis, "normalAxis": normalAxis}
+
+cubeFaceAxes = [getFaceAxes(face) for face in range(6)]
+
+def addBoxFace(vertices, face, boxMin, boxSize, attributes) :
+    #Adds one face of a box of blocks as a single quad, its texture repeats once per block
+    axes = cubeFaceAxes[face]
+    uAxis, vAxis, normalAxis = axes["uAxis"], axes["vAxis"], axes["normalAxis"]
+    width, height = boxSize[uAxis], boxSize[vAxis]
+
+    #The block at the quad's uv origin, u and v may point towards lower coordinates
+    block = [0, 0, 0]
+    block[normalAxis] = boxMin[normalAxis] + (boxSize[normalAxis] - 1 if axes["origin"][normalAxis] else 0)
+    block[uAxis] = boxMin[uAxis] + (0 if axes["u"][uAxis] > 0 else width - 1)
+    block[vAxis] = boxMin[vAxis] + (0 if axes["v"][vAxis] > 0 else height - 1)
+
+    for u, v in ((0, 0), (1, 0), (1, 1), (0, 1)) :
+        x, y, z = block + axes["origin"] + axes["u"] * (u * width) + axes["v"] * (v * height)
+        vertices.append((packVertex(int(x), int(y), int(z), u * width, v * height, face, 0, 0)[0], attributes))
+
+def getBoxFaces(face, boxMin, boxSize, attributes) :
+    #addBoxFace for many boxes at once, boxMin and boxSize are (n, 3) arrays, returns their quads as an (n*4, 2) vertex array
+    axes = cubeFaceAxes[face]
+    uAxis, vAxis, normalAxis = axes["uAxis"], axes["vAxis"], axes["normalAxis"]
+    width, height = boxSize[:, uAxis], boxSize[:, vAxis]
+
+    block = np.array(boxMin, dtype=np.int64)
+    if axes["origin"][normalAxis] :
+        block[:, normalAxis] += boxSize[:, normalAxis] - 1
+    if axes["u"][uAxis] < 0 :
+        block[:, uAxis] += width - 1
+    if axes["v"][vAxis] < 0 :
+        block[:, vAxis] += height - 1
+
+    vertices = np.zeros((len(block), 4, 2), dtype=np.uint32)
+
+    for corner, (u, v) in enumerate(((0, 0), (1, 0), (1, 1), (0, 1))) :
+        x, y, z = (block + axes["origin"] + axes["u"] * (u * width)[:, None] + axes["v"] * (v * height)[:, None]).T
+        vertices[:, corner, 0] = packVertex(x, y, z, u * width, v * height, face, 0, 0)[0]
+        vertices[:, corner, 1] = attributes
+
+    return vertices.reshape(-1, 2)
+
+def greedyRectangles(grid, maxSize=16) :
+    #Merges equal non-zero cells of a 2D grid into rectangles, returns (a, b, width, height, value) tuples
+    grid = grid.copy()
+    rectangles = []
+
+    for a, b in zip(*np.nonzero(grid)) :
+        value = grid[a, b]
+
+        if not value : #Already part of a rectangle
+            continue
+
+        width = 1
+        while a + width < grid.shape[0] and width < maxSize and grid[a + width, b] == value :
+            width += 1
+
+        height = 1
+        while b + height < grid.shape[1] and height < maxSize and (grid[a:a + width, b + height] == value).all() :
+            height += 1
+
+        grid[a:a + width, b:b + height] = 0
+        rectangles.append((int(a), int(b), width, height, int(value)))
 
-    def destroy(self) :
-        for face in self.faces :
-            face["object"].destroy()
+    return rectangles
+
+cubeFaceTemplates = getFaceTemplates(cubeFaces, range(6), cubeFaceBrightness, range(6))
+billboardFaceTemplates = getFaceTemplates(billboardFaces, [billboardFaceId] * 4, [1.0] * 4, [0, 1, 1, 1])
+
+class QuadIndexBuffer : #Index buffer shared by every chunk mesh, two triangles per quad of four vertices
+    def __init__(self, ctx, quads=16384) -> None :
+        self.ctx = ctx
+        self.quads = 0
+        self.buffer = None
+        self.generation = 0 #Incremented when the buffer is reallocated
+
+        self.reserve(quads)
+
+    def reserve(self, quads) :
+        if quads <= self.quads :
+            return
 
-class Face :
-    def __init__(self, app, pos=(0,0,0), rot=(0,0,0), brightness=1, texture="test.png") -> None:
+        self.quads = max(quads, self.quads * 2)
+
+        base = np.arange(self.quads, dtype="u4")[:, None] * 4
+        indices = (base + np.array([0, 1, 2, 2, 3, 0], dtype="u4")).ravel()
+
+        if self.buffer :
+            self.buffer.release()
+        self.buffer = self.ctx.buffer(indices)
+        self.generation += 1
+
+class ChunkMesh :
+    def __init__(self, app, origin) -> None :
         self.app = app
         self.ctx = app.ctx
-        self.textureMan = app.textureMan
-        self.vbo = self.getVbo()
-        self.shaderProgram = app.shaderMan.getShaderProgram("default", texture)
-        self.vao = self.getVao()
+        self.origin = origin
 
-        self.pos = pos
-        self.setRotation(rot)
-        self.textureID = texture
+        self.shaderProgram = app.shaderMan.getShaderProgram("default")
+        self.indexBuffer = app.shaderMan.getQuadIndexBuffer()
 
-        self.brightness = glm.c_float(brightness)
+        self.vbo = None
+        self.vao = None
+        self.quadCount = 0
+        self.indexGeneration = None
 
-        self.modelM = self.getModelMatrix()
+    def upload(self, vertexData) : #vertexData is a (quads * 4, 2) uint32 array
+        self.release()
 
-    def update(self) :
-        self.modelM = self.getModelMatrix()
+        self.quadCount = len(vertexData) // 4
 
-        self.shaderProgram['m_model'].write(self.modelM)
-        self.shaderProgram['m_view'].write(self.app.camera.viewM)
-        self.shaderProgram['in_brightness'].write(self.brightness)
+        if self.quadCount == 0 :
+            return
 
-    def getModelMatrix(self) :
-        modelMatrix = glm.mat4()
+        self.indexBuffer.reserve(self.quadCount)
 
-        #Translate
-        modelMatrix = glm.translate(modelMatrix, self.pos)
+        self.vbo = self.ctx.buffer(np.ascontiguousarray(vertexData, dtype="u4"))
+        self.createVao()
 
-        #Rotate
-        modelMatrix = glm.rotate(modelMatrix, self.rot.x, glm.vec3(1, 0, 0))
-        modelMatrix = glm.rotate(modelMatrix, self.rot.y, glm.vec3(0, 1, 0))
-        modelMatrix = glm.rotate(modelMatrix, self.rot.z, glm.vec3(0, 0, 1))
+    def createVao(self) :
+        if self.vao :
+            self.vao.release()
 
-        return modelMatrix
+        self.vao = self.ctx.vertex_array(self.shaderProgram, [(self.vbo, "2u4", "in_packed")], index_buffer=self.indexBuffer.buffer, index_element_size=4)
+        self.indexGeneration = self.indexBuffer.generation
 
     def render(self) :
-        self.update()
-        self.vao.render()
-    
+        if not self.vao :
+            return
+
+        if self.indexGeneration != self.indexBuffer.generation : #The shared index buffer grew since this mesh was uploaded
+            self.createVao()
+
+        self.shaderProgram["u_chunkOrigin"].value = self.origin
+        self.vao.render(mode=mgl.TRIANGLES, vertices=self.quadCount * 6)
+
+    def release(self) :
+        if self.vao :
+            self.vao.release()
+        if self.vbo :
+            self.vbo.release()
+
+        self.vao = None
+        self.vbo = None
+        self.quadCount = 0
+
     def destroy(self) :
-        self.vbo.release()
-        self.vao.release()
-    
-    def getVao(self) :
-        vao = self.ctx.vertex_array(self.shaderProgram, [(self.vbo, '2f 3f', 'in_texcoord_0', 'in_position')])
-        return vao
-    
-    def getVertexData(self) :
-        verticies = [ (-0.5, -0.5, 0), (0.5, -0.5, 0), (0.5, 0.5, 0), (-0.5, 0.5, 0) ]
-        
-        indices = [ (0, 1, 2), (2, 3, 0) ]
-        
-        vertexData = self.get_data(verticies, indices)
-
-        textureCoords = [ (0, 0), (1, 0), (1, 1), (0, 1) ]
-        textureCoordsIndices = [ (0, 1, 2), (2, 3, 0) ]
-        
-        textureCoordsData = self.get_data(textureCoords, textureCoordsIndices)
-
-        vertexData = np.hstack([textureCoordsData, vertexData])
-
-        return vertexData
-    
-    @staticmethod
-    def get_data(verticies, indices) :
-        data = [verticies[ind] for triangle in indices for ind in triangle]
-        return np.array(data, dtype='f4')
-    
-    def getVbo(self) :
-        vertexData = self.getVertexData()
-        vbo = self.ctx.buffer(vertexData)
-
-        return vbo
-
-    def setRotation(self, rot) :
-        self.rot = glm.vec3([glm.radians(a) for a in rot])
\ No newline at end of file
+        self.release()
@@ -45,7 +45,6 @@ class EntityPhysics :
 
     def movementControl(self) :
         speed = self.walkingSpeed
-        keys = pg.key.get_pressed()
 
         nonYForward = glm.vec3(self.forward[0], self.forward[1], self.forward[2]) #Copy by value
         nonYForward.y = 0
@@ -142,12 +141,11 @@ class EntityPhysics :
             self.entity.onGround = True
             return self.entity.onGround
 
-        blocks = chunk.blocks
+        block = chunk.getBlockFromAbsoulteCoords((entityX, entityY, entityZ))
 
-        try :
-            block = blocks[round(entityX)-(chunkX*16)][round(entityY)][round(entityZ)-(chunkZ*16)]
+        if block :
             self.entity.onGround = block.physicalBlock
-        except IndexError : #Above chunk height limit
+        else : #Outside of the world's height
             self.entity.onGround = False
 
         if self.entity.onGround :
@@ -89,7 +89,6 @@ class Player :
 
                 block.changeId("air")
                 chunk = block.chunk
-                chunk.cullNeighbors(block.chunkRelativePos)
                 chunk.updateNeighborFluids(block.chunkRelativePos)
         elif self.ui.isPressed("blockPlace") : #Place block
             if self.selectedBlockId and self.lookingAtEmptyBlock and self.app.time - self.lastPunchTimestamp > 0.25 :
@@ -98,7 +97,6 @@ class Player :
                 block = self.lookingAtEmptyBlock
                 block.changeId(self.selectedBlockId)
                 chunk = block.chunk
-                chunk.cullNeighbors(block.chunkRelativePos)
 
                 chunk.updateNeighborFluids(block.chunkRelativePos)
 
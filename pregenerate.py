@@ -0,0 +1,128 @@
+#Generates and stores every chunk around a world's spawn without opening a window, spread over worker processes
+#Chunks are stored as generated, loading them reads the file instead of generating them again, their column heights also go into the height cache
+import argparse
+import json
+import os
+import time
+import uuid
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from chunk import ChunkGenerator, chunkSize, defaultHeight, maxHeight, getGeneratedPath
+from saveManager import savesDirectory
+from worldGen import WorldGen
+from section import sectionHeight
+
+progressInterval = 1 #Seconds between progress lines
+spawnPosition = (5, 15, 5) #Where Player.reset puts new players
+
+#Worker process side
+
+worldGen = None
+
+def initWorker(seed, generator) :
+    global worldGen
+    worldGen = WorldGen(seed, version=generator) #Heights are only kept in memory here, the main process writes the cache
+
+def generateChunk(worldId, chunkX, chunkZ, height) : #Runs the chunk generation pipeline and stores the result where Chunk reads it
+    generator = ChunkGenerator(worldGen, chunkX, chunkZ, height)
+    generator.writeGenerated(getGeneratedPath(worldId, chunkX, chunkZ))
+    worldGen.heightCache.clear()
+
+    return chunkX, chunkZ, generator.heightMap
+
+#Main process side
+
+def createWorld(seed, height, worldName=None) : #info.json of a world that was never played, as Scene.saveToFile writes it
+    worldId = uuid.uuid4().hex
+    worldGen = WorldGen(seed if seed else worldId)
+
+    j = {}
+    j["lastPlayed"] = round(time.time())
+    j["player"] = {"position": spawnPosition, "rotation": (0, 0), "selectedBlockId": "dirt"}
+    j["seed"] = worldGen.seed
+    j["generator"] = worldGen.version
+    j["height"] = height
+    j["worldId"] = worldId
+    j["worldName"] = worldName if worldName else f"world-{worldId}"
+
+    directory = os.path.join(savesDirectory, worldId)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "info.json"), "w") as f :
+        f.write(json.dumps(j))
+
+    print(f"PREGENERATE: Created world {worldId}")
+
+    return worldId
+
+def getSaveSize(worldId) :
+    size = 0
+
+    for directory, _, files in os.walk(os.path.join(savesDirectory, worldId)) :
+        size += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+
+    return size
+
+def pregenerate(worldId, radius, center, processes) :
+    with open(os.path.join(savesDirectory, worldId, "info.json"), "r") as f :
+        j = json.loads(f.read())
+
+    seed, generator, height = j["seed"], j.get("generator", 1), j.get("height", defaultHeight)
+    cacheDirectory = os.path.join(savesDirectory, worldId, "heightmaps")
+
+    if center == None : #Around the player
+        x, y, z = j["player"]["position"]
+        center = (math.floor(round(x) / chunkSize), math.floor(round(z) / chunkSize))
+
+    heightCache = WorldGen(seed, version=generator, cacheDirectory=cacheDirectory).heightCache
+
+    #Chunks stored before are skipped, so an interrupted run picks up where it stopped
+    area = [(chunkX, chunkZ) for chunkX in range(center[0] - radius, center[0] + radius + 1) for chunkZ in range(center[1] - radius, center[1] + radius + 1)]
+    chunks = [(chunkX, chunkZ) for chunkX, chunkZ in area if not os.path.isfile(getGeneratedPath(worldId, chunkX, chunkZ))]
+
+    print(f"PREGENERATE: {worldId}, {len(chunks)} of {len(area)} chunks around chunk {center[0]}_{center[1]} left, generator {generator}, height {height}")
+
+    done = 0
+    startTime = lastProgress = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=initWorker, initargs=(seed, generator)) as executor :
+        futures = [executor.submit(generateChunk, worldId, chunkX, chunkZ, height) for chunkX, chunkZ in chunks]
+
+        for future in as_completed(futures) :
+            chunkX, chunkZ, heights = future.result()
+
+            heightCache.setHeightMap(chunkX * chunkSize, chunkZ * chunkSize, heights) #For the far terrain, which only reads heights
+            done += 1
+
+            now = time.perf_counter()
+            if now - lastProgress >= progressInterval or done == len(chunks) :
+                lastProgress = now
+                print(f"PREGENERATE: {done}/{len(chunks)} chunks, {done / max(now - startTime, 1e-9):.1f} chunks/sec")
+
+    heightCache.flush()
+
+    print(f"PREGENERATE: {worldId} done in {time.perf_counter() - startTime:.1f}s, save is {getSaveSize(worldId) / 1024**2:.2f}MiB")
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description="Generate and store the chunks around a world's spawn ahead of time")
+    parser.add_argument("world", nargs="?", help="id of the world, its directory name in saves")
+    parser.add_argument("--seed", help="create a new world with this seed instead")
+    parser.add_argument("--name", help="name of the world created with --seed")
+    parser.add_argument("--height", type=int, default=defaultHeight, help="height of the world created with --seed")
+    parser.add_argument("--radius", type=int, default=16, help="chunks generated in every direction from the center")
+    parser.add_argument("--center", type=int, nargs=2, metavar=("X", "Z"), help="chunk coordinates of the center, defaults to the player's chunk")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes, defaults to one per CPU")
+    args = parser.parse_args()
+
+    if (args.world == None) == (args.seed == None) :
+        parser.error("pass either a world id or --seed")
+
+    if args.height % sectionHeight or not defaultHeight <= args.height <= maxHeight :
+        parser.error(f"--height must be a multiple of {sectionHeight} from {defaultHeight} to {maxHeight}")
+
+    worldId = args.world
+    if args.seed != None :
+        worldId = createWorld(args.seed, args.height, args.name)
+
+    pregenerate(worldId, args.radius, tuple(args.center) if args.center else None, args.processes)
@@ -0,0 +1,247 @@
+import os
+import gzip
+import json
+import time
+import pygame as pg
+import numpy as np
+
+recordingVersion = 2 #Version 1 stored each frame's variable deltaTime
+
+tickLength = 1000 / 60 #Milliseconds simulated per tick, the player and camera only move in whole ticks, recorded or not
+maxTicksPerFrame = 5 #Slower frames drop the time they are behind by, instead of falling further behind catching up
+
+#Events kept in recordings, window and quit events always come from the real window
+recordedEvents = {pg.KEYDOWN, pg.KEYUP, pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP, pg.MOUSEWHEEL, pg.TEXTINPUT}
+freeCamKeys = [pg.K_w, pg.K_a, pg.K_s, pg.K_d, pg.K_SPACE, pg.K_LSHIFT] #Read by Camera.move
+
+class InputSource : #Keyboard and mouse state, read live every frame and optionally recorded every tick, or fed back from a recording one tick per frame
+    def __init__(self, app, recordPath=None, replayPath=None) -> None :
+        self.app = app
+
+        self.events = []
+        self.keys = None
+        self.mouseButtons = (False,) * 5
+        self.mouseRel = (0, 0) #Of the current tick
+
+        #Read since the last tick, handed to the next one
+        self.pendingEvents = []
+        self.pendingRel = (0, 0)
+        self.untickedTime = 0 #Milliseconds not simulated yet
+
+        self.recordPath = recordPath
+        self.recording = None #Header and frames, from the first in-game frame until leaving the world
+
+        self.replaying = bool(replayPath)
+        self.replay = None
+        self.replayTick = 0
+        self.replayTickRead = False #A recorded tick was read this frame
+
+        if replayPath :
+            with gzip.open(replayPath, "rt") as f :
+                self.replay = json.loads(f.read())
+
+            if self.replay.get("version") != recordingVersion :
+                raise ValueError(f"{replayPath} is a version {self.replay.get('version')} recording, only version {recordingVersion} can be replayed")
+
+            if self.replay["tickLength"] != tickLength :
+                raise ValueError(f"{replayPath} was recorded with {self.replay['tickLength']}ms ticks, the game simulates {tickLength}ms ones")
+
+    def getWatchedKeys(self) : #Keyboard keys the game reads through isKeyPressed, the only ones recorded
+        keys = set(freeCamKeys)
+        keys.update(keyCode - 5 for keyCode in self.app.config.keybinds.values() if keyCode >= 5) #First five are the mouse buttons
+
+        return keys
+
+    def poll(self) : #Called once at the start of every frame
+        if self.replaying :
+            self.pollReplay()
+            return
+
+        self.events = pg.event.get()
+        self.keys = pg.key.get_pressed()
+        self.mouseButtons = pg.mouse.get_pressed(num_buttons=5)
+
+        relX, relY = pg.mouse.get_rel()
+        self.pendingRel = (self.pendingRel[0] + relX, self.pendingRel[1] + relY)
+        self.pendingEvents += self.events
+
+    def getTicks(self, frameTime) : #Ticks to simulate this frame, frameTime is the real length of the last frame in milliseconds
+        if self.replaying : #The recorded ticks one after another, as fast as frames are drawn
+            return int(self.replayTickRead)
+
+        self.untickedTime = min(self.untickedTime + frameTime, maxTicksPerFrame * tickLength)
+        ticks = int(self.untickedTime // tickLength)
+        self.untickedTime -= ticks * tickLength
+
+        return ticks
+
+    def beginTick(self) : #Hands the input read since the last tick to the one starting, and records it
+        if self.replaying :
+            return
+
+        self.mouseRel = self.pendingRel
+
+        if self.recordPath :
+            self.record()
+
+        self.pendingEvents = []
+        self.pendingRel = (0, 0)
+
+    def isKeyPressed(self, key) :
+        if self.replaying :
+            return key in self.keys
+
+        return bool(self.keys[key])
+
+    def isMouseButtonPressed(self, button) :
+        return bool(self.mouseButtons[button])
+
+    #Recording
+
+    def record(self) :
+        if not self.app.inGame :
+            self.stopRecording()
+            return
+
+        if not self.recording :
+            self.startRecording()
+
+        events = [[e.type, {key: value for key, value in e.dict.items() if isinstance(value, (bool, int, float, str, tuple))}] for e in self.pendingEvents if e.type in recordedEvents]
+        keys = [key for key in self.recording["watchedKeys"] if self.keys[key]]
+        buttons = sum(1 << i for i, pressed in enumerate(self.mouseButtons) if pressed)
+
+        self.recording["ticks"].append([*self.mouseRel, buttons, keys, events])
+
+    def startRecording(self) :
+        scene = self.app.scene
+        self.app.config.updateDict()
+
+        #Saved chunks at the start, a replay reads these instead of the save so edits made since don't change it
+        chunks = {}
+        directory = os.path.join("saves", scene.worldId, "chunks")
+
+        if os.path.isdir(directory) :
+            for name in os.listdir(directory) :
+                if name.endswith(".json") :
+                    with open(os.path.join(directory, name), "r") as f :
+                        chunks[os.path.splitext(name)[0]] = json.loads(f.read())
+
+        self.recording = {
+            "version": recordingVersion,
+            "timestamp": round(time.time()),
+            "commit": self.app.commitHash,
+            "windowSize": self.app.windowSize,
+            "tickLength": tickLength,
+            "time": self.app.time,
+            "world": scene.saveToDict(),
+            "freeCam": self.app.camera.freeCam,
+            "config": dict(self.app.config.config),
+            "chunks": chunks,
+            "watchedKeys": sorted(self.getWatchedKeys()),
+            "ticks": [] #[mouse x, mouse y, mouse buttons, pressed keys, events]
+        }
+
+        print(f"REPLAY: Recording {scene.worldId} to {self.recordPath}")
+
+    def stopRecording(self) :
+        if not self.recording :
+            return
+
+        with gzip.open(self.recordPath + ".tmp", "wt") as f :
+            f.write(json.dumps(self.recording, separators=(",", ":")))
+        os.replace(self.recordPath + ".tmp", self.recordPath)
+
+        print(f"REPLAY: Recorded {len(self.recording['ticks'])} ticks to {self.recordPath}")
+
+        self.recording = None
+        self.recordPath = None #One world per recording
+
+    #Replaying
+
+    def startReplay(self, overrides=None) : #Enters the recorded world as it was when recording started, overrides replace recorded settings
+        config = self.app.config
+
+        for key, value in list(self.replay["config"].items()) + list((overrides or {}).items()) : #Only in memory, settings.json is left alone
+            if hasattr(config, key) :
+                setattr(config, key, value)
+        self.app.camera.updateProjM()
+
+        self.app.scene.chunkSnapshot = self.replay["chunks"]
+        self.app.scene.loadFromDict(self.replay["world"])
+        self.app.camera.freeCam = self.replay["freeCam"]
+        self.app.time = self.replay["time"] #Ticks then advance it like they did while recording
+
+        self.app.gamePaused = False
+        self.app.inGame = True
+        self.app.ui.redrawInTicks = 2
+
+        print(f"REPLAY: Replaying {len(self.replay['ticks'])} ticks of {self.replay['world']['worldId']}")
+
+    def isReplayDone(self) :
+        return self.replayTick >= len(self.replay["ticks"])
+
+    def pollReplay(self) :
+        #Quitting and window changes still come from the real window
+        self.events = [e for e in pg.event.get() if e.type in (pg.QUIT, pg.WINDOWSIZECHANGED) or (e.type == pg.KEYDOWN and e.key == pg.K_DELETE)]
+        self.replayTickRead = False
+
+        if self.isReplayDone() :
+            return
+
+        relX, relY, buttons, keys, events = self.replay["ticks"][self.replayTick]
+        self.replayTick += 1
+        self.replayTickRead = True
+
+        self.mouseRel = (relX, relY)
+        self.mouseButtons = tuple(bool(buttons & (1 << i)) for i in range(5))
+        self.keys = set(keys)
+
+        for eventType, attributes in events :
+            self.events.append(pg.event.Event(eventType, {key: tuple(value) if isinstance(value, list) else value for key, value in attributes.items()}))
+
+class FrameMetrics : #Time spent in every part of a frame, collected while replaying
+    def __init__(self, enabled=False) -> None :
+        self.enabled = enabled
+
+        self.times = {} #Seconds per frame by part, in the order they were first measured
+        self.frameStart = 0
+        self.lastMark = 0
+
+    def startFrame(self) :
+        if self.enabled :
+            self.frameStart = self.lastMark = time.perf_counter()
+
+    def mark(self, name) : #Time since the previous mark
+        if not self.enabled :
+            return
+
+        now = time.perf_counter()
+        self.times.setdefault(name, []).append(now - self.lastMark)
+        self.lastMark = now
+
+    def endFrame(self) :
+        if self.enabled :
+            self.times.setdefault("frame", []).append(time.perf_counter() - self.frameStart)
+
+    def getSummary(self) : #Milliseconds by part
+        summary = {}
+
+        for name, times in self.times.items() :
+            times = np.array(times) * 1000
+            summary[name] = {"mean": float(times.mean()), "p50": float(np.percentile(times, 50)), "p95": float(np.percentile(times, 95)),
+                             "p99": float(np.percentile(times, 99)), "max": float(times.max()), "total": float(times.sum())}
+
+        return summary
+
+    def print(self) :
+        summary = self.getSummary()
+        frames = len(self.times.get("frame", []))
+
+        print(f"REPLAY REPORT: {frames} frames, {summary['frame']['total'] / 1000 if frames else 0:.2f}s")
+        print(f"  {'':<12} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for name, stats in summary.items() :
+            print(f"  {name:<12} " + " ".join(f"{stats[key]:>6.2f}ms" for key in ("mean", "p50", "p95", "p99", "max")))
+
+    def writeToFile(self, path, info=None) :
+        with open(path, "w") as f :
+            f.write(json.dumps({**(info or {}), "frames": len(self.times.get("frame", [])), "metrics": self.getSummary()}, indent=4))
@@ -0,0 +1,96 @@
+import moderngl as mgl
+from array import array
+
+scaleStep = 0.1
+
+class SceneFramebuffer : #Renders the scene at a fraction of the window size and upscales it, when enabled in the settings, stepped by FrameTimeMonitor
+    def __init__(self, app) -> None :
+        self.app = app
+        self.ctx = app.ctx
+        self.config = app.config
+
+        self.scale = self.config.resolutionScaleBounds[1]
+        self.size = None
+        self.fbo = None
+        self.colorTexture = None
+        self.depthBuffer = None
+
+        self.program = app.shaderMan.getShaderProgram("upscale")
+        self.program['scene'] = 0
+
+        buffer = self.ctx.buffer(
+            data=array('f', [
+                # Position (x, y) , Texture coordinates (x, y)
+                -1.0, 1.0, 0.0, 1.0,  # upper left
+                -1.0, -1.0, 0.0, 0.0,  # lower left
+                1.0, 1.0, 1.0, 1.0,  # upper right
+                1.0, -1.0, 1.0, 0.0,  # lower right
+            ])
+        )
+
+        self.quadFs = self.ctx.vertex_array(self.program, [(buffer, "2f 2f", "in_vert", "in_texcoord")])
+
+    def isEnabled(self) : #Off while replaying, like the render governor
+        return self.config.dynamicResolution and not self.app.input.replaying
+
+    def getSize(self) :
+        return tuple(max(1, round(size * self.scale)) for size in self.app.windowSize)
+
+    def resize(self) : #Recreates the framebuffer if the window or the scale changed, only allocated while enabled
+        size = self.getSize()
+        if size == self.size :
+            return
+
+        self.release()
+
+        self.colorTexture = self.ctx.texture(size, 3)
+        self.colorTexture.filter = (mgl.LINEAR, mgl.LINEAR) #Smoother than nearest when upscaling by a fraction
+        self.depthBuffer = self.ctx.depth_renderbuffer(size)
+        self.fbo = self.ctx.framebuffer(color_attachments=[self.colorTexture], depth_attachment=self.depthBuffer)
+        self.size = size
+
+    def release(self) :
+        if self.fbo :
+            self.fbo.release()
+            self.colorTexture.release()
+            self.depthBuffer.release()
+
+        self.fbo = None
+        self.size = None
+
+    def begin(self, color) : #Renders what follows into the framebuffer, returns False and keeps the window's when disabled
+        if not self.isEnabled() :
+            if self.fbo :
+                self.release()
+
+            return False
+
+        self.resize()
+        self.fbo.use()
+        self.fbo.clear(color=color)
+
+        return True
+
+    def end(self) : #Draws the scene into the window, before the UI so it stays at native resolution
+        self.ctx.screen.use()
+        self.ctx.viewport = (0, 0, *self.app.windowSize) #The screen's viewport isn't updated when the window is resized
+
+        wireframe = self.ctx.wireframe
+        self.ctx.wireframe = False
+        self.ctx.disable(mgl.DEPTH_TEST) #The quad would hide the UI drawn over it
+
+        self.colorTexture.use(location=0)
+        self.quadFs.render(mode=mgl.TRIANGLE_STRIP)
+
+        self.ctx.enable(mgl.DEPTH_TEST)
+        self.ctx.wireframe = wireframe
+
+    def step(self, direction) : #One scale step down (-1) or up (1), returns whether anything changed, the framebuffer is recreated on the next frame
+        low, high = self.config.resolutionScaleBounds
+        scale = round(min(max(self.scale + direction * scaleStep, low), high), 2)
+
+        if scale == self.scale :
+            return False
+
+        self.scale = scale
+        return True
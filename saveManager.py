@@ -4,53 +4,131 @@ import time
 import shutil
 import pygame as pg
 
+from chunk import defaultHeight
+
+savesDirectory = "saves"
+indexFile = os.path.join(savesDirectory, "index.json")
+indexVersion = 1
+
+thumbnailSize = (480, 270)
+
 class SaveManager :
     def __init__(self, app) -> None :
         self.app = app
+
+        self.index = None
     
     def getSaves(self) :
-        if not os.path.isdir("saves") :
+        if not os.path.isdir(savesDirectory) :
             return []
         
+        index = self.loadIndex()
         saves = []
 
-        for dir in os.listdir("saves") :
-            dir = os.path.join("saves", dir)
+        for worldId, info in index.items() :
+            save = Save(worldName=info["worldName"], worldId=worldId, seed=info["seed"], lastPlayed=info["lastPlayed"], playerInfo=info["player"])
+            saves.append(save)
+        
+        saves.sort(key=lambda save: save.lastPlayed, reverse=True)
 
-            infoFile = os.path.join(dir, "info.json")
-            screenshotFile = os.path.join(dir, "screenshot.png")
+        return saves
 
-            if not os.path.isfile(infoFile) :
-                continue
+    def loadIndex(self) :
+        if self.index == None :
+            self.index = {}
 
-            with open(infoFile, "r") as f :
-                info = json.loads(f.read())
+            if os.path.isfile(indexFile) :
+                with open(indexFile, "r") as f :
+                    j = json.loads(f.read())
+                
+                if j.get("version") == indexVersion :
+                    self.index = j["worlds"]
         
-            save = Save(worldName=info["worldName"], worldId=info["worldId"], seed=info["seed"], lastPlayed=info["lastPlayed"], playerInfo=info["player"])
-            save.loadScreenshot(screenshotFile)
+        #Pick up worlds that were copied in or removed by hand, listing a directory is cheap compared to parsing every info.json
+        worldIds = set(dir for dir in os.listdir(savesDirectory) if os.path.isdir(os.path.join(savesDirectory, dir)))
+        changed = False
 
-            saves.append(save)
+        for worldId in list(self.index) :
+            if not worldId in worldIds :
+                del self.index[worldId]
+                changed = True
+
+        for worldId in worldIds :
+            if not worldId in self.index :
+                info = self.readInfoFile(worldId)
+
+                if info :
+                    self.index[worldId] = info
+                    changed = True
         
-        saves.sort(key=lambda save: save.lastPlayed, reverse=True)
+        if changed :
+            self.writeIndex()
 
-        return saves
+        return self.index
+    
+    def readInfoFile(self, worldId) :
+        infoFile = os.path.join(savesDirectory, worldId, "info.json")
+
+        if not os.path.isfile(infoFile) :
+            return None
+
+        with open(infoFile, "r") as f :
+            info = json.loads(f.read())
+
+        return self.indexEntry(info)
+
+    @staticmethod
+    def indexEntry(info) :
+        return {"worldName": info["worldName"], "seed": info["seed"], "lastPlayed": info["lastPlayed"], "player": info["player"]}
+
+    def writeIndex(self) :
+        os.makedirs(savesDirectory, exist_ok=True)
+
+        tempFile = indexFile + ".tmp"
+        with open(tempFile, "w") as f :
+            f.write(json.dumps({"version": indexVersion, "worlds": self.index}))
+        
+        os.replace(tempFile, indexFile) #Never leave a half written index behind
+
+    def updateIndex(self, info) :
+        if not os.path.isdir(savesDirectory) :
+            return
+
+        self.loadIndex()
+        self.index[info["worldId"]] = self.indexEntry(info)
+        self.writeIndex()
+
+    @staticmethod
+    def saveThumbnail(screenshot, directory) :
+        from PIL import Image #Only needed when a thumbnail is written, not at startup
+
+        thumbnail = screenshot.copy()
+        thumbnail.thumbnail(thumbnailSize, Image.Resampling.BILINEAR)
+
+        thumbnailFile = os.path.join(directory, "thumbnail.png")
+        thumbnail.save(thumbnailFile + ".tmp", format="PNG")
+        os.replace(thumbnailFile + ".tmp", thumbnailFile) #The world list may read it while it's being written
     
-    def newWorld(self, name=None, seed=None) :
+    def newWorld(self, name=None, seed=None, height=defaultHeight) :
         self.app.gamePaused = False
         self.app.inGame = True
         self.app.ui.redrawInTicks = 2
 
-        self.app.scene.newWorld(worldName=name, seed=seed)
+        self.app.scene.newWorld(worldName=name, seed=seed, height=height)
         self.app.scene.reset()
 
     def deleteSave(self, worldId) :
-        directory = os.path.join("saves", worldId)
+        directory = os.path.join(savesDirectory, worldId)
 
         if not os.path.isdir(directory) :
             return
         
         shutil.rmtree(directory)
 
+        if self.index and worldId in self.index :
+            del self.index[worldId]
+            self.writeIndex()
+
 class Save :
     def __init__(self, worldName=None, worldId=None, seed=None, lastPlayed=None, playerInfo=None) -> None :
         self.worldName = worldName
@@ -60,14 +138,48 @@ class Save :
         self.playerInfo = playerInfo
 
         self.screenshot = None
+        self.screenshotLoaded = False
+        self.scaledScreenshot = None
 
-    def loadScreenshot(self, path) :
-        if not os.path.isfile(path) :
-            self.screenshot = None
-            return
+    def getScreenshot(self) : #Loaded lazily, only once the world is visible
+        if not self.screenshotLoaded :
+            self.loadScreenshot(os.path.join(savesDirectory, self.worldId))
+            self.screenshotLoaded = True
+        
+        return self.screenshot
+
+    def getScaledScreenshot(self, size) : #Shrunk to fit in size when needed, but never scaled up past the stored thumbnail
+        screenshot = self.getScreenshot()
+
+        if not screenshot :
+            return None
+
+        width, height = screenshot.get_size()
+        scale = min(1, size[0] / width, size[1] / height)
+        scaledSize = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+        if not (self.scaledScreenshot and self.scaledScreenshot.get_size() == scaledSize) :
+            self.scaledScreenshot = pg.transform.smoothscale(screenshot, scaledSize) if scale < 1 else screenshot.copy()
+            self.scaledScreenshot.set_alpha(150)
+        
+        return self.scaledScreenshot
+
+    def loadScreenshot(self, directory) :
+        thumbnailFile = os.path.join(directory, "thumbnail.png")
+        screenshotFile = os.path.join(directory, "screenshot.png")
+
+        if not os.path.isfile(thumbnailFile) : #Saves from older versions only have the full screenshot
+            if not os.path.isfile(screenshotFile) :
+                self.screenshot = None
+                return
+            
+            from PIL import Image
+
+            with Image.open(screenshotFile) as screenshot :
+                SaveManager.saveThumbnail(screenshot, directory)
 
-        self.screenshot = pg.image.load(path)
+        self.screenshot = pg.image.load(thumbnailFile)
 
     def getLastPlayed(self) :
         localTime = time.localtime(self.lastPlayed)
-        return time.strftime("%Y-%m-%d %H:%M:%S", localTime)
\ No newline at end of file
+        return time.strftime("%Y-%m-%d %H:%M:%S", localTime)
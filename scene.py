@@ -4,8 +4,13 @@ import time
 import json
 import os
 
-from chunk import Chunk
-from worldGen import WorldGen
+from chunk import Chunk, defaultHeight
+from worldGen import WorldGen, generatorVersion
+from lod import LodTerrain
+from mesher import MeshBuilder
+from worldStore import WorldStore
+from section import findVisibleSections
+from light import LightEngine
 
 class Scene :
     def __init__(self, app) -> None :
@@ -13,11 +18,18 @@ class Scene :
         self.config = app.config
         self.camera = self.app.camera
 
+        self.lodTerrain = LodTerrain(app)
+        self.meshBuilder = MeshBuilder(app)
+        self.worldStore = WorldStore() #Block arrays of every loaded section
+        self.lightEngine = LightEngine(app)
+        self.chunkSnapshot = None #Saved chunks of a replayed recording by "x_z", read and written instead of the save
+
         self.newWorld()
 
         self.loadedChunks = {}
+        self.sectionStats = (0, 0) #Sections drawn and loaded last frame
     
-    def newWorld(self, seed=None, worldName=None, worldId=None) :
+    def newWorld(self, seed=None, worldName=None, worldId=None, generatorVersion=generatorVersion, height=defaultHeight) :
         self.worldId = worldId
         if not self.worldId :
             self.worldId = uuid.uuid4().hex
@@ -29,7 +41,11 @@ class Scene :
         if not seed :
             seed = self.worldId
         
-        self.worldGen = WorldGen(seed)
+        cacheDirectory = os.path.join("saves", self.worldId, "heightmaps") if self.config.diskHeightCache else None
+        self.worldGen = WorldGen(seed, version=generatorVersion, cacheDirectory=cacheDirectory)
+        self.worldHeight = height
+        self.lodTerrain.clear()
+        self.lightEngine.clear()
     
     def reset(self) :
         self.app.player.reset()
@@ -40,28 +56,43 @@ class Scene :
         j["lastPlayed"] = round(time.time())
         j["player"] = self.app.player.saveToDict()
         j["seed"] = self.worldGen.seed
+        j["generator"] = self.worldGen.version
+        j["height"] = self.worldHeight
         j["worldId"] = self.worldId
         j["worldName"] = self.worldName
 
         return j
     
     def loadFromDict(self, j) :
-        self.newWorld(worldId=j["worldId"], worldName=j["worldName"], seed=j["seed"])
+        self.newWorld(worldId=j["worldId"], worldName=j["worldName"], seed=j["seed"], generatorVersion=j.get("generator", 1), height=j.get("height", defaultHeight))
         self.app.player.loadFromDict(j["player"])
 
     def saveToFile(self) :
+        if self.chunkSnapshot != None : #Replays leave the recorded world as it was
+            return
+
         directory = os.path.join("saves", self.worldId)
         os.makedirs(directory, exist_ok=True)
 
         infoFile = os.path.join(directory, "info.json")
 
-        screenshot = self.app.takeScreenshot(drawUi=False, save=False, playSound=False)
         screenshotFile = os.path.join(directory, "screenshot.png")
 
+        def onScreenshot(screenshot) : #Runs on the screenshot worker
+            self.app.saveMan.saveThumbnail(screenshot, directory)
+            screenshot.save(screenshotFile + ".tmp", format="PNG")
+            os.replace(screenshotFile + ".tmp", screenshotFile)
+
+        self.app.takeScreenshot(drawUi=False, save=False, playSound=False, onImage=onScreenshot)
+
+        self.worldGen.heightCache.flush()
+
+        info = self.saveToDict()
+
         with open(infoFile, "w") as f :
-            f.write(json.dumps(self.saveToDict(), indent=4))
+            f.write(json.dumps(info, indent=4))
 
-        screenshot.save(screenshotFile)
+        self.app.saveMan.updateIndex(info)
 
     def loadFromFile(self, worldId) :
         infoFile = os.path.join("saves", worldId, "info.json")
@@ -80,7 +111,7 @@ class Scene :
 
         chunksToLoad.append( (currentChunkX, currentChunkY) )
 
-        for i in range(1, self.config.renderDistance) :
+        for i in range(1, self.app.governor.getRenderDistance()) :
             chunksToLoad.append( ((currentChunkX+i, currentChunkY+0)) )
             chunksToLoad.append( ((currentChunkX-i, currentChunkY+0)) )
             chunksToLoad.append( ((currentChunkX+0, currentChunkY+i)) )
@@ -96,16 +127,37 @@ class Scene :
         for chunk in chunksToUnload :
             del self.loadedChunks[chunk]
         
-        #Load unloaded chunks
+        #Load unloaded chunks, nearest first, up to the governor's budget
+        budget = self.app.governor.getChunkLoadBudget()
+
         for chunk in chunksToLoad :
+            if not chunk in self.loadedChunks :
+                if budget == 0 :
+                    break
+                if budget != None :
+                    budget -= 1
+
             self.loadChunk(chunkCoords=chunk)
     
     def loadChunk(self, chunkCoords=(0, 0)) :
         if not chunkCoords in self.loadedChunks :
             self.loadedChunks[chunkCoords] = Chunk(self.app, chunkCoords=chunkCoords)
+            self.lightEngine.lightChunk(self.loadedChunks[chunkCoords])
             
-            for chunk in self.loadedChunks.values() :
-                chunk.cullBorders()
+            #Faces of the neighbors towards the new chunk may now be hidden
+            chunkX, chunkZ = chunkCoords
+            for neighbor in ((chunkX+1, chunkZ), (chunkX-1, chunkZ), (chunkX, chunkZ+1), (chunkX, chunkZ-1)) :
+                if neighbor in self.loadedChunks :
+                    self.loadedChunks[neighbor].cullBorders()
+
+    def getMeshStats(self) : #Drawn quads and the visible faces they were merged from
+        quads, faces = 0, 0
+
+        for chunk in self.loadedChunks.values() :
+            quads += chunk.getQuadCount()
+            faces += chunk.getFaceCount()
+        
+        return quads, faces
 
     def chunkCoordsFromBlockCoords(self, x, z) :
         chunkX, chunkZ = math.floor(round(x) / 16), math.floor(round(z) / 16)
@@ -134,10 +186,36 @@ class Scene :
         for chunkCoords in toDestroy :
             del self.loadedChunks[chunkCoords]
 
+        self.lodTerrain.clear()
+
     def tick(self) :
         if self.app.inGame :
             self.loadNearChunks()
+            self.lightEngine.tick()
+            self.meshBuilder.tick()
+            self.lodTerrain.tick()
 
     def render(self) :
+        if not self.loadedChunks :
+            return
+
+        #Shared by every chunk mesh
+        self.app.textureMan.use()
+
+        visibleSections = None
+
+        if self.config.sectionCulling :
+            for chunk in self.loadedChunks.values() :
+                chunk.updateVisibility()
+
+            visibleSections = findVisibleSections(self, self.camera.position)
+
+        drawn, total = 0, 0
+
         for chunk in self.loadedChunks.values() :
-            chunk.render()
\ No newline at end of file
+            drawn += chunk.render(visibleSections)
+            total += len(chunk.sections)
+
+        self.sectionStats = (drawn, total)
+
+        self.lodTerrain.render()
\ No newline at end of file
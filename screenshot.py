@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+screenshotsDirectory = "screenshots"
+readbackDelay = 2 #Frames to wait before mapping a pixel buffer, so the GPU has finished copying into it
+
+class ScreenshotManager :
+    def __init__(self, app) -> None :
+        self.app = app
+        self.ctx = app.ctx
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+
+        self.requests = [] #Screenshots waiting for the end of the next rendered frame
+        self.readbacks = [] #Screenshots copied into a pixel buffer, waiting to be mapped
+        self.freeBuffers = []
+
+    def request(self, save=True, onImage=None) :
+        self.requests.append({"save": save, "onImage": onImage})
+
+    def getBuffer(self, size) :
+        for buffer in self.freeBuffers :
+            if buffer.size == size :
+                self.freeBuffers.remove(buffer)
+                return buffer
+
+        return self.ctx.buffer(reserve=size)
+
+    def capture(self, save=True, onImage=None) : #Starts an asynchronous read of the current framebuffer
+        size = tuple(self.app.windowSize)
+        buffer = self.getBuffer(size[0] * size[1] * 3)
+
+        self.ctx.fbo.read_into(buffer, viewport=(0, 0, size[0], size[1]), alignment=1)
+
+        self.readbacks.append({"buffer": buffer, "size": size, "frames": readbackDelay, "save": save, "onImage": onImage})
+
+    def capturePending(self) : #Called after a frame is rendered, before the buffers are swapped
+        for request in self.requests :
+            self.capture(save=request["save"], onImage=request["onImage"])
+
+        self.requests = []
+
+    def tick(self) :
+        waiting = []
+
+        for readback in self.readbacks :
+            readback["frames"] -= 1
+
+            if readback["frames"] > 0 :
+                waiting.append(readback)
+            else :
+                self.finishReadback(readback)
+
+        self.readbacks = waiting
+
+    def finishReadback(self, readback) :
+        buffer = readback["buffer"]
+        data = buffer.read()
+        self.freeBuffers.append(buffer)
+
+        self.executor.submit(self.encode, data, readback["size"], readback["save"], readback["onImage"])
+
+    def captureRequested(self) : #Renders a frame for requests that would otherwise wait for the next one
+        if self.requests :
+            self.app.render(flip=False)
+            self.capturePending()
+
+    def flush(self) : #Blocks until every screenshot is written, used before quitting
+        self.captureRequested()
+
+        for readback in self.readbacks :
+            self.finishReadback(readback)
+        self.readbacks = []
+
+        self.executor.shutdown(wait=True)
+
+    @staticmethod
+    def encode(data, size, save, onImage) :
+        try :
+            from PIL import Image #Imported by the first screenshot instead of at startup
+
+            image = Image.frombytes("RGB", size, data)
+            image = image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+
+            if save :
+                image.save(ScreenshotManager.getScreenshotPath())
+
+            if onImage :
+                onImage(image)
+        except Exception as e : #Exceptions would otherwise disappear inside the worker
+            print(f"SCREENSHOT: Failed to save screenshot ({e})")
+            return None
+
+        return image
+
+    @staticmethod
+    def getScreenshotPath() :
+        if not os.path.isdir(screenshotsDirectory) :
+            os.makedirs(screenshotsDirectory, exist_ok=True)
+
+        date = datetime.now().strftime("%Y-%m-%d %H_%M_%S")
+
+        foundFilename = False
+        index = 0
+
+        while not foundFilename :
+            if index == 0 :
+                filename = f"{date}.png"
+            else :
+                filename = f"{date}_{index}.png"
+            path = os.path.join(screenshotsDirectory, filename)
+
+            if not os.path.isfile(path) :
+                foundFilename = True
+            else :
+                index += 1
+
+        return path
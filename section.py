@@ -0,0 +1,206 @@
+from collections import deque
+import numpy as np
+
+from model import ChunkMesh
+from block import registry
+
+sectionHeight = 16
+sectionShape = (16, sectionHeight, 16)
+
+#Face order matches the cube faces, the opposite face of f is f ^ 1
+faceDirections = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+allFacesConnected = (1 << 36) - 1
+
+def getFaceSlice(face) : #Index of the boundary layer of a section touching a face
+    axis = face // 2
+    index = [slice(None)] * 3
+    index[axis] = -1 if face % 2 == 0 else 0
+    return tuple(index)
+
+def computeConnectivity(open) :
+    #Which faces of a section can see each other through its open (non-opaque) blocks, as a 6x6 bitmask
+    if open.all() :
+        return allFacesConnected
+    if not open.any() :
+        return 0
+
+    connectivity = 0
+
+    for face in range(6) :
+        #Flood fill from the open blocks on this face
+        reached = np.zeros_like(open)
+        reached[getFaceSlice(face)] = open[getFaceSlice(face)]
+
+        while True :
+            grown = reached.copy()
+            grown[1:, :, :] |= reached[:-1, :, :]
+            grown[:-1, :, :] |= reached[1:, :, :]
+            grown[:, 1:, :] |= reached[:, :-1, :]
+            grown[:, :-1, :] |= reached[:, 1:, :]
+            grown[:, :, 1:] |= reached[:, :, :-1]
+            grown[:, :, :-1] |= reached[:, :, 1:]
+            grown &= open
+
+            if (grown == reached).all() :
+                break
+            reached = grown
+
+        for otherFace in range(6) :
+            if reached[getFaceSlice(otherFace)].any() :
+                connectivity |= 1 << (face * 6 + otherFace)
+
+    return connectivity
+
+class Section : #A 16x16x16 cube of a chunk, stored, meshed, culled and drawn on its own
+    def __init__(self, app, chunk, index, blocks=0) -> None :
+        self.app = app
+        self.chunk = chunk
+        self.index = index
+
+        #A single integer block id when every block of the section is the same,
+        #otherwise an [x, y, z] uint16 array of ids living in a slot of the scene's shared memory WorldStore
+        self.store = app.scene.worldStore
+        self.slot = None
+        self.blocks = blocks
+
+        if not self.isUniform() :
+            self.storeArray(blocks)
+        self.compact()
+
+        self.mesh = ChunkMesh(app, (chunk.chunkX*chunk.size, index*sectionHeight, chunk.chunkZ*chunk.size))
+        self.meshDirty = True #Rebuilt by the MeshBuilder
+        self.meshPending = False #Being built on a mesh worker
+        self.destroyed = False
+        self.faceCount = 0 #Visible faces before greedy meshing merged them
+
+        self.connectivity = allFacesConnected
+        self.visibilityDirty = True
+
+        #Packed sky and block light of every block, see light.py, a single value when it is the same everywhere
+        self.light = 0
+
+    def isUniform(self) :
+        return isinstance(self.blocks, int)
+
+    def isEmpty(self) : #Nothing to cull, mesh or draw
+        return self.isUniform() and registry.allFaces[self.blocks] == 0
+
+    def storeArray(self, blocks) : #Copies an array of ids into the section's store slot
+        if self.slot == None :
+            self.slot = self.store.allocate()
+
+        view = self.store.view(self.slot)
+        view[:] = blocks
+        self.blocks = view
+
+    def releaseSlot(self) :
+        if self.slot != None :
+            self.store.release(self.slot)
+            self.slot = None
+
+    def compact(self) : #Stores the section as a single value again when it became uniform
+        if not self.isUniform() and (self.blocks == self.blocks[0, 0, 0]).all() :
+            self.blocks = int(self.blocks[0, 0, 0])
+            self.releaseSlot()
+
+    def getArray(self) :
+        if self.isUniform() :
+            return np.full(sectionShape, self.blocks, dtype=np.uint16)
+
+        return self.blocks
+
+    def getBlockId(self, x, y, z) :
+        if self.isUniform() :
+            return self.blocks
+
+        return int(self.blocks[x, y, z])
+
+    def setBlockId(self, x, y, z, blockId, compact=True) :
+        if self.isUniform() :
+            self.storeArray(self.blocks)
+
+        self.blocks[x, y, z] = blockId
+
+        if compact :
+            self.compact()
+
+    def getLight(self, x, y, z) :
+        if isinstance(self.light, int) :
+            return self.light
+
+        return int(self.light[x, y, z])
+
+    def setLight(self, x, y, z, light) :
+        if isinstance(self.light, int) :
+            if light == self.light :
+                return
+
+            self.light = np.full(sectionShape, self.light, dtype=np.uint8)
+
+        self.light[x, y, z] = light
+
+    def getHandle(self) : #How a worker process reads the section, ("uniform", id) or ("slot", WorldStore handle)
+        if self.isUniform() :
+            return ("uniform", self.blocks)
+
+        return ("slot", self.store.getHandle(self.slot))
+
+    def isConnected(self, fromFace, toFace) :
+        return bool(self.connectivity & (1 << (fromFace * 6 + toFace)))
+
+    def updateVisibility(self, open) : #open is a bool, for uniform sections, or an [x, y, z] bool array
+        if isinstance(open, (bool, np.bool_)) :
+            self.connectivity = allFacesConnected if open else 0
+        else :
+            self.connectivity = computeConnectivity(open)
+        self.visibilityDirty = False
+
+    def render(self) :
+        self.mesh.render()
+
+    def destroy(self) :
+        self.destroyed = True
+        self.mesh.destroy()
+
+        self.blocks = 0 #Drop the view before the slot is reused
+        self.releaseSlot()
+
+def findVisibleSections(scene, position) :
+    #Flood fill through the section visibility graph, starting from the camera's section
+    #Sections are only entered through faces their entry face connects to, and never back towards the camera
+    chunkX, chunkZ = scene.chunkCoordsFromBlockCoords(position[0], position[2])
+    start = scene.loadedChunks.get((chunkX, chunkZ))
+
+    if not start :
+        return None #Nothing to cull against, draw everything
+
+    sectionY = min(max(int((round(position[1]) ) // sectionHeight), 0), len(start.sections) - 1)
+
+    visible = {(chunkX, sectionY, chunkZ)}
+    queue = deque([(chunkX, sectionY, chunkZ, None, 0)])
+
+    while queue :
+        x, y, z, enteredFrom, directions = queue.popleft()
+        section = scene.loadedChunks[(x, z)].sections[y]
+
+        for face in range(6) :
+            if directions & (1 << (face ^ 1)) : #Going back
+                continue
+
+            if enteredFrom != None and not section.isConnected(enteredFrom, face) :
+                continue
+
+            dx, dy, dz = faceDirections[face]
+            neighbor = (x + dx, y + dy, z + dz)
+
+            if neighbor in visible :
+                continue
+
+            chunk = scene.loadedChunks.get((neighbor[0], neighbor[2]))
+            if not chunk or not 0 <= neighbor[1] < len(chunk.sections) :
+                continue
+
+            visible.add(neighbor)
+            queue.append((*neighbor, face ^ 1, directions | (1 << face)))
+
+    return visible
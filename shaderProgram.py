@@ -1,4 +1,12 @@
 import os
+import glm
+
+from model import QuadIndexBuffer
+
+#Camera uniform block shared by every program that declares it, see shaders/default.vert
+#Only the block programs do, the UI and upscale programs draw in screen space and need no camera
+cameraBinding = 0
+cameraBlockSize = 64 + 64 + 16 #std140: projection and view matrices, camera position with the time in w
 
 class ShaderProgramManager :
     def __init__(self, app) -> None:
@@ -7,9 +15,14 @@ class ShaderProgramManager :
         self.textureMan = app.textureMan
         
         self.shaders = {}
+        self.quadIndexBuffer = None
+
+        self.cameraBuffer = self.ctx.buffer(reserve=cameraBlockSize)
+        self.cameraBuffer.bind_to_uniform_block(cameraBinding) #Once, nothing else is bound to the binding point
+        self.writeCamera()
     
-    def getShaderProgram(self, name, textureID=None) :
-        if (not name in self.shaders) or (not textureID in self.shaders[name]) :
+    def getShaderProgram(self, name) :
+        if not name in self.shaders :
             with open(os.path.join("shaders", name + ".vert")) as f :
                 vertexShader = f.read()
             
@@ -17,30 +30,32 @@ class ShaderProgramManager :
                 fragmentShader = f.read()
             
             program = self.ctx.program(vertex_shader=vertexShader, fragment_shader=fragmentShader)
-            
-            if not name in self.shaders :
-                self.shaders[name] = {}
-
-            self.shaders[name][textureID] = program
+            self.shaders[name] = program
 
-            if textureID :
-                texture = self.textureMan.getTexture(textureID)
-                program['u_texture_0'] = texture.glo
-                texture.use(location=texture.glo)
+            try : #Block texture array
+                program['u_textures'] = self.textureMan.textureArrayLocation
+            except KeyError :
+                pass
             
             try :
-                program['m_proj'].write(self.app.camera.projM)
-                program['m_view'].write(self.app.camera.viewM)
+                program['Camera'].binding = cameraBinding
             except KeyError :
                 pass
 
-        return self.shaders[name][textureID]
+        return self.shaders[name]
+
+    def getQuadIndexBuffer(self) :
+        if not self.quadIndexBuffer :
+            self.quadIndexBuffer = QuadIndexBuffer(self.ctx)
+
+        return self.quadIndexBuffer
+
+    def writeCamera(self) : #Once per tick, every program reads the same buffer
+        camera = self.app.camera
+
+        self.cameraBuffer.write(camera.projM, offset=0)
+        self.cameraBuffer.write(camera.viewM, offset=64)
+        self.cameraBuffer.write(glm.vec4(camera.position, self.app.time), offset=128)
     
     def updateCamera(self) : #Used when updating camera FOV in menu
-        for name in self.shaders :
-            for shaderProgram in self.shaders[name].values() :
-                try :
-                    shaderProgram['m_proj'].write(self.app.camera.projM)
-                    shaderProgram['m_view'].write(self.app.camera.viewM)
-                except KeyError :
-                    pass
\ No newline at end of file
+        self.writeCamera()
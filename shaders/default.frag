@@ -2,12 +2,12 @@
 
 layout (location = 0) out vec4 fragColor;
 
-in vec2 uv_0;
+in vec3 uv_0;
 in float brightness;
 
-uniform sampler2D u_texture_0;
+uniform sampler2DArray u_textures;
 
 void main() {
-    vec3 color = texture(u_texture_0, uv_0).rgb;
+    vec3 color = texture(u_textures, uv_0).rgb;
     fragColor = vec4(color * brightness, 1.0);
 }
\ No newline at end of file
@@ -1,18 +1,35 @@
 #version 330 core
 
-layout (location = 0) in vec3 in_position;
-layout (location = 1) in vec2 in_texcoord_0;
+layout (location = 0) in uvec2 in_packed;
 
-out vec2 uv_0;
+out vec3 uv_0;
 out float brightness;
 
-uniform mat4 m_proj;
-uniform mat4 m_view;
-uniform mat4 m_model;
-uniform float in_brightness;
+layout (std140) uniform Camera { //Written once per frame, see ShaderProgramManager.writeCamera
+    mat4 m_proj;
+    mat4 m_view;
+    vec4 u_cameraPosition; //w is the time in seconds
+};
+
+uniform vec3 u_chunkOrigin;
 
 void main() {
-    uv_0 = in_texcoord_0;
-    brightness = in_brightness;
-    gl_Position = m_proj * m_view * m_model * vec4(in_position.xy, in_position.z, 1.0);
+    //Unpack the vertex, see packVertex in model.py
+    uint word0 = in_packed.x;
+    uint word1 = in_packed.y;
+
+    vec3 corner = vec3(word0 & 31u, (word0 >> 5u) & 511u, (word0 >> 14u) & 31u);
+    vec2 uv = vec2((word0 >> 19u) & 31u, (word0 >> 24u) & 31u);
+    uint layer = word1 & 4095u;
+    bool lowered = ((word1 >> 20u) & 1u) == 1u;
+
+    //Blocks are centered on whole coordinates, so their corners are half a block away
+    vec3 position = u_chunkOrigin + corner - 0.5;
+    if (lowered) {
+        position.y -= 0.25;
+    }
+
+    uv_0 = vec3(uv, float(layer));
+    brightness = float((word1 >> 12u) & 255u) / 255.0;
+    gl_Position = m_proj * m_view * vec4(position, 1.0);
 }
\ No newline at end of file
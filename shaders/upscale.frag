@@ -0,0 +1,9 @@
+#version 330
+// Samples the scene rendered at a lower resolution, filtered linearly
+uniform sampler2D scene;
+out vec4 f_color;
+in vec2 uv;
+
+void main() {
+    f_color = vec4(texture(scene, uv).rgb, 1.0);
+}
@@ -2,73 +2,213 @@ import pygame as pg
 import random
 import json
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 soundsDir = "sounds"
 
-with open(os.path.join(soundsDir, "sounds.json"), "r") as f :
-    soundList = json.loads(f.read())
+soundCacheBudget = 32 * 1024**2 #Bytes of decoded samples kept in memory
+streamedCategories = {"ambient"} #Long loops, streamed from disk by pg.mixer.music instead of decoded whole
 
 class SoundEngine :
     def __init__(self, app) -> None :
         self.app = app
-        
-        self.pgSounds = {}
+
+        self.pgSounds = OrderedDict() #Decoded sounds, least recently used first
+        self.cacheSize = 0
+        self.pendingSounds = {} #Sounds being decoded in the background
+        self.queuedPlays = {} #Plays waiting for their sound to be decoded, by pool
         self.soundPools = {}
+        self.streamingPool = None #Pool playing on pg.mixer.music
+
+        self.executor = None #Decodes sounds first used after the asset preloader is done
 
         pg.mixer.set_num_channels(32)
 
-        for category in soundList :
+        with open(os.path.join(soundsDir, "sounds.json"), "r") as f :
+            self.soundList = json.loads(f.read())
+
+        for category in self.soundList :
             self.soundPools[category] = {}
-            for poolId in soundList[category] :
-                self.soundPools[category][poolId] = SoundPool(self, soundList[category][poolId])
-    
+            for poolId in self.soundList[category] :
+                self.soundPools[category][poolId] = SoundPool(self, self.soundList[category][poolId], streamed=category in streamedCategories)
+
     def play(self, category, poolId, volume=1.0, loopOffset=0, force=False) :
         self.soundPools[category][poolId].play(volume=volume, loopOffset=loopOffset, force=force)
 
     def stop(self, category, poolId, fadeout=None) :
         self.soundPools[category][poolId].stop(fadeout=fadeout)
 
-    def getPgSound(self, path) :
-        if not path in self.pgSounds :
-            self.pgSounds[path] = pg.mixer.Sound(os.path.join(soundsDir, path))
+    def updateVolume(self) : #Used when updating the volume in menu
+        if self.streamingPool :
+            pg.mixer.music.set_volume(self.streamingPool.streamVolume * self.app.config.volume)
+
+    def getDecodedPaths(self) : #Sounds of pools that aren't streamed
+        paths = []
+
+        for category in self.soundPools.values() :
+            for pool in category.values() :
+                if not pool.streamed :
+                    paths.extend(pool.poolPaths)
+
+        return paths
+
+    def preload(self, executor) : #Started with the asset preloader, sounds past the cache budget are dropped again as they finish
+        for path in self.getDecodedPaths() :
+            self.requestSound(path, executor)
+
+        return list(self.pendingSounds.values())
+
+    def getExecutor(self) :
+        if not self.executor :
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sound")
+
+        return self.executor
+
+    @staticmethod
+    def decodeSound(path) :
+        return pg.mixer.Sound(os.path.join(soundsDir, path))
+
+    @staticmethod
+    def getSoundSize(sound) : #Bytes of decoded samples
+        frequency, size, channels = pg.mixer.get_init()
+        return round(sound.get_length() * frequency) * channels * (abs(size) // 8)
+
+    def requestSound(self, path, executor=None) :
+        if not (path in self.pgSounds or path in self.pendingSounds) :
+            self.pendingSounds[path] = (executor or self.getExecutor()).submit(self.decodeSound, path)
+
+    def addSound(self, path, sound) :
+        self.pgSounds[path] = sound
+        self.cacheSize += self.getSoundSize(sound)
+
+        while self.cacheSize > soundCacheBudget and len(self.pgSounds) > 1 : #Channels keep playing the sounds they hold
+            _, evicted = self.pgSounds.popitem(last=False)
+            self.cacheSize -= self.getSoundSize(evicted)
+
+    def collectDecoded(self) :
+        for path, future in list(self.pendingSounds.items()) :
+            if future.done() :
+                del self.pendingSounds[path]
+
+                try :
+                    sound = future.result()
+                except Exception as e :
+                    print(f"SOUND: Couldn't decode {path}: {e}")
+                    sound = None
+
+                if sound is not None :
+                    self.addSound(path, sound)
+
+                #Played right away, a later sound of the same pass could evict this one from the cache
+                self.playQueued(path, sound)
+
+    def playQueued(self, path, sound) : #Plays waiting for a sound, dropped when it couldn't be decoded
+        for pool, (queuedPath, volume) in list(self.queuedPlays.items()) :
+            if queuedPath == path :
+                del self.queuedPlays[pool]
+
+                if sound is not None :
+                    pool.playSound(sound, volume)
+
+    def getPgSound(self, path) : #None until it is decoded, decoding is started on first use
+        if path in self.pgSounds :
+            self.pgSounds.move_to_end(path)
+            return self.pgSounds[path]
+
+        self.requestSound(path)
+        return None
+
+    def tick(self) :
+        if not self.pendingSounds :
+            return
+
+        self.collectDecoded()
 
-        return self.pgSounds[path]
+    def shutdown(self) :
+        if self.executor :
+            self.executor.shutdown(wait=False, cancel_futures=True)
 
 class SoundPool :
-    def __init__(self, soundE, pool) -> None:
+    def __init__(self, soundE, pool, streamed=False) -> None:
         self.soundE = soundE
         self.poolPaths = pool
-        self.poolPgSounds = []
+        self.streamed = streamed
 
         self.soundEndTime = -1
         self.channel = None
+        self.streamVolume = 1.0 #Volume passed to play, scaled by config.volume
+        self.stopping = False #Fading out
+
+    def isPlaying(self) :
+        if self.streamed :
+            return self.soundE.streamingPool == self and not self.stopping
+
+        return self.channel != None and self.soundE.app.time <= self.soundEndTime and not self.stopping
 
-        for path in self.poolPaths :
-            self.poolPgSounds.append(soundE.getPgSound(path))
-        
     def play(self, index=None, volume=1.0, loopOffset=0, force=False) :
-        if not self.soundE.app.time > self.soundEndTime + loopOffset and (not force) : #Sound already playing
+        if self.streamed :
+            self.playStreamed(volume, force)
             return
-        
+
+        if not self.soundE.app.time > self.soundEndTime + loopOffset and not self.stopping and (not force) : #Sound already playing
+            return
+
+        if self in self.soundE.queuedPlays : #Already waiting for its sound
+            return
+
         if index :
-            sound = self.poolPgSounds[index]
+            path = self.poolPaths[index]
         else :
-            sound = random.choice(self.poolPgSounds)
+            path = random.choice(self.poolPaths)
 
-        c = pg.mixer.find_channel(force=False)
+        sound = self.soundE.getPgSound(path)
 
-        c.set_volume(volume * self.soundE.app.config.volume)
+        if not sound : #Played once it is decoded
+            self.soundE.queuedPlays[self] = (path, volume)
+            return
+
+        self.playSound(sound, volume)
+
+    def playSound(self, sound, volume) :
+        c = pg.mixer.find_channel(force=False)
 
         if c :
+            c.set_volume(volume * self.soundE.app.config.volume)
             c.play(sound)
             self.soundEndTime = self.soundE.app.time + sound.get_length()
             self.channel = c
-    
+            self.stopping = False
+
+    def playStreamed(self, volume, force=False) : #Loops until stopped, only one streamed pool plays at a time
+        if self.isPlaying() and not force :
+            return
+
+        pg.mixer.music.load(os.path.join(soundsDir, random.choice(self.poolPaths)))
+        self.streamVolume = volume
+        pg.mixer.music.set_volume(volume * self.soundE.app.config.volume)
+        pg.mixer.music.play(loops=-1)
+
+        self.soundE.streamingPool = self
+        self.stopping = False
+
     def stop(self, fadeout=None) :
-        if self.channel and (not self.soundE.app.time > self.soundEndTime) :
+        if not self.isPlaying() : #Nothing to stop, or already fading out
+            return
+
+        if self.streamed :
             if fadeout :
-                self.channel.fadeout(fadeout)
-                self.soundEndTime = self.soundE.app.time + (fadeout / 1000)
+                pg.mixer.music.fadeout(fadeout)
             else :
-                self.channel.stop()
-                self.soundEndTime = self.soundE.app.time + 0
\ No newline at end of file
+                pg.mixer.music.stop()
+
+            self.soundE.streamingPool = None
+            return
+
+        if fadeout :
+            self.channel.fadeout(fadeout)
+            self.soundEndTime = self.soundE.app.time + (fadeout / 1000)
+            self.stopping = True
+        else :
+            self.channel.stop()
+            self.soundEndTime = self.soundE.app.time + 0
@@ -0,0 +1,119 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+preloadThreads = 4
+
+def readCommitHash(repoPath=".") : #Reads the checked out commit directly from .git, without importing a git library
+    gitDir = os.path.join(repoPath, ".git")
+
+    if os.path.isfile(gitDir) : #Worktrees and submodules point to the real git directory
+        with open(gitDir, "r") as f :
+            gitDir = os.path.join(repoPath, f.read().strip().split("gitdir:", 1)[1].strip())
+
+    headFile = os.path.join(gitDir, "HEAD")
+
+    if not os.path.isfile(headFile) :
+        return None
+
+    with open(headFile, "r") as f :
+        head = f.read().strip()
+
+    if not head.startswith("ref:") : #Detached HEAD
+        return head
+
+    #A worktree's git directory only holds its own HEAD, branches and packed-refs are shared through commondir
+    commonDir = gitDir
+    commonDirFile = os.path.join(gitDir, "commondir")
+
+    if os.path.isfile(commonDirFile) :
+        with open(commonDirFile, "r") as f :
+            commonDir = os.path.join(gitDir, f.read().strip())
+
+    ref = head[4:].strip()
+
+    for directory in (gitDir, commonDir) :
+        refFile = os.path.join(directory, *ref.split("/"))
+
+        if os.path.isfile(refFile) :
+            with open(refFile, "r") as f :
+                return f.read().strip()
+
+    packedRefsFile = os.path.join(commonDir, "packed-refs")
+
+    if os.path.isfile(packedRefsFile) :
+        with open(packedRefsFile, "r") as f :
+            for line in f :
+                parts = line.strip().split(" ")
+                if len(parts) == 2 and parts[1] == ref :
+                    return parts[0]
+
+    return None
+
+class StartupReport :
+    def __init__(self, enabled=False) -> None :
+        self.enabled = enabled
+
+        self.startTime = time.perf_counter()
+        self.phases = []
+        self.printed = False
+
+    @contextmanager
+    def phase(self, name) :
+        startTime = time.perf_counter()
+        try :
+            yield
+        finally :
+            self.phases.append((name, time.perf_counter() - startTime))
+
+    def add(self, name, duration) :
+        self.phases.append((name, duration))
+
+    def print(self) :
+        if not self.enabled or self.printed :
+            return
+
+        self.printed = True
+        total = time.perf_counter() - self.startTime
+
+        print("STARTUP REPORT:")
+        for name, duration in self.phases :
+            print(f"  {name:<28} {duration * 1000:>8.1f}ms")
+        print(f"  {'total (until main menu)':<28} {total * 1000:>8.1f}ms")
+
+class AssetPreloader :
+    def __init__(self, app) -> None :
+        self.app = app
+
+        self.executor = ThreadPoolExecutor(max_workers=preloadThreads, thread_name_prefix="preload")
+        self.futures = []
+
+        self.startTime = None
+        self.finished = False
+
+    def start(self) :
+        self.startTime = time.perf_counter()
+
+        self.futures += self.app.textureMan.preload(self.executor)
+        self.futures += self.app.sound.preload(self.executor)
+
+    def tick(self) :
+        if self.finished or self.startTime == None :
+            return
+
+        self.app.textureMan.uploadPreloaded()
+
+        for future in self.futures :
+            if not future.done() :
+                return
+
+        self.finished = True
+        self.executor.shutdown(wait=False)
+
+        report = self.app.startupReport
+        if report.enabled :
+            print(f"STARTUP REPORT: background asset preload finished in {(time.perf_counter() - self.startTime) * 1000:.1f}ms ({len(self.futures)} assets)")
+
+    def shutdown(self) :
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,11 @@
+import os
+import sys
+
+#The modules are in the repository root and open blocks.json and the other assets relative to it
+rootDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, rootDirectory)
+os.chdir(rootDirectory)
+
+from block import loadBlockInfo
+
+loadBlockInfo()
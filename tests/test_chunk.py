@@ -0,0 +1,69 @@
+import json
+import numpy as np
+
+from chunk import generationPalette, generationIds, decodeChunkDict, encodeChunkDict, countChunkDict, chunkFormat
+
+def makeBaseline(height=32) : #Stone below the middle, grass on top of it and air above, as generationPalette indexes
+    baseline = np.full((16, height, 16), generationIds["air"], dtype=np.uint8)
+    baseline[:, :height // 2, :] = generationIds["stone"]
+    baseline[:, height // 2, :] = generationIds["grass"]
+    return baseline
+
+def makeBlocks(baseline) : #The baseline with a few blocks changed, like a played chunk
+    blocks = np.array(generationPalette, dtype=object)[baseline]
+    blocks[0, 0, 0] = "air"
+    blocks[3, 20, 7] = "lamp"
+    blocks[15, 31, 15] = "stone"
+    blocks[8, 16, 8] = "water"
+    return blocks
+
+def makeLegacyDict(blocks) : #A format 1 save, every block stored as a pallete index
+    pallete = sorted(set(blocks.ravel()))
+    indexes = {blockId: index for index, blockId in enumerate(pallete)}
+    return {"pallete": pallete, "blocks": np.vectorize(indexes.get)(blocks).tolist()}
+
+def test_roundTrip() :
+    baseline = makeBaseline()
+    blocks = makeBlocks(baseline)
+
+    j = json.loads(json.dumps(encodeChunkDict(blocks, baseline, 2))) #As read back from the file
+    assert j["format"] == chunkFormat
+    assert len(j["changes"]) == 4 * 2
+
+    assert (decodeChunkDict(j, baseline) == blocks).all()
+
+def test_unchangedChunkHasNoChanges() :
+    baseline = makeBaseline()
+    j = encodeChunkDict(np.array(generationPalette, dtype=object)[baseline], baseline, 2)
+
+    assert j["changes"] == []
+    assert j["pallete"] == []
+
+def test_decodeLegacy() :
+    baseline = makeBaseline()
+    blocks = makeBlocks(baseline)
+
+    assert (decodeChunkDict(makeLegacyDict(blocks), baseline) == blocks).all()
+
+def test_decodeTallerWorld() : #Chunks saved before the world height was raised keep the generated blocks above them
+    baseline = makeBaseline(32)
+    blocks = makeBlocks(baseline)
+    j = json.loads(json.dumps(encodeChunkDict(blocks, baseline, 2)))
+
+    tallBaseline = np.pad(baseline, ((0, 0), (0, 32), (0, 0)), constant_values=generationIds["air"])
+    decoded = decodeChunkDict(j, tallBaseline)
+
+    assert (decoded[:, :32, :] == blocks).all()
+    assert (decoded[:, 32:, :] == "air").all()
+
+def test_count() :
+    baseline = makeBaseline()
+    blocks = makeBlocks(baseline)
+    names, counts = np.unique(blocks.astype(str), return_counts=True)
+    expected = dict(zip(names.tolist(), counts.tolist()))
+
+    for j in (encodeChunkDict(blocks, baseline, 2), makeLegacyDict(blocks)) :
+        blockCounts, modified = countChunkDict(json.loads(json.dumps(j)), baseline)
+
+        assert blockCounts == expected
+        assert modified == 4
@@ -0,0 +1,61 @@
+import json
+import os
+import numpy as np
+
+import convertSaves
+from chunk import ChunkGenerator, generationPalette, decodeChunkDict, chunkFormat
+from test_chunk import makeLegacyDict
+
+seed = "convert"
+height = 32
+
+def writeLegacyChunk(directory, chunkX, chunkZ, blocks) :
+    path = os.path.join(directory, f"{chunkX}_{chunkZ}.json")
+
+    with open(path, "w") as f :
+        f.write(json.dumps(makeLegacyDict(blocks)))
+
+    return path
+
+def getBaseline(chunkX, chunkZ) :
+    return ChunkGenerator(convertSaves.worldGen, chunkX, chunkZ, height).generate()
+
+def test_convertLegacyChunk(tmp_path) :
+    convertSaves.initWorker(seed, 2)
+    baseline = getBaseline(1, -2)
+    blocks = np.array(generationPalette, dtype=object)[baseline]
+    blocks[5, 0, 5] = "lamp"
+    blocks[6, 20, 6] = "stone"
+
+    path = writeLegacyChunk(tmp_path, 1, -2, blocks)
+    assert convertSaves.convertChunk(path, height, False) == (path, "converted")
+
+    with open(path, "r") as f :
+        j = json.loads(f.read())
+
+    assert j["format"] == chunkFormat
+    assert (decodeChunkDict(j, baseline) == blocks).all()
+
+    assert convertSaves.convertChunk(path, height, False) == (path, "current") #Running again skips it
+
+def test_unchangedChunkIsRemoved(tmp_path) :
+    convertSaves.initWorker(seed, 2)
+    blocks = np.array(generationPalette, dtype=object)[getBaseline(0, 0)]
+
+    path = writeLegacyChunk(tmp_path, 0, 0, blocks)
+    assert convertSaves.convertChunk(path, height, False) == (path, "removed")
+    assert not os.path.exists(path)
+
+def test_dryRunWritesNothing(tmp_path) :
+    convertSaves.initWorker(seed, 2)
+    blocks = np.array(generationPalette, dtype=object)[getBaseline(0, 0)]
+    blocks[0, 0, 0] = "air"
+
+    path = writeLegacyChunk(tmp_path, 0, 0, blocks)
+    with open(path, "r") as f :
+        before = f.read()
+
+    assert convertSaves.convertChunk(path, height, True) == (path, "converted")
+
+    with open(path, "r") as f :
+        assert f.read() == before
@@ -0,0 +1,38 @@
+import numpy as np
+
+from model import greedyRectangles
+
+def paint(shape, rectangles) : #The grid the rectangles cover, failing on overlaps
+    grid = np.zeros(shape, dtype=np.int64)
+
+    for a, b, width, height, value in rectangles :
+        assert (grid[a:a + width, b:b + height] == 0).all()
+        grid[a:a + width, b:b + height] = value
+
+    return grid
+
+def test_coversGrid() :
+    rng = np.random.default_rng(0)
+    grid = rng.integers(0, 3, (16, 16)) * (rng.random((16, 16)) < 0.7)
+
+    assert (paint(grid.shape, greedyRectangles(grid)) == grid).all()
+
+def test_mergesEqualCells() :
+    grid = np.zeros((16, 16), dtype=np.int64)
+    grid[2:6, 3:11] = 4
+    grid[8:16, :] = 7
+
+    assert sorted(greedyRectangles(grid)) == [(2, 3, 4, 8, 4), (8, 0, 8, 16, 7)]
+
+def test_leavesInputUnchanged() :
+    grid = np.ones((4, 4), dtype=np.int64)
+    greedyRectangles(grid)
+
+    assert (grid == 1).all()
+
+def test_maxSize() :
+    grid = np.ones((20, 1), dtype=np.int64)
+    rectangles = greedyRectangles(grid, maxSize=16)
+
+    assert [width for a, b, width, height, value in rectangles] == [16, 4]
+    assert (paint(grid.shape, rectangles) == grid).all()
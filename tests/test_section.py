@@ -0,0 +1,68 @@
+import types
+import numpy as np
+
+from section import Section, computeConnectivity, findVisibleSections, allFacesConnected, sectionShape
+
+def isConnected(connectivity, fromFace, toFace) :
+    return bool(connectivity & (1 << (fromFace * 6 + toFace)))
+
+def test_uniformConnectivity() :
+    assert computeConnectivity(np.ones(sectionShape, dtype=bool)) == allFacesConnected
+    assert computeConnectivity(np.zeros(sectionShape, dtype=bool)) == 0
+
+def test_wallConnectivity() : #A wall across x splits the section, each side still connects to the faces it touches
+    open = np.ones(sectionShape, dtype=bool)
+    open[8, :, :] = False
+    connectivity = computeConnectivity(open)
+
+    assert not isConnected(connectivity, 0, 1)
+    assert not isConnected(connectivity, 1, 0)
+    assert isConnected(connectivity, 1, 2)
+    assert isConnected(connectivity, 2, 3)
+    assert isConnected(connectivity, 4, 5)
+
+def test_tunnelConnectivity() : #Only the two ends of a tunnel along x see each other
+    open = np.zeros(sectionShape, dtype=bool)
+    open[:, 8, 8] = True
+    connectivity = computeConnectivity(open)
+
+    assert connectivity == sum(1 << (fromFace * 6 + toFace) for fromFace in (0, 1) for toFace in (0, 1))
+
+class FakeSection :
+    def __init__(self, connectivity) -> None :
+        self.connectivity = connectivity
+
+    isConnected = Section.isConnected
+
+def makeScene(connectivities) : #A row of one section chunks along x, by chunk x
+    loadedChunks = {(x, 0): types.SimpleNamespace(sections=[FakeSection(connectivity)]) for x, connectivity in connectivities.items()}
+    return types.SimpleNamespace(loadedChunks=loadedChunks, chunkCoordsFromBlockCoords=lambda x, z : (int(x // 16), int(z // 16)))
+
+def test_openSectionsAreVisible() :
+    scene = makeScene({x: allFacesConnected for x in range(-2, 3)})
+
+    assert findVisibleSections(scene, (8, 8, 8)) == {(x, 0, 0) for x in range(-2, 3)}
+
+def test_closedSectionHidesWhatIsBehindIt() :
+    scene = makeScene({0: allFacesConnected, 1: 0, 2: allFacesConnected, -1: allFacesConnected})
+
+    assert findVisibleSections(scene, (8, 8, 8)) == {(-1, 0, 0), (0, 0, 0), (1, 0, 0)}
+
+def test_tunnelOnlyLeadsAlongIt() :
+    tunnel = computeConnectivity(np.pad(np.ones((16, 1, 1), dtype=bool), ((0, 0), (8, 7), (8, 7))))
+    scene = makeScene({0: allFacesConnected, 1: tunnel, 2: allFacesConnected})
+
+    #Beside the tunnel, one only reachable through its side
+    scene.loadedChunks[(1, -1)] = types.SimpleNamespace(sections=[FakeSection(allFacesConnected)])
+    #and one reachable around it
+    scene.loadedChunks[(0, 1)] = types.SimpleNamespace(sections=[FakeSection(allFacesConnected)])
+    scene.loadedChunks[(1, 1)] = types.SimpleNamespace(sections=[FakeSection(allFacesConnected)])
+
+    visible = findVisibleSections(scene, (8, 8, 8))
+
+    assert (2, 0, 0) in visible
+    assert (1, 0, -1) not in visible
+    assert (1, 0, 1) in visible
+
+def test_outsideLoadedWorld() :
+    assert findVisibleSections(makeScene({0: allFacesConnected}), (100, 8, 8)) == None
@@ -1,27 +1,79 @@
 import os
 import pygame as pg
 
+from block import loadBlockInfo
+
+textureSize = (64, 64) #Every block texture is scaled to this size to fit into the texture array
+
 class TextureManager :
     def __init__(self, app) -> None :
         self.app = app
         self.ctx = self.app.ctx
         
-        self.textures = {}
+        self.textureArray = None
+        self.textureArrayLocation = 1 #Texture unit 0 is used by the UI
+        self.textureLayers = {}
+        self.pendingTextures = {} #Textures being decoded by the asset preloader
 
         self.iconPath = os.path.join("textures", "icon.png")
         self.iconTexture = pg.image.load(self.iconPath)
-    
-    def getTexture(self, name) :
-        if not name in self.textures :
-            self.loadTexture(os.path.join("textures", name), name)
 
-        return self.textures[name]
+    def getBlockTextureNames(self) :
+        names = set()
 
-    def loadTexture(self, path, name) :
-        texture = pg.image.load(path).convert()
-        texture = pg.transform.flip(texture, flip_x=False, flip_y=True)
-        texture = self.ctx.texture(size=texture.get_size(), components=3, data=pg.image.tostring(texture, 'RGB'))
+        for block in loadBlockInfo().values() :
+            names.update(block["faceTextures"])
+
+        return sorted(names)
+
+    def getTextureLayer(self, name) :
+        if not self.textureLayers :
+            self.textureLayers = {textureName: layer for layer, textureName in enumerate(self.getBlockTextureNames())}
+
+        return self.textureLayers.get(name, self.textureLayers["FALLBACK/block.png"])
+
+    def getTextureArray(self) : #Every block texture in one texture array, indexed by getTextureLayer
+        if not self.textureArray :
+            self.getTextureLayer(None)
+            names = sorted(self.textureLayers, key=self.textureLayers.get)
+            data = []
+
+            for name in names :
+                if name in self.pendingTextures :
+                    size, textureData = self.pendingTextures.pop(name).result()
+                else :
+                    size, textureData = self.decodeTexture(os.path.join("textures", name))
+                data.append(textureData)
+            
+            self.textureArray = self.ctx.texture_array((textureSize[0], textureSize[1], len(names)), 3, data=b"".join(data))
 
-        self.textures[name] = texture
+        return self.textureArray
+
+    def use(self) :
+        self.getTextureArray().use(location=self.textureArrayLocation)
+
+    def preload(self, executor) :
+        for name in self.getBlockTextureNames() :
+            if not name in self.pendingTextures :
+                self.pendingTextures[name] = executor.submit(self.decodeTexture, os.path.join("textures", name))
+        
+        return list(self.pendingTextures.values())
+
+    def uploadPreloaded(self) : #Builds the texture array once every texture is decoded, GL calls have to be made from the main thread
+        if self.textureArray :
+            return
+
+        for future in self.pendingTextures.values() :
+            if not future.done() :
+                return
+
+        self.getTextureArray()
+
+    @staticmethod
+    def decodeTexture(path) :
+        texture = pg.image.load(path)
+        if texture.get_size() != textureSize :
+            texture = pg.transform.scale(texture, textureSize)
+        texture = pg.transform.flip(texture, flip_x=False, flip_y=True)
 
-        return texture
\ No newline at end of file
+        return texture.get_size(), pg.image.tostring(texture, 'RGB')
\ No newline at end of file
@@ -6,11 +6,84 @@ from moderngl_window import geometry, activate_context
 import math
 import os
 import psutil
+import time
+from collections import OrderedDict
 
 from menu import Menu
 
 alwaysShowDebugElements = False
 
+textCacheSize = 256 #Maximum amount of rendered text surfaces kept in memory
+glyphAtlasCharacters = "0123456789.,-+() " #Characters pre-rendered for fast changing numeric text
+
+class TextCache :
+    def __init__(self, maxSize=textCacheSize) -> None :
+        self.maxSize = maxSize
+
+        self.surfaces = OrderedDict()
+        self.atlases = {}
+    
+    def render(self, font, string, antialias, color) :
+        key = (font, string, antialias, tuple(color))
+
+        if key in self.surfaces :
+            self.surfaces.move_to_end(key)
+            return self.surfaces[key]
+        
+        textSurface = font.render(string, antialias, color)
+        self.surfaces[key] = textSurface
+
+        if len(self.surfaces) > self.maxSize : #Drop the least recently used surface
+            self.surfaces.popitem(last=False)
+
+        return textSurface
+
+    def getAtlas(self, font, antialias, color) :
+        key = (font, antialias, tuple(color))
+
+        if not key in self.atlases :
+            self.atlases[key] = GlyphAtlas(font, antialias, color)
+
+        return self.atlases[key]
+
+    def clear(self) :
+        self.surfaces.clear()
+        self.atlases.clear()
+
+class GlyphAtlas :
+    def __init__(self, font, antialias, color, characters=glyphAtlasCharacters) -> None :
+        self.height = font.get_height()
+        widths = [font.size(character)[0] for character in characters]
+
+        self.surface = pg.Surface((sum(widths), self.height), flags=pg.SRCALPHA)
+        self.glyphs = {}
+
+        x = 0
+        for character, width in zip(characters, widths) :
+            self.surface.blit(font.render(character, antialias, color), (x, 0))
+            self.glyphs[character] = pg.Rect(x, 0, width, self.height)
+            x += width
+    
+    def canDraw(self, string) :
+        for character in string :
+            if not character in self.glyphs :
+                return False
+        return True
+
+    def getWidth(self, string) :
+        return sum(self.glyphs[character].width for character in string)
+
+    def draw(self, surface, pos, string) :
+        x, y = pos
+        blits = []
+
+        for character in string :
+            glyph = self.glyphs[character]
+            blits.append((self.surface, (x, y), glyph))
+            x += glyph.width
+        
+        surface.blits(blits, doreturn=False)
+
 class UserInterface :
     def __init__(self, app) -> None:
         self.app = app
@@ -25,6 +98,7 @@ class UserInterface :
         self.redrawInTicks = 2
 
         self.defaultFontName = pg.font.get_default_font()
+        self.textCache = TextCache()
 
         self.texture = None
         self.resize()
@@ -85,10 +159,10 @@ class UserInterface :
         keyCode = self.app.config.keybinds[buttonId]
 
         if keyCode in range(0, 5) :
-            return pg.mouse.get_pressed()[keyCode]
+            return self.app.input.isMouseButtonPressed(keyCode)
         else :
             keyCode -= 5
-            return pg.key.get_pressed()[keyCode]
+            return self.app.input.isKeyPressed(keyCode)
 
     def resize(self) :
         self.res = self.app.windowSize
@@ -155,7 +229,7 @@ class UserInterface :
         self.debugElementsLastFrame = self.showDebugElements
     
     def drawText(self, pos, font, string, color=(255,255,255), antialias=True, center=False) :
-        textSurface = font.render(string, antialias, color)
+        textSurface = self.textCache.render(font, string, antialias, color)
         textRect = textSurface.get_rect()
 
         if not center :
@@ -165,6 +239,18 @@ class UserInterface :
 
         self.surface.blit(textSurface, textRect)
 
+        return textRect
+
+    def drawNumericText(self, pos, font, string, color=(255,255,255), antialias=True) : #Draws fast changing text glyph by glyph from an atlas, returns the drawn width
+        atlas = self.textCache.getAtlas(font, antialias, color)
+
+        if not atlas.canDraw(string) :
+            self.drawText(pos, font, string, color=color, antialias=antialias)
+            return font.size(string)[0]
+
+        atlas.draw(self.surface, pos, string)
+        return atlas.getWidth(string)
+
 
 # -- IN GAME -- #
 
@@ -214,6 +300,10 @@ class DebugScreen :
 
         self.lines = []
 
+        self.memoryUsage = 0
+        self.memoryUsageUpdateInterval = 0.5 #Seconds, reading process memory is slow
+        self.memoryUsageLastUpdate = -1
+
         self.resize()
     
     def resize(self) :
@@ -223,10 +313,42 @@ class DebugScreen :
         self.fontSize = math.floor(self.vh / 5.3)
         self.font = pg.font.SysFont(self.ui.defaultFontName, self.fontSize, bold=True)
 
+        self.ui.textCache.clear()
+
     def tick(self) :
         if self.visible and self.ui.showDebugElements :
+            lastLines = self.lines
             self.update()
-            self.ui.redrawNextFrame = True
+
+            if self.lines != lastLines : #Only redraw when something changed
+                self.ui.redrawNextFrame = True
+
+    def getMemoryUsage(self) :
+        currentTime = time.time()
+
+        if currentTime - self.memoryUsageLastUpdate > self.memoryUsageUpdateInterval :
+            self.memoryUsage = psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
+            self.memoryUsageLastUpdate = currentTime
+
+        return self.memoryUsage
+
+    def getGovernorInfo(self) :
+        governor = self.ui.app.governor
+
+        if not governor.isEnabled() :
+            return f"off, render distance {governor.getRenderDistance()}"
+
+        return (f"render distance {governor.getRenderDistance()}, far terrain x{governor.getLodScale():.2f}, {governor.getChunkLoadBudget()} loads/frame, "
+                f"{self.ui.app.frameMonitor.getAverageFrameTime():.1f} / {1000 / self.ui.app.config.fpsLimit:.1f}ms")
+
+    def getResolutionInfo(self) :
+        sceneFramebuffer = self.ui.app.sceneFramebuffer
+
+        if not sceneFramebuffer.isEnabled() :
+            return "native"
+
+        width, height = sceneFramebuffer.getSize()
+        return f"{width}x{height} (x{sceneFramebuffer.scale:.2f})"
 
     def update(self) :
         self.lines = []
@@ -247,29 +369,43 @@ class DebugScreen :
 
         cameraRot = (round(playerEntity.camera.yaw, 2), round(playerEntity.camera.pitch, 2))
 
-        memoryUsage = psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
-
-        self.lines.append(f"FPS: {round(self.ui.app.clock.get_fps())}")
-        self.lines.append(f"MEM: {round(memoryUsage)}MiB")
-        self.lines.append(f"GIT: {self.ui.app.commitHash[:7]}")
-        self.lines.append("")
-        self.lines.append(f"Pos: {playerPos}")
-        self.lines.append(f"In chunk: {playerEntity.getChunk()}")
-        self.lines.append(f"Velocity: {playerVelocity}")
-        self.lines.append(f"Rotation: {cameraRot}")
-        self.lines.append(f"Selected block: {playerEntity.selectedBlockId}")
-        self.lines.append(f"Looking at: {lookingAt}")
-        self.lines.append(f"On ground: {playerEntity.onGround}")
-        self.lines.append(f"Gravity: {not playerPhysics.disableGravity}")
-        self.lines.append(f"In fluid: {playerPhysics.inFluid}")
-        self.lines.append("")
-        self.lines.append(f"Seed: {self.ui.app.scene.worldGen.seed}")
+        memoryUsage = self.getMemoryUsage()
+
+        quads, faces = self.ui.app.scene.getMeshStats()
+        quadReduction = round((1 - quads / faces) * 100) if faces else 0
+        sectionsDrawn, sectionsLoaded = self.ui.app.scene.sectionStats
+        slotsUsed, slotsAllocated = self.ui.app.scene.worldStore.getUsage()
+
+        #Lines are (label, value) pairs, labels are cached as whole surfaces and values are drawn from a glyph atlas
+        self.lines.append(("FPS: ", f"{round(self.ui.app.clock.get_fps())}"))
+        self.lines.append(("MEM: ", f"{round(memoryUsage)}MiB"))
+        self.lines.append(("GIT: ", f"{self.ui.app.commitHash[:7]}"))
+        self.lines.append(("Quads: ", f"{quads} / {faces} faces (-{quadReduction}%)"))
+        self.lines.append(("Sections: ", f"{sectionsDrawn} / {sectionsLoaded} drawn, {slotsUsed} / {slotsAllocated} stored"))
+        self.lines.append(("Governor: ", self.getGovernorInfo()))
+        self.lines.append(("Resolution: ", self.getResolutionInfo()))
+        self.lines.append(None)
+        self.lines.append(("Pos: ", f"{playerPos}"))
+        self.lines.append(("In chunk: ", f"{playerEntity.getChunk()}"))
+        self.lines.append(("Velocity: ", f"{playerVelocity}"))
+        self.lines.append(("Rotation: ", f"{cameraRot}"))
+        self.lines.append(("Selected block: ", f"{playerEntity.selectedBlockId}"))
+        self.lines.append(("Looking at: ", f"{lookingAt}"))
+        self.lines.append(("On ground: ", f"{playerEntity.onGround}"))
+        self.lines.append(("Gravity: ", f"{not playerPhysics.disableGravity}"))
+        self.lines.append(("In fluid: ", f"{playerPhysics.inFluid}"))
+        self.lines.append(None)
+        self.lines.append(("Seed: ", f"{self.ui.app.scene.worldGen.seed}"))
 
     def render(self) :
+        x = self.fontSize / 3
         y = self.fontSize / 3
         for line in self.lines :
-            if not line == "" :
-                self.ui.drawText((self.fontSize / 3, y), self.font, line, antialias=False)
+            if line :
+                label, value = line
+
+                labelRect = self.ui.drawText((x, y), self.font, label, antialias=False)
+                self.ui.drawNumericText((labelRect.right, y), self.font, value, antialias=False)
             y += self.fontSize
 
 class FluidOverlay :
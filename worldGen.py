@@ -1,19 +1,41 @@
+import os
 import time
 import random
+from collections import OrderedDict
+import numpy as np
 from perlin_noise import PerlinNoise
 
+terrainMinHeight = 5
+terrainMaxHeight = 14
+
+generatorVersion = 2 #Bumped whenever generation output changes, saved chunks only store differences from it
+
+regionSize = 128 #Blocks per side of a cached heightmap region, a multiple of the chunk size
+heightCacheRegions = 16 #Regions kept in memory at least, more when the loaded and far terrain span more, see HeightCache.fitDistance
+missingHeight = -32768 #Columns of a cached region that were never computed
+
+#Salts separating the independent random streams drawn from the same coordinates
+treeChanceSalt = 0
+treeHeightSalt = 1
+treeLeavesSalt = 2 #One salt per leaves layer, starting here
+
 class WorldGen :
-    def __init__(self, seed=round(time.time())) -> None:
-        self.seed = self.stringToSeed(str(seed))
+    def __init__(self, seed=round(time.time()), version=generatorVersion, cacheDirectory=None) -> None:
+        if isinstance(seed, int) : #Already converted, as stored in info.json
+            self.seed = seed
+        else :
+            self.seed = self.stringToSeed(str(seed))
+        self.version = version
 
         self.heightNoise = PerlinNoise(octaves=10, seed=self.seed)
+        self.heightCache = HeightCache(self, cacheDirectory)
 
     def stringToSeed(self, string) :
         b = bytes(string, encoding="utf-8")
         seed = int.from_bytes(b, "big")
         seed = seed % (2**32) - 1
 
-        return seed 
+        return seed
 
     def seedFromCoords(self, x, z) :
         return self.stringToSeed(f"{x}_{z}")
@@ -21,22 +43,202 @@ class WorldGen :
     def getTerrainY(self, x, z, min, max) :
         n = self.heightNoise([x/100, z/100])
         return min + round(n * (max - min))
-    
+
+    def computeColumnHeight(self, x, z) : #Uncached, use getColumnHeight
+        return self.getTerrainY(x, z, terrainMinHeight, terrainMaxHeight)
+
+    def getColumnHeight(self, x, z) : #Height of the surface block of a column
+        return self.heightCache.getHeight(x, z)
+
+    def getHeightMap(self, x, z, size, step=1) : #[x, z] heights of every step-th column of a square, or a (x, z) sized rectangle, it must not cross a region border
+        return self.heightCache.getHeightMap(x, z, size, step)
+
+    def hash(self, x, z, salt=0) : #Stateless counter-based RNG, returns uint64 values for arrays of coordinates
+        with np.errstate(over="ignore") :
+            x = np.asarray(x, dtype=np.int64).astype(np.uint64)
+            z = np.asarray(z, dtype=np.int64).astype(np.uint64)
+
+            h = np.uint64(self.seed % (2**64)) ^ (np.uint64(salt) * np.uint64(0x165667B19E3779F9))
+            h = h ^ (x * np.uint64(0x9E3779B97F4A7C15)) ^ (z * np.uint64(0xC2B2AE3D27D4EB4F))
+
+            #splitmix64 finalizer
+            h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            h = h ^ (h >> np.uint64(31))
+
+        return h
+
+    def getTrees(self, chunkX, chunkZ, heightMap, waterLevel, chunkSize=16) :
+        #Returns the local coordinates, trunk heights and (layers, 5, 5) leaves masks of every tree in a chunk
+        localX, localZ = np.meshgrid(np.arange(chunkSize), np.arange(chunkSize), indexing="ij")
+        x, z = localX + chunkX * chunkSize, localZ + chunkZ * chunkSize
+
+        #Trees are kept away from the chunk borders, so they never have to be stamped into neighbor chunks
+        hasTree = (localX >= 3) & (localX < chunkSize - 3) & (localZ >= 3) & (localZ < chunkSize - 3)
+        hasTree &= heightMap + 1 > waterLevel
+        hasTree &= self.hash(x, z, treeChanceSalt) % np.uint64(100) == 0 #1% chance
+
+        x, z = x[hasTree], z[hasTree]
+        heights = 4 + (self.hash(x, z, treeHeightSalt) % np.uint64(3)).astype(np.int64)
+
+        layers = len(treeLeavesTemplate)
+        bits = np.arange(25, dtype=np.uint64).reshape(5, 5)
+        leaves = np.empty((len(x), layers, 5, 5), dtype=bool)
+
+        for layer in range(layers) :
+            randomBits = (self.hash(x, z, treeLeavesSalt + layer)[:, None, None] >> bits) & np.uint64(1)
+            leaves[:, layer] = treeLeavesTemplate[layer] == 2
+            leaves[:, layer] |= (treeLeavesTemplate[layer] == 1) & (randomBits == 1)
+
+        return localX[hasTree], localZ[hasTree], heights, leaves
+
+    #Generator version 1, kept so worlds created with it still generate the same chunks
+
     def shouldHaveTree(self, x, z) :
-        random.seed(self.seedFromCoords(x, z))
+        rng = random.Random(self.seedFromCoords(x, z))
 
         if (not x%16 in range(3, 13)) or (not z%16 in range(3, 13)) :
             return False
 
-        return random.randint(1, 100) > 99
-    
+        return rng.randint(1, 100) > 99
+
     def generateTree(self, x, z) :
-        random.seed(self.seedFromCoords(x, z))
+        rng = random.Random(self.seedFromCoords(x, z))
 
-        height = random.randint(4, 6)
+        height = rng.randint(4, 6)
         leavesToRemove = []
 
         for i in range(5*5) :
-            leavesToRemove.append(bool(random.randint(0, 1)))
+            leavesToRemove.append(bool(rng.randint(0, 1)))
+
+        return {"height": height, "leavesToRemove": leavesToRemove}
+
+#Leaves layers from 3 blocks below the top of the trunk upwards, 2 is always leaves, 1 is leaves half of the time
+treeLeavesTemplate = np.array([
+    [[1, 2, 2, 2, 1],
+     [2, 2, 2, 2, 2],
+     [2, 2, 2, 2, 2],
+     [2, 2, 2, 2, 2],
+     [1, 2, 2, 2, 1]],
+
+    [[0, 1, 1, 1, 0],
+     [1, 2, 2, 2, 1],
+     [1, 2, 2, 2, 1],
+     [1, 2, 2, 2, 1],
+     [0, 1, 1, 1, 0]],
+
+    [[0, 0, 0, 0, 0],
+     [0, 1, 2, 1, 0],
+     [0, 2, 2, 2, 0],
+     [0, 1, 2, 1, 0],
+     [0, 0, 0, 0, 0]],
+
+    [[0, 0, 0, 0, 0],
+     [0, 0, 1, 0, 0],
+     [0, 1, 2, 1, 0],
+     [0, 0, 1, 0, 0],
+     [0, 0, 0, 0, 0]],
+])
+
+class HeightCache : #Column heights of a world by region, bounded in memory and optionally kept on disk
+    def __init__(self, worldGen, directory=None) -> None :
+        self.worldGen = worldGen
+        self.directory = directory
+
+        self.regions = OrderedDict() #Least recently used first
+        self.dirty = set() #Regions with columns computed since they were loaded
+        self.maxRegions = heightCacheRegions
+
+    def getRegionPath(self, regionX, regionZ) :
+        return os.path.join(self.directory, f"{regionX}_{regionZ}.npy")
+
+    def loadRegion(self, regionX, regionZ) :
+        if self.directory :
+            path = self.getRegionPath(regionX, regionZ)
+
+            if os.path.isfile(path) :
+                try :
+                    heights = np.load(path)
+
+                    if heights.shape == (regionSize, regionSize) :
+                        return heights.astype(np.int16)
+                except (OSError, ValueError) :
+                    print(f"HEIGHT CACHE: Couldn't read {path}, recomputing it")
+
+        return np.full((regionSize, regionSize), missingHeight, dtype=np.int16)
+
+    def saveRegion(self, regionX, regionZ) :
+        self.dirty.discard((regionX, regionZ))
+
+        if not self.directory :
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.getRegionPath(regionX, regionZ)
+
+        with open(path + ".tmp", "wb") as f :
+            np.save(f, self.regions[(regionX, regionZ)])
+        os.replace(path + ".tmp", path)
+
+    def getRegion(self, regionX, regionZ) :
+        coords = (regionX, regionZ)
+
+        if coords in self.regions :
+            self.regions.move_to_end(coords)
+            return self.regions[coords]
+
+        self.regions[coords] = self.loadRegion(regionX, regionZ)
+
+        while len(self.regions) > self.maxRegions :
+            oldest = next(iter(self.regions))
+            if oldest in self.dirty :
+                self.saveRegion(*oldest)
+            del self.regions[oldest]
+
+        return self.regions[coords]
+
+    def fitDistance(self, distance) : #Keeps every region of a square of chunks around the camera in memory, distance in chunks
+        regionsPerSide = -(-(2 * distance + 1) * 16 // regionSize) + 1 #Plus one, the square rarely lines up with region borders
+        self.maxRegions = max(heightCacheRegions, regionsPerSide ** 2)
+
+    def getHeightMap(self, x, z, size, step=1) :
+        regionX, regionZ = x // regionSize, z // regionSize
+        region = self.getRegion(regionX, regionZ)
+
+        localX, localZ = x - regionX * regionSize, z - regionZ * regionSize
+        sizeX, sizeZ = size if isinstance(size, tuple) else (size, size)
+        heights = region[localX:localX + sizeX:step, localZ:localZ + sizeZ:step] #A view, computed columns are written into the region
+
+        missing = np.argwhere(heights == missingHeight)
+        for i, j in missing :
+            heights[i, j] = self.worldGen.computeColumnHeight(int(x + i * step), int(z + j * step))
+
+        if len(missing) :
+            self.dirty.add((regionX, regionZ))
+
+        return heights.astype(np.int64)
+
+    def getHeight(self, x, z) :
+        return int(self.getHeightMap(x, z, 1)[0, 0])
+
+    def isComputed(self, x, z, size) : #Every column of a square, or a (x, z) sized rectangle, is cached already
+        regionX, regionZ = x // regionSize, z // regionSize
+        localX, localZ = x - regionX * regionSize, z - regionZ * regionSize
+        sizeX, sizeZ = size if isinstance(size, tuple) else (size, size)
+
+        return bool((self.getRegion(regionX, regionZ)[localX:localX + sizeX, localZ:localZ + sizeZ] != missingHeight).all())
+
+    def setHeightMap(self, x, z, heights) : #Stores heights computed elsewhere, like in another process
+        regionX, regionZ = x // regionSize, z // regionSize
+        localX, localZ = x - regionX * regionSize, z - regionZ * regionSize
+
+        self.getRegion(regionX, regionZ)[localX:localX + heights.shape[0], localZ:localZ + heights.shape[1]] = heights
+        self.dirty.add((regionX, regionZ))
+
+    def flush(self) : #Writes every region with new columns to disk
+        for coords in list(self.dirty) :
+            self.saveRegion(*coords)
 
-        return {"height": height, "leavesToRemove": leavesToRemove}
\ No newline at end of file
+    def clear(self) :
+        self.regions = OrderedDict()
+        self.dirty = set()
@@ -0,0 +1,153 @@
+#Block histograms, modification counts and fluid coverage of saved worlds, without loading them in the game
+#Chunk files are scanned one at a time on worker processes, only their counts are kept
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from block import registry, loadBlockInfo
+from chunk import ChunkGenerator, chunkSize, defaultHeight, countChunkDict
+from saveManager import savesDirectory
+from worldGen import WorldGen, regionSize
+
+progressInterval = 1 #Seconds between progress lines
+scanBatch = 32 #Chunk files sent to a worker at once
+
+#Worker process side
+
+worldGen = None
+
+def initWorker(seed, generator) :
+    global worldGen
+    worldGen = WorldGen(seed, version=generator)
+
+def scanChunk(path, height) : #Returns the chunk coordinates, block counts and modified blocks of a chunk file
+    chunkX, chunkZ = (int(coord) for coord in os.path.splitext(os.path.basename(path))[0].split("_"))
+
+    try :
+        with open(path, "r") as f :
+            j = json.loads(f.read())
+    except (OSError, ValueError) as e :
+        print(f"STATS: Couldn't read {path}: {e}")
+        return chunkX, chunkZ, None, 0
+
+    baseline = ChunkGenerator(worldGen, chunkX, chunkZ, height).generate()
+    blockCounts, modified = countChunkDict(j, baseline)
+
+    return chunkX, chunkZ, blockCounts, modified
+
+#Main process side
+
+class StatsTotal : #Counts of a group of chunks, a region or the whole world
+    def __init__(self) -> None :
+        self.chunks = 0
+        self.blockCounts = {}
+        self.modifiedBlocks = 0
+        self.modifiedChunks = {} #Modified blocks by chunk, only chunks with any
+
+    def add(self, chunkX, chunkZ, blockCounts, modified) :
+        self.chunks += 1
+        self.modifiedBlocks += modified
+
+        if modified :
+            self.modifiedChunks[f"{chunkX}_{chunkZ}"] = modified
+
+        for blockId, count in blockCounts.items() :
+            self.blockCounts[blockId] = self.blockCounts.get(blockId, 0) + count
+
+    def getBlocks(self) :
+        return sum(self.blockCounts.values())
+
+    def getFluidBlocks(self) :
+        return sum(count for blockId, count in self.blockCounts.items() if blockId in registry.ids and registry.fluid[registry.ids[blockId]])
+
+    def toDict(self) :
+        blocks = self.getBlocks()
+        fluidBlocks = self.getFluidBlocks()
+
+        return {
+            "chunks": self.chunks,
+            "blocks": blocks,
+            "modifiedBlocks": self.modifiedBlocks,
+            "fluidBlocks": fluidBlocks,
+            "fluidCoverage": fluidBlocks / blocks if blocks else 0,
+            "histogram": dict(sorted(self.blockCounts.items(), key=lambda item : -item[1])),
+            "modifiedChunks": self.modifiedChunks
+        }
+
+    def toRow(self, scope, regionX, regionZ, blockIds) :
+        blocks = self.getBlocks()
+        fluidBlocks = self.getFluidBlocks()
+
+        return [scope, regionX, regionZ, self.chunks, blocks, self.modifiedBlocks, fluidBlocks, round(fluidBlocks / blocks if blocks else 0, 6)] + [self.blockCounts.get(blockId, 0) for blockId in blockIds]
+
+def scanWorld(worldId, processes, outputDirectory) :
+    with open(os.path.join(savesDirectory, worldId, "info.json"), "r") as f :
+        j = json.loads(f.read())
+
+    seed, generator, height = j["seed"], j.get("generator", 1), j.get("height", defaultHeight)
+
+    directory = os.path.join(savesDirectory, worldId, "chunks")
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".json")] if os.path.isdir(directory) else []
+
+    print(f"STATS: {worldId}, {len(paths)} chunk files")
+
+    world = StatsTotal()
+    regions = {} #By height cache region
+    chunksPerRegion = regionSize // chunkSize
+
+    startTime = lastProgress = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=initWorker, initargs=(seed, generator)) as executor :
+        for done, (chunkX, chunkZ, blockCounts, modified) in enumerate(executor.map(scanChunk, paths, [height] * len(paths), chunksize=scanBatch), start=1) :
+            if blockCounts != None :
+                world.add(chunkX, chunkZ, blockCounts, modified)
+                regions.setdefault((chunkX // chunksPerRegion, chunkZ // chunksPerRegion), StatsTotal()).add(chunkX, chunkZ, blockCounts, modified)
+
+            now = time.perf_counter()
+            if now - lastProgress >= progressInterval or done == len(paths) :
+                lastProgress = now
+                print(f"STATS: {done}/{len(paths)} chunks, {done / max(now - startTime, 1e-9):.1f} chunks/sec")
+
+    os.makedirs(outputDirectory, exist_ok=True)
+
+    report = {"worldId": worldId, "worldName": j.get("worldName"), "generator": generator, "height": height, "timestamp": round(time.time())}
+    report.update(world.toDict())
+    report["regionSize"] = regionSize
+    report["regions"] = {f"{regionX}_{regionZ}": region.toDict() for (regionX, regionZ), region in sorted(regions.items())}
+
+    with open(os.path.join(outputDirectory, f"{worldId}.json"), "w") as f :
+        f.write(json.dumps(report, indent=4))
+
+    blockIds = list(report["histogram"])
+    with open(os.path.join(outputDirectory, f"{worldId}.csv"), "w", newline="") as f :
+        writer = csv.writer(f)
+        writer.writerow(["scope", "regionX", "regionZ", "chunks", "blocks", "modifiedBlocks", "fluidBlocks", "fluidCoverage"] + blockIds)
+        writer.writerow(world.toRow("world", "", "", blockIds))
+
+        for (regionX, regionZ), region in sorted(regions.items()) :
+            writer.writerow(region.toRow("region", regionX, regionZ, blockIds))
+
+    print(f"STATS: {worldId} done, {world.chunks} chunks, {world.modifiedBlocks} modified blocks, report in {outputDirectory}")
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description="Write block statistics reports of saved worlds")
+    parser.add_argument("worlds", nargs="*", help="ids of the worlds to scan, their directory names in saves")
+    parser.add_argument("--all", action="store_true", help="scan every world in saves")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes, defaults to one per CPU")
+    parser.add_argument("--output", default="stats", help="directory the JSON and CSV reports are written to")
+    args = parser.parse_args()
+
+    worldIds = args.worlds
+    if args.all :
+        worldIds = sorted(dir for dir in os.listdir(savesDirectory) if os.path.isfile(os.path.join(savesDirectory, dir, "info.json")))
+
+    if not worldIds :
+        parser.error("no worlds given, pass world ids or --all")
+
+    loadBlockInfo() #Fluid flags
+
+    for worldId in worldIds :
+        scanWorld(worldId, args.processes, args.output)
@@ -0,0 +1,138 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+slotShape = (16, 16, 16) #One section
+slotDtype = np.uint16
+slotsPerPage = 256 #2MiB of block ids per shared memory block
+
+slotBytes = int(np.prod(slotShape)) * np.dtype(slotDtype).itemsize
+headerBytes = slotsPerPage * 4 #uint32 generation counter per slot
+
+def attachPage(name) : #Attaches to a page owned by another process, only the owner unlinks it
+    #Workers share the owner's resource tracker, so the page stays registered once and is unregistered when the owner unlinks it
+    return shared_memory.SharedMemory(name=name)
+
+def getSlotView(page, slot) :
+    return np.ndarray(slotShape, dtype=slotDtype, buffer=page.buf, offset=headerBytes + slot * slotBytes)
+
+def getGenerations(page) :
+    return np.ndarray((slotsPerPage,), dtype=np.uint32, buffer=page.buf, offset=0)
+
+class WorldStore : #Section block arrays in shared memory, so worker processes can read them without copying
+    def __init__(self) -> None :
+        self.pages = [] #None where a page was retired, its number is reused by the next page added
+        self.used = [] #Allocated slots per page
+        self.free = [] #Free slot numbers, reused last freed first
+        self.retired = [] #Unlinked pages that still had views into them, closed once they are gone
+        self.pageNames = () #Of live pages, sent with jobs so workers close pages retired since
+
+    def addPage(self) :
+        page = shared_memory.SharedMemory(create=True, size=headerBytes + slotsPerPage * slotBytes)
+        getGenerations(page)[:] = 0
+
+        number = self.pages.index(None) if None in self.pages else len(self.pages)
+        if number == len(self.pages) :
+            self.pages.append(page)
+            self.used.append(0)
+        else :
+            self.pages[number] = page
+
+        first = number * slotsPerPage
+        self.free += reversed(range(first, first + slotsPerPage))
+        self.updatePageNames()
+
+    def retirePage(self, number) : #Unlinks a page none of the slots of are used, so its memory is returned
+        page = self.pages[number]
+        self.pages[number] = None
+        self.free = [slot for slot in self.free if slot // slotsPerPage != number]
+
+        page.unlink()
+        self.retired.append(page)
+        self.closeRetired()
+        self.updatePageNames()
+
+    def closeRetired(self) :
+        for page in self.retired[:] :
+            try :
+                page.close()
+                self.retired.remove(page)
+            except BufferError : #Still viewed, tried again when the next page is retired
+                pass
+
+    def updatePageNames(self) :
+        self.pageNames = tuple(page.name for page in self.pages if page)
+
+    def allocate(self) : #Returns a free slot number
+        if not self.free :
+            self.addPage()
+
+        slot = self.free.pop()
+        page, index = divmod(slot, slotsPerPage)
+        getGenerations(self.pages[page])[index] += 1 #Handles to the previous user of the slot are now stale
+        self.used[page] += 1
+
+        return slot
+
+    def release(self, slot) :
+        page, index = divmod(slot, slotsPerPage)
+        getGenerations(self.pages[page])[index] += 1
+        self.used[page] -= 1
+
+        self.free.append(slot)
+
+        #Keep one page around, so a section changing between uniform and not doesn't create and unlink it every time
+        if self.used[page] == 0 and len(self.pageNames) > 1 :
+            self.retirePage(page)
+
+    def view(self, slot) :
+        page, index = divmod(slot, slotsPerPage)
+        return getSlotView(self.pages[page], index)
+
+    def getHandle(self, slot) : #What a worker process needs to find a slot, (page name, index in page, generation)
+        page, index = divmod(slot, slotsPerPage)
+        return self.pages[page].name, index, int(getGenerations(self.pages[page])[index])
+
+    def getUsage(self) : #Used and allocated slots
+        return sum(self.used), len(self.pageNames) * slotsPerPage
+
+    def close(self) :
+        for page in self.pages :
+            if page :
+                page.unlink()
+                self.retired.append(page)
+
+        self.closeRetired() #Pages sections still hold views into are released with the process
+
+        self.pages = []
+        self.used = []
+        self.free = []
+        self.pageNames = ()
+
+class WorldStoreReader : #Worker process side, attaches to pages by name as handles refer to them
+    def __init__(self) -> None :
+        self.pages = {}
+
+    def getPage(self, name) : #Raises FileNotFoundError if the page was retired
+        if not name in self.pages :
+            self.pages[name] = attachPage(name)
+
+        return self.pages[name]
+
+    def retain(self, names) : #Closes pages the store retired, names are those it still has
+        for name in [name for name in self.pages if not name in names] :
+            self.close(name)
+
+    def close(self, name=None) : #One page or all of them
+        for name in [name] if name else list(self.pages) :
+            try :
+                self.pages.pop(name).close()
+            except BufferError : #A view into it is still alive, the mapping goes with the process
+                pass
+
+    def view(self, handle) : #Zero-copy view of a slot, check isCurrent once done reading it
+        name, index, generation = handle
+        return getSlotView(self.getPage(name), index)
+
+    def isCurrent(self, handle) : #The slot was not released or reused since the handle was taken
+        name, index, generation = handle
+        return int(getGenerations(self.getPage(name))[index]) == generation